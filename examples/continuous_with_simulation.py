@@ -110,16 +110,15 @@ s0_part = find_controller.find_discrete_state(
 ctrl = synth.determinize_machine_init(ctrl, {'loc': s0_part})
 (s, dum) = ctrl.reaction('Sinit', {'park': randParkSignal[0]})
 print(dum)
+# formulate the input computation of each transition once
+controller = find_controller.OnlineController(
+    sys_dyn, disc_dynamics, ord=1, mid_weight=5)
 for i in range(0, T):
     (s, dum) = ctrl.reaction(s, {'park': randParkSignal[i]})
-    u = find_controller.get_input(
+    u = controller.get_input(
         x0=np.array([x[i * N], y[i * N]]),
-        ssys=sys_dyn,
-        abstraction=disc_dynamics,
         start=s0_part,
-        end=disc_dynamics.ppp2ts.index(dum['loc']),
-        ord=1,
-        mid_weight=5)
+        end=disc_dynamics.ppp2ts.index(dum['loc']))
     for ind in range(N):
         s_now = np.dot(
             sys_dyn.A, [x[-1], y[-1]]
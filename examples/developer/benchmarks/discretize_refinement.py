@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Cost of bookkeeping per iteration of the refinement loop in `discretize`.
+
+The reachability computations (LPs) are replaced by a fixed rule,
+so that only the maintenance of the adjacency, transition,
+and pending-pair relations is measured.
+Each iteration pops a pair and splits the first cell of the pair
+into two, as a bisimulation step would. The new cell takes over
+half of the neighbors, so that cell degrees remain bounded,
+as they do for geometric partitions.
+
+The dense matrices used previously are padded on each split,
+so their cost per iteration grows with the number of cells.
+The sparse worklist should keep it flat.
+
+usage: python discretize_refinement.py [n_iterations]
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import numpy as np
+from scipy import sparse as sp
+
+from tulip.abstract import discretization as disc
+
+
+def grid_adjacency(n):
+    """Return adjacency of `n x n` grid of cells, with self-loops."""
+    m = n * n
+    adj = sp.lil_matrix((m, m), dtype=np.int8)
+    for x in range(n):
+        for y in range(n):
+            i = x * n + y
+            adj[i, i] = 1
+            if x + 1 < n:
+                adj[i, i + n] = 1
+                adj[i + n, i] = 1
+            if y + 1 < n:
+                adj[i, i + 1] = 1
+                adj[i + 1, i] = 1
+    return adj
+
+
+def sparse_loop(adj0, n_iter, report):
+    adj = disc._Relation.from_matrix(adj0)
+    transitions = disc._Relation(len(adj))
+    IJ = disc._reachable_pairs(1, adj)
+    t0 = time.time()
+    for it in range(1, n_iter + 1):
+        j, i = IJ.pop()
+        new = len(adj)
+        transitions.grow(1)
+        transitions.clear_row(i)
+        transitions.add(j, i)
+        moved = sorted(adj.row(i) - {i})[::2]
+        adj.grow(1)
+        adj.add(i, new)
+        adj.add(new, i)
+        adj.add(new, new)
+        for k in moved:
+            adj.discard(i, k)
+            adj.discard(k, i)
+            adj.add(new, k)
+            adj.add(k, new)
+        IJ.grow(1)
+        disc._sym_adj_change(IJ, adj, 1, transitions, i)
+        disc._sym_adj_change(IJ, adj, 1, transitions, new)
+        if it % report == 0:
+            t1 = time.time()
+            yield len(adj), (t1 - t0) / report
+            t0 = t1
+
+
+def dense_loop(adj0, n_iter, report):
+    adj = np.array(adj0.todense())
+    transitions = np.zeros(adj.shape, dtype=int)
+    IJ = adj.copy()
+    t0 = time.time()
+    for it in range(1, n_iter + 1):
+        ind = np.nonzero(IJ)
+        i = ind[1][0]
+        j = ind[0][0]
+        IJ[j, i] = 0
+        new = adj.shape[0]
+        transitions = np.pad(transitions, (0, 1), 'constant')
+        transitions[i, :] = 0
+        transitions[j, i] = 1
+        old_adj = np.nonzero(adj[i, :])[0]
+        moved = old_adj[old_adj != i][::2]
+        adj = np.pad(adj, (0, 1), 'constant')
+        adj[i, new] = 1
+        adj[new, i] = 1
+        adj[new, new] = 1
+        adj[i, moved] = 0
+        adj[moved, i] = 0
+        adj[new, moved] = 1
+        adj[moved, new] = 1
+        IJ = np.pad(IJ, (0, 1), 'constant')
+        adj_k = disc.reachable_within(1, adj, adj)
+        disc.sym_adj_change(IJ, adj_k, transitions, i)
+        disc.sym_adj_change(IJ, adj_k, transitions, new)
+        np.sum(IJ)
+        if it % report == 0:
+            t1 = time.time()
+            yield adj.shape[0], (t1 - t0) / report
+            t0 = t1
+
+
+def main():
+    n_iter = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    report = max(n_iter // 8, 1)
+    adj0 = grid_adjacency(10)
+    print('{:>8} {:>16} {:>16}'.format(
+        'cells', 'sparse [us/it]', 'dense [us/it]'))
+    # run each loop to completion, so that timings do not interleave
+    rows = zip(
+        list(sparse_loop(adj0, n_iter, report)),
+        list(dense_loop(adj0, n_iter, report)))
+    for (n, ts), (_, td) in rows:
+        print('{:>8} {:>16.1f} {:>16.1f}'.format(n, 1e6 * ts, 1e6 * td))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""Compare the code exported by `python_case` and `python_table`.
+
+The machine has a few Boolean input ports, and from each state
+one transition for each input valuation, to a random state.
+For each export, the time of generating the code, its size,
+the time of executing it (which compiles it), and the time
+of moves along a random run are reported.
+
+usage: python dumpsmach_export.py [n_states] [n_inputs] [n_moves]
+"""
+from __future__ import print_function
+
+import itertools
+import random
+import sys
+import time
+
+import networkx as nx
+
+from tulip import dumpsmach
+
+
+def random_machine(n, n_inputs=4, seed=0):
+    """Return `networkx.MultiDiGraph` with `n` states, as a Mealy machine."""
+    rnd = random.Random(seed)
+    g = nx.MultiDiGraph()
+    g.inputs = {'x{i}'.format(i=i): {0, 1} for i in range(n_inputs)}
+    g.outputs = {'y': {0, 1}, 'z': {0, 1}}
+    g.add_nodes_from(range(n))
+    valuations = list(itertools.product((0, 1), repeat=n_inputs))
+    for i in range(n):
+        for values in valuations:
+            label = dict(zip(g.inputs, values))
+            label.update(y=rnd.randint(0, 1), z=rnd.randint(0, 1))
+            g.add_edge(i, rnd.randrange(n), **label)
+    return g
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_inputs = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    n_moves = int(sys.argv[3]) if len(sys.argv) > 3 else 10**5
+    g = random_machine(n, n_inputs)
+    print('{n} states, {m} transitions'.format(
+        n=len(g), m=g.number_of_edges()))
+    rnd = random.Random(1)
+    inputs = [{k: rnd.randint(0, 1) for k in g.inputs}
+              for i in range(n_moves)]
+    runs = dict()
+    for export in (dumpsmach.python_case, dumpsmach.python_table):
+        t0 = time.time()
+        code = export(g, start=0)
+        t1 = time.time()
+        namespace = dict()
+        exec(code, namespace)
+        t2 = time.time()
+        m = namespace['TulipStrategy']()
+        outputs = [m.move(**x) for x in inputs]
+        t3 = time.time()
+        runs[export.__name__] = outputs
+        print(
+            '{name}: generated {size:.1f} MB in {t:.1f} sec, '
+            'executed in {e:.1f} sec, {k} moves in {r:.2f} sec'.format(
+                name=export.__name__, size=len(code) / 1e6, t=t1 - t0,
+                e=t2 - t1, k=n_moves, r=t3 - t2))
+    assert runs['python_case'] == runs['python_table']
+
+
+if __name__ == '__main__':
+    main()
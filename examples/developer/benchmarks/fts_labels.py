@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""Time construction of a large labeled transition system.
+
+Each state is labeled with a random subset of a few
+atomic propositions, and each transition with a random
+system action, once checking each label as it is added,
+and once with compact labels, checked in bulk.
+
+usage: python fts_labels.py [n_states]
+"""
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+from tulip import transys as trs
+
+
+def random_fts(n, compact, max_degree=5, seed=0):
+    """Return FTS with `n` states."""
+    rnd = random.Random(seed)
+    aps = ['p', 'q', 'r']
+    actions = ['a', 'b', 'c', 'd']
+    ts = trs.FTS()
+    ts.compact_labels = compact
+    ts.atomic_propositions.add_from(aps)
+    ts.sys_actions.add_from(actions)
+    ts.states.add_from(
+        (i, dict(ap={x for x in aps if rnd.random() < 0.5}))
+        for i in range(n))
+    ts.transitions.add_from(
+        (i, rnd.randrange(n), dict(sys_actions=a))
+        for i in range(n)
+        for a in rnd.sample(actions, rnd.randint(1, max_degree - 1)))
+    return ts
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    for compact in (False, True):
+        t0 = time.time()
+        ts = random_fts(n, compact)
+        t1 = time.time()
+        print('compact_labels={c}: {n} states, {m} transitions '
+              'in {t:.1f} sec'.format(
+                  c=compact, n=len(ts), m=ts.number_of_edges(),
+                  t=t1 - t0))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""Time runs of a random Mealy machine over long input sequences.
+
+The machine has a few Boolean input ports, and from each state
+one transition for each input valuation, so it is input-deterministic.
+The steps are run as one trace with `guided_run`,
+and as many traces with `simulate_batch`.
+
+usage: python mealy_run.py [n_steps] [n_states] [n_inputs] [n_traces]
+"""
+from __future__ import print_function
+
+import itertools
+import random
+import sys
+import time
+
+from tulip.transys import machines
+
+
+def random_mealy(n, n_inputs=4, seed=0):
+    """Return `MealyMachine` with `n` states and random transitions."""
+    rnd = random.Random(seed)
+    inputs = ['x{i}'.format(i=i) for i in range(n_inputs)]
+    mealy = machines.MealyMachine()
+    mealy.add_inputs({x: {0, 1} for x in inputs})
+    mealy.add_outputs({'y': {0, 1}})
+    mealy.states.add_from(range(n))
+    mealy.states.initial.add(0)
+    valuations = list(itertools.product((0, 1), repeat=n_inputs))
+    for i in range(n):
+        for values in valuations:
+            label = dict(zip(inputs, values))
+            label['y'] = rnd.randint(0, 1)
+            mealy.transitions.add(i, rnd.randrange(n), **label)
+    return mealy
+
+
+def main():
+    n_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    n_inputs = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    n_traces = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    t0 = time.time()
+    mealy = random_mealy(n, n_inputs)
+    t1 = time.time()
+    print('{n} states, {m} transitions, built in {t:.1f} sec'.format(
+        n=len(mealy), m=mealy.number_of_edges(), t=t1 - t0))
+    rnd = random.Random(1)
+    seqs = {x: [rnd.randint(0, 1) for i in range(n_steps)]
+            for x in mealy.inputs}
+    t0 = time.time()
+    states, outputs = machines.guided_run(mealy, input_sequences=seqs)
+    t1 = time.time()
+    print('guided_run: {k} steps in {t:.1f} sec'.format(
+        k=len(states), t=t1 - t0))
+    shape = (n_traces, n_steps // n_traces)
+    seqs = {x: [[rnd.randint(0, 1) for j in range(shape[1])]
+                for i in range(shape[0])]
+            for x in mealy.inputs}
+    t0 = time.time()
+    states, outputs, lengths = machines.simulate_batch(mealy, seqs)
+    t1 = time.time()
+    print('simulate_batch: {n} traces of {k} steps in {t:.1f} sec'.format(
+        n=shape[0], k=shape[1], t=t1 - t0))
+
+
+if __name__ == '__main__':
+    main()
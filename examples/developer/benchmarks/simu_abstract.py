@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+"""Time bi/dual-simulation abstraction of random transition systems.
+
+Each state is labeled with one of a few atomic propositions,
+and has a random number of successors, chosen uniformly.
+The time of building the transition system is reported separately,
+because it is not part of `simu_abstract`.
+
+The dual-simulation cover of a random system has many more cells
+than states, so it is computed for a smaller system.
+
+usage: python simu_abstract.py [n_states] [n_states_dual]
+"""
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+from tulip import transys as trs
+from tulip.transys.transys import simu_abstract
+
+
+def random_fts(n, max_degree=3, n_aps=4, seed=0):
+    """Return `FTS` with `n` states and random transitions."""
+    rnd = random.Random(seed)
+    aps = ['p{i}'.format(i=i) for i in range(n_aps)]
+    ts = trs.FTS()
+    ts.atomic_propositions.add_from(aps)
+    ts.states.add_from(
+        (i, dict(ap={rnd.choice(aps)})) for i in range(n))
+    ts.states.initial.add(0)
+    for i in range(n):
+        succ = {rnd.randrange(n)
+                for k in range(rnd.randint(1, max_degree))}
+        ts.transitions.add_from((i, j) for j in succ)
+    return ts
+
+
+def main():
+    n_bi = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    n_dual = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    for simu_type, n in [('bi', n_bi), ('dual', n_dual)]:
+        t0 = time.time()
+        ts = random_fts(n)
+        t1 = time.time()
+        print('{n} states, {m} transitions, built in {t:.1f} sec'.format(
+            n=len(ts), m=ts.number_of_edges(), t=t1 - t0))
+        t0 = time.time()
+        ts_simu, part = simu_abstract(ts, simu_type)
+        t1 = time.time()
+        print('{s}: {n} cells, {m} transitions, in {t:.1f} sec'.format(
+            s=simu_type, n=len(ts_simu),
+            m=ts_simu.number_of_edges(), t=t1 - t0))
+
+
+if __name__ == '__main__':
+    main()
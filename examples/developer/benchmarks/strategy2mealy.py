@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+"""Time conversion of a random strategy to a Mealy machine.
+
+Each strategy node is labeled with random values of a few
+Boolean and integer variables, and has a few random successors.
+
+usage: python strategy2mealy.py [n_nodes]
+"""
+from __future__ import print_function
+
+import random
+import sys
+import time
+
+import networkx as nx
+
+from tulip import spec, synth
+
+
+def random_strategy(n, max_degree=3, seed=0):
+    """Return specification and strategy graph with `n` nodes."""
+    rnd = random.Random(seed)
+    specs = spec.GRSpec(
+        env_vars={'x0': 'boolean', 'x1': 'boolean'},
+        sys_vars={'y0': 'boolean', 'y1': (0, 7), 'y2': ['a', 'b', 'c']},
+        env_init=['x0'],
+        sys_init=['y1 = 0'])
+    g = nx.DiGraph()
+    for i in range(n):
+        state = dict(
+            x0=rnd.choice([False, True]), x1=rnd.choice([False, True]),
+            y0=rnd.choice([False, True]), y1=rnd.randint(0, 7),
+            y2=rnd.randint(0, 2))
+        g.add_node(i, state=state)
+    for i in range(n):
+        g.add_edges_from(
+            (i, rnd.randrange(n))
+            for k in range(rnd.randint(1, max_degree)))
+    return specs, g
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    specs, g = random_strategy(n)
+    print('{n} nodes, {m} edges'.format(
+        n=len(g), m=g.number_of_edges()))
+    t0 = time.time()
+    mach = synth.strategy2mealy(g, specs)
+    t1 = time.time()
+    print('strategy2mealy: {m} transitions in {t:.1f} sec'.format(
+        m=mach.number_of_edges(), t=t1 - t0))
+
+
+if __name__ == '__main__':
+    main()
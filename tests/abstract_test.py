@@ -7,6 +7,8 @@ logger = logging.getLogger(__name__)
 # logging.getLogger('tulip').setLevel(logging.ERROR)
 logger.setLevel(logging.DEBUG)
 
+import itertools
+
 from nose.tools import assert_raises
 
 import matplotlib
@@ -15,8 +17,10 @@ matplotlib.use('Agg')
 
 import networkx as nx
 import numpy as np
+from scipy import sparse as sp
 
 from tulip import abstract
+from tulip.abstract import discretization
 from tulip.abstract import feasible
 from tulip import hybrid
 import polytope as pc
@@ -289,6 +293,124 @@ def test_abstract_the_dynamics_dual():
 test_abstract_the_dynamics_dual.slow = True
 
 
+def test_discretize_workers():
+    """Result of batched refinement does not depend on `workers`."""
+    sys_dyn, cont_partition, part = define_dynamics_dual()
+    disc_options = {'N': 1, 'trans_length': 1, 'min_cell_volume': 0.0}
+    for simu_type in ('bi', 'dual'):
+        abs_1 = abstract.discretize(
+            cont_partition, sys_dyn, simu_type=simu_type,
+            workers=1, **disc_options)
+        abs_2 = abstract.discretize(
+            cont_partition, sys_dyn, simu_type=simu_type,
+            workers=2, **disc_options)
+        assert len(abs_1.ppp) == len(abs_2.ppp)
+        for r1, r2 in zip(abs_1.ppp.regions, abs_2.ppp.regions):
+            assert r1 == r2
+        assert (abs_1.ppp.adj != abs_2.ppp.adj).nnz == 0
+        assert set(abs_1.ts.transitions()) == set(abs_2.ts.transitions())
+
+
+def test_merge_partitions():
+    """Parallel merging gives the same regions as sequential merging."""
+    cont_state_space = pc.box2poly([[0.0, 3.0], [0.0, 2.0]])
+    cont_props = dict()
+    cont_props['home'] = pc.box2poly([[0.0, 1.0], [0.0, 1.0]])
+    cont_props['lot'] = pc.box2poly([[2.0, 3.0], [1.0, 2.0]])
+    ppp = abstract.prop2part(cont_state_space, cont_props)
+    ppp, new2old = abstract.part2convex(ppp)
+    drift = subsys0()
+    drift.K = np.array([[0.2], [0.1]])
+    abstractions = dict()
+    for mode, sys_dyn in enumerate([subsys0(), subsys1(), drift]):
+        abstractions[mode] = abstract.discretize(
+            ppp, sys_dyn, N=1, trans_length=1)
+    merged, ap_labeling = discretization.merge_partitions(abstractions)
+
+    def regions_by_parents(abstraction):
+        parents = abstraction.ppp2modes
+        return {
+            tuple(parents[mode][i] for mode in abstractions): region
+            for i, region in enumerate(abstraction.ppp.regions)}
+
+    expected = regions_by_parents(merged)
+    assert sp.issparse(merged.ppp.adj), type(merged.ppp.adj)
+    for workers in (1, 2):
+        merged_2, ap_labeling_2 = discretization.multiproc_merge_partitions(
+            abstractions, workers=workers)
+        assert len(merged_2.ppp) == len(merged.ppp)
+        found = regions_by_parents(merged_2)
+        assert set(found) == set(expected), (found, expected)
+        for key, region in found.items():
+            assert region == expected[key], key
+            assert region.props == expected[key].props, key
+    # each region is in a single region of the partition of each mode
+    for mode, ab in abstractions.items():
+        for i, region in enumerate(merged.ppp.regions):
+            parent = merged.ppp2modes[mode][i]
+            assert region <= ab.ppp.regions[parent], (mode, i)
+
+
+def test_get_max_extreme():
+    """Decomposed maximum equals maximum over vertices of D^N."""
+    D = pc.box2poly([[-1.0, 2.0], [-0.5, 0.5]])
+    N = 3
+    rng = np.random.RandomState(0)
+    G = rng.randn(7, 2 * N)
+    d_hat = feasible.get_max_extreme(G, D, N)
+    D_extreme = pc.extreme(D)
+    vertices = [
+        np.hstack(v)
+        for v in itertools.product(D_extreme, repeat=N)]
+    expected = np.amax(G.dot(np.array(vertices).T), axis=1)
+    assert d_hat.shape == (7, 1), d_hat.shape
+    assert np.allclose(d_hat.flatten(), expected), (d_hat, expected)
+
+
+def test_horizon_model():
+    """Stacked dynamics equal simulated trajectories."""
+    rng = np.random.RandomState(0)
+    n, m, p, N = 3, 2, 1, 4
+    A = rng.randn(n, n)
+    B = rng.randn(n, m)
+    E = rng.randn(n, p)
+    K = rng.randn(n, 1)
+    # constraints on [u; x]
+    U = pc.box2poly([[-1.0, 1.0]] * (m + n))
+    W = pc.box2poly([[-0.1, 0.1]] * p)
+    dom = pc.box2poly([[-10.0, 10.0]] * n)
+    sys = hybrid.LtiSysDyn(A, B, E, K, U, W, dom)
+    hm = feasible.horizon_model(sys, N)
+    x0 = rng.randn(n, 1)
+    u = rng.randn(N * m, 1)
+    d = rng.randn(N * p, 1)
+    xu = np.vstack([x0, u])
+    x = x0
+    for k in range(N + 1):
+        xk = hm.AB[k].dot(xu) + hm.AE[k].dot(d) + hm.AK[k]
+        assert np.allclose(xk, x), (k, xk, x)
+        if k < N:
+            uk = u[k * m:(k + 1) * m]
+            dk = d[k * p:(k + 1) * p]
+            # input constraints without disturbance
+            LUn = U.A.shape[0]
+            rows = slice(k * LUn, (k + 1) * LUn)
+            lhs = hm.LU[rows].dot(xu) + hm.GU[rows].dot(d) - hm.MU[rows]
+            rhs = U.A.dot(np.vstack([uk, x])) - U.b.reshape(LUn, 1)
+            assert np.allclose(lhs, rhs), (k, lhs, rhs)
+            x = A.dot(x) + B.dot(uk) + E.dot(dk) + K
+    # computed once, and again when the system changes
+    assert feasible.horizon_model(sys, N) is hm
+    assert feasible.horizon_model(sys, N + 1) is not hm
+    sys.K = 2 * K
+    hm_2 = feasible.horizon_model(sys, N)
+    assert hm_2 is not hm
+    assert np.allclose(hm_2.AK, 2 * hm.AK)
+    # changed in place
+    sys.K[0] += 1
+    assert feasible.horizon_model(sys, N) is not hm_2
+
+
 def test_is_feasible():
     """Difference between attractor and fixed horizon."""
     dom = pc.box2poly([[0.0, 4.0], [0.0, 3.0]])
@@ -314,6 +436,182 @@ def drifting_dynamics(dom):
     return sys
 
 
+def test_sparse_refinement_relations():
+    """Worklist agrees with dense `IJ` used by `reachable_within`."""
+    adj = np.array([[1, 1, 0, 0],
+                    [1, 1, 1, 0],
+                    [0, 1, 1, 1],
+                    [0, 0, 1, 0]])
+    transitions = np.zeros_like(adj)
+    transitions[2, 1] = 1
+    rel = discretization._Relation.from_matrix(adj)
+    trans = discretization._Relation.from_matrix(transitions)
+    for trans_length in (1, 2, 3):
+        adj_k = discretization.reachable_within(trans_length, adj, adj)
+        IJ = discretization._reachable_pairs(trans_length, rel)
+        IJ_dense = np.zeros_like(adj)
+        for i in (1, 3):
+            discretization.sym_adj_change(IJ_dense, adj_k, transitions, i)
+            discretization._sym_adj_change(
+                IJ, rel, trans_length, trans, i)
+        # pairs are popped in the order of `np.nonzero`
+        dense = list(zip(*np.nonzero(adj_k)))
+        for i in (1, 3):
+            dense = [(r, c) for r, c in dense if i not in (r, c)]
+        dense.extend(zip(*np.nonzero(IJ_dense)))
+        popped = list()
+        while IJ:
+            popped.append(IJ.pop())
+        assert popped == sorted(set(dense)), (popped, dense)
+    assert (rel.tolil().toarray() == adj).all()
+
+
+def test_pre_cache():
+    """Cached reachable sets equal computed ones, and are counted."""
+    dom = pc.box2poly([[0.0, 4.0], [0.0, 3.0]])
+    sys = drifting_dynamics(dom)
+    p1 = pc.box2poly([[0.0, 1.0], [0.0, 1.0]])
+    p2 = pc.box2poly([[1.0, 2.0], [0.0, 1.0]])
+    s0 = feasible.solve_feasible(p1, p2, sys, N=2)
+    cache = abstract.PreCache()
+    s1 = feasible.solve_feasible(p1, p2, sys, N=2, pre_cache=cache)
+    misses = cache.misses
+    assert cache.hits == 0, cache.hits
+    assert misses > 0, misses
+    # same polytope, with scaled and permuted constraints
+    q2 = pc.Polytope(2.0 * p2.A[::-1], 2.0 * p2.b[::-1])
+    s2 = feasible.solve_feasible(p1, q2, sys, N=2, pre_cache=cache)
+    assert cache.hits == 1, cache.hits
+    assert cache.misses == misses, cache.misses
+    assert s0 == s1, (s0, s1)
+    assert s0 == s2, (s0, s2)
+    # results are copied, so changing them leaves the cache intact
+    assert s1 is not s2
+    # other dynamics are a different key
+    sys.K = np.array([[0.5], [0.0]])
+    feasible.solve_feasible(p1, p2, sys, N=2, pre_cache=cache)
+    assert cache.hits == 1, cache.hits
+    assert cache.misses > misses, cache.misses
+
+
+def test_pre_cache_create_lm():
+    """Cached (L, M) follow the constraints of each polytope as given."""
+    dom = pc.box2poly([[0.0, 4.0], [0.0, 3.0]])
+    sys = drifting_dynamics(dom)
+    p = pc.box2poly([[0.0, 1.0], [0.0, 1.0]])
+    # same polytope, with a duplicated row
+    q = pc.Polytope(np.vstack([p.A, p.A[:1]]), np.hstack([p.b, p.b[:1]]),
+                    normalize=False)
+    # same polytope, with rescaled rows
+    r = pc.Polytope(2.0 * p.A, 2.0 * p.b, normalize=False)
+    cache = abstract.PreCache()
+    feasible.createLM(sys, 1, [p, p], pre_cache=cache)
+    for list_P in ([q, p], [r, p], [p, p]):
+        L0, M0 = feasible.createLM(sys, 1, list_P)
+        L, M = feasible.createLM(sys, 1, list_P, pre_cache=cache)
+        assert L.shape == L0.shape, (L.shape, L0.shape)
+        assert np.array_equal(L, L0)
+        assert np.array_equal(M, M0)
+    assert cache.hits == 1, cache.hits
+
+
+def test_pre_cache_lru():
+    cache = feasible.PreCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert 'a' in cache
+    assert 'c' in cache
+    assert cache.get('b') is None
+    assert len(cache) == 2, len(cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+    with assert_raises(ValueError):
+        feasible.PreCache(maxsize=0)
+
+
+def test_discretize_pre_cache():
+    """Discretizing again reuses reachable sets."""
+    sys_dyn, cont_partition, part = define_dynamics_dual()
+    disc_options = {'N': 1, 'trans_length': 1, 'min_cell_volume': 0.0}
+    for workers in (None, 2):
+        cache = abstract.PreCache()
+        ab_1 = abstract.discretize(
+            cont_partition, sys_dyn, workers=workers,
+            pre_cache=cache, **disc_options)
+        assert cache.misses > 0, cache.misses
+        hits = cache.hits
+        ab_2 = abstract.discretize(
+            cont_partition, sys_dyn, workers=workers,
+            pre_cache=cache, **disc_options)
+        assert cache.hits > hits, cache.hits
+        assert len(ab_1.ppp) == len(ab_2.ppp)
+        for r1, r2 in zip(ab_1.ppp.regions, ab_2.ppp.regions):
+            assert r1 == r2
+        assert set(ab_1.ts.transitions()) == set(ab_2.ts.transitions())
+
+
+def test_online_controller():
+    """`OnlineController` computes the same inputs as `get_input`."""
+    sys_dyn, cont_partition, part = define_dynamics_dual()
+    disc_options = {'N': 2, 'trans_length': 1, 'min_cell_volume': 0.0}
+    ab = abstract.discretize(cont_partition, sys_dyn, **disc_options)
+    for ord, mid_weight in [(1, 0.0), (np.inf, 2.0)]:
+        controller = abstract.OnlineController(
+            sys_dyn, ab, ord=ord, mid_weight=mid_weight)
+        for start, end in ab.ts.transitions():
+            r, x0 = pc.cheby_ball(ab.ppp.regions[start])
+            x0 = np.array(x0).flatten()
+            u = controller.get_input(x0, start, end)
+            u_ref = abstract.get_input(
+                x0, sys_dyn, ab, start, end,
+                ord=ord, mid_weight=mid_weight)
+            assert u.shape == (2, 1), u.shape
+            assert np.allclose(u, u_ref), (u, u_ref)
+    missing = {(i, j) for i in ab.ts for j in ab.ts}
+    missing.difference_update(ab.ts.transitions())
+    if missing:
+        start, end = missing.pop()
+        with assert_raises(Exception):
+            controller.get_input(x0, start, end)
+
+
+def test_explicit_controller():
+    """`ExplicitController` attains the optimal cost of `get_input`."""
+    sys_dyn, cont_partition, part = define_dynamics_dual()
+    disc_options = {'N': 2, 'trans_length': 1, 'min_cell_volume': 0.0}
+    ab = abstract.discretize(cont_partition, sys_dyn, **disc_options)
+    for ord, mid_weight in [(1, 0.0), (np.inf, 2.0)]:
+        controller = abstract.ExplicitController(
+            sys_dyn, ab, ord=ord, mid_weight=mid_weight)
+        online = abstract.OnlineController(
+            sys_dyn, ab, ord=ord, mid_weight=mid_weight)
+        for start, end in ab.ts.transitions():
+            laws = controller.laws[(start, end)]
+            programs = online._programs[(start, end)]
+            P = ab.ppp.regions[start]
+            (lo, hi) = P.bounding_box
+            for t in np.linspace(0.05, 0.95, 5):
+                x0 = (lo + t * (hi - lo)).flatten()
+                if x0 not in P:
+                    continue
+                for law, program in zip(laws, programs):
+                    r = law.evaluate(x0)
+                    assert r is not None, x0
+                    u, cost = r
+                    u_ref, cost_ref = program.solve(x0)
+                    assert u.shape == (2, 1), u.shape
+                    assert np.isclose(cost, cost_ref), (cost, cost_ref)
+                u = controller.get_input(x0, start, end)
+                assert u.shape == (2, 1), u.shape
+    with assert_raises(ValueError):
+        abstract.ExplicitController(sys_dyn, ab, ord=2)
+
+
 if __name__ == '__main__':
     test_abstract_the_dynamics()
     test_abstract_the_dynamics_dual()
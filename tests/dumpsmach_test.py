@@ -53,6 +53,15 @@ class basic_test(object):
                      +'\nM = TulipStrategy(); M.move()',
                      filename="<string>", mode="exec"))
 
+    def test_python_table(self):
+        compile(dumpsmach.python_table(self.triv_M),
+                filename="<string>", mode="exec")
+        compile(dumpsmach.python_table(self.dcounter_M),
+                filename="<string>", mode="exec")
+        exec(compile(dumpsmach.python_table(self.enumf_M)
+                     +'\nM = TulipStrategy(); M.move()',
+                     filename="<string>", mode="exec"))
+
 
 def test_nx():
     g = nx.DiGraph()
@@ -81,3 +90,52 @@ def test_nx():
     # dead-end
     with assert_raises(Exception):
         m.move(a=1, b=0)
+
+
+def test_nx_table():
+    g = nx.DiGraph()
+    g.inputs = {'a': '...', 'b': '...'}
+    g.outputs = {'c': '...', 'd': '...'}
+    start = 'Sinit'
+    g.add_edge(start, 0, a=0, b=0, c=0, d=0)
+    g.add_edge(0, 1, a=0, b=1, c=0, d='on')
+    g.add_edge(1, 2, a=1, b=0, c=1, d='off')
+    g.add_edge(2, 1, a=1, c=0, d='on')
+    exe_globals = dict()
+    exec(dumpsmach.python_table(g, classname='Machine', start='Sinit'),
+         exe_globals)
+    m = exe_globals['Machine']()
+    assert m.input_vars == ['a', 'b'], m.input_vars
+    # Sinit -> 0
+    out = m.move(a=0, b=0)
+    assert out == dict(c=0, d=0)
+    # 0 -> 1
+    out = m.move(a=0, b=1)
+    assert out == dict(c=0, d='on')
+    # invalid input
+    with assert_raises(ValueError):
+        m.move(a=1, b=1)
+    with assert_raises(ValueError):
+        m.move(a=1, b=2)
+    # 1 -> 2
+    out = m.move(a=1, b=0)
+    assert out == dict(c=1, d='off')
+    # 2 -> 1, for any value of `b`
+    out = m.move(a=1, b=1)
+    assert out == dict(c=0, d='on')
+    m.state = 3
+    out = m.move(a=1, b='other')
+    assert out == dict(c=0, d='on')
+    # internal states are numbered in order of `g.nodes`
+    m.state = 3
+    out = m.move(a=1, b=0)
+    assert out == dict(c=0, d='on')
+    # dead-end
+    g.add_node(3)
+    g.add_edge(1, 3, a=0, b=0, c=0, d=0)
+    exec(dumpsmach.python_table(g, classname='Machine', start='Sinit'),
+         exe_globals)
+    m = exe_globals['Machine']()
+    m.state = 4
+    with assert_raises(Exception):
+        m.move(a=0, b=0)
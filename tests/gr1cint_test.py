@@ -8,10 +8,17 @@ import logging
 logging.basicConfig(level=logging.DEBUG)
 logging.getLogger('tulip.spec.lexyacc').setLevel(logging.WARNING)
 import networkx as nx
-from nose.tools import raises
+import nose
+from nose.tools import assert_raises, raises
+import io
 import os
+import shutil
+import stat
+import sys
+import tempfile
 from tulip.spec import GRSpec, translate
 from tulip.interfaces import gr1c
+import xml.etree.ElementTree as ET
 
 
 REFERENCE_SPECFILE = """
@@ -213,6 +220,108 @@ class GR1CSession_test(object):
             {"x": 0, "ze": 0}, 0) == [{'y': 0, 'zs': 0}, {'y': 1, 'zs': 0}]
 
 
+# Stands in for `gr1c -i`, with the same prompt and answer format.
+# Ordering is x ze y zs. A state is winning if, and only if, zs = 0.
+STUB_GR1C = """
+import sys
+while True:
+    sys.stdout.write(">>> ")
+    sys.stdout.flush()
+    line = sys.stdin.readline()
+    if not line:
+        break
+    words = line.split()
+    cmd, vec = words[0], [int(w) for w in words[1:]]
+    if cmd == "quit":
+        break
+    elif cmd == "numgoals":
+        print(3)
+    elif cmd == "winning":
+        print(vec[3] == 0)
+    elif cmd == "envnext":
+        for x in (0, 1):
+            print(x, vec[3])
+        print("---")
+    elif cmd == "sysnext":
+        for y in (0, 1):
+            print(y, 0)
+        print("---")
+    sys.stdout.flush()
+"""
+
+
+class GR1CSessionPool_test(object):
+    def setUp(self):
+        self.bin_prefix = gr1c.GR1C_BIN_PREFIX
+        self.tmpdir = tempfile.mkdtemp()
+        stub = os.path.join(self.tmpdir, "gr1c")
+        with open(stub, "w") as f:
+            f.write("#!" + sys.executable + "\n" + STUB_GR1C)
+        os.chmod(stub, os.stat(stub).st_mode | stat.S_IEXEC)
+        gr1c.GR1C_BIN_PREFIX = self.tmpdir + os.sep
+        self.pool = gr1c.GR1CSessionPool("stub.spc",
+                                         env_vars=["x", "ze"],
+                                         sys_vars=["y", "zs"],
+                                         size=3)
+        self.states = [{"x": i % 2, "ze": 0, "y": 1, "zs": (i // 2) % 2}
+                       for i in range(10)]
+
+    def tearDown(self):
+        assert self.pool.close()
+        gr1c.GR1C_BIN_PREFIX = self.bin_prefix
+        shutil.rmtree(self.tmpdir)
+
+    def test_iswinning(self):
+        r = self.pool.iswinning(self.states)
+        assert r == [s["zs"] == 0 for s in self.states], r
+        gs = self.pool.sessions[0]
+        assert gs.iswinning_batch(self.states) == r
+        assert [gs.iswinning(s) for s in self.states] == r
+        assert self.pool.iswinning([]) == []
+
+    def test_env_next(self):
+        r = self.pool.env_next(self.states)
+        assert len(r) == len(self.states), r
+        for s, moves in zip(self.states, r):
+            assert moves == [{"x": 0, "ze": s["zs"]},
+                             {"x": 1, "ze": s["zs"]}], moves
+        gs = self.pool.sessions[1]
+        assert gs.env_next_batch(self.states) == r
+
+    def test_sys_nextfeas(self):
+        queries = [(s, {"x": 0, "ze": 0}, i % 3)
+                   for i, s in enumerate(self.states)]
+        r = self.pool.sys_nextfeas(queries)
+        assert r == len(queries) * [[{"y": 0, "zs": 0},
+                                     {"y": 1, "zs": 0}]], r
+        gs = self.pool.sessions[2]
+        assert gs.sys_nextfeas_batch(queries) == r
+
+    @raises(ValueError)
+    def test_sys_nextfeas_goal_mode(self):
+        self.pool.sys_nextfeas([(self.states[0], {"x": 0, "ze": 0}, 3)])
+
+    @raises(ValueError)
+    def test_sys_nextfeas_goal_mode_busy(self):
+        # goal modes are checked without waiting for an idle session
+        for _ in self.pool.sessions:
+            self.pool._idle.get()
+        self.pool.sys_nextfeas([(self.states[0], {"x": 0, "ze": 0}, 3)])
+
+    def test_async(self):
+        try:
+            import asyncio
+        except ImportError:
+            raise nose.SkipTest('asyncio requires Python 3')
+        loop = asyncio.new_event_loop()
+        futures = [self.pool.iswinning_async(self.states, loop=loop),
+                   self.pool.env_next_async(self.states, loop=loop)]
+        r, moves = loop.run_until_complete(asyncio.gather(*futures))
+        loop.close()
+        assert r == [s["zs"] == 0 for s in self.states], r
+        assert len(moves) == len(self.states), moves
+
+
 def test_aut_xml2mealy():
     g = gr1c.load_aut_xml(REFERENCE_AUTXML)
     assert g.env_vars == {"x": "boolean"}
@@ -250,6 +359,53 @@ def test_load_aut_json():
     assert h_edges == g_edges, (h_edges, g_edges)
 
 
+def test_load_aut_xml_streaming():
+    elem = ET.fromstring(REFERENCE_AUTXML)
+    graphs = [gr1c.load_aut_xml(REFERENCE_AUTXML),
+              gr1c.load_aut_xml(io.StringIO(u'' + REFERENCE_AUTXML)),
+              gr1c.load_aut_xml(elem)]
+    for g in graphs:
+        assert set(g) == {0, 1, 2}, g.nodes()
+        assert g.nodes[2]['state'] == dict(x=1, y=1), g.nodes[2]
+        assert set(g.edges()) == {(0, 1), (0, 2), (1, 1), (1, 2),
+                                  (2, 1), (2, 0)}, g.edges()
+    # a parsed tree is left intact
+    assert len(elem.find(
+        '{http://tulip-control.sourceforge.net/ns/1}aut')) == 3
+
+
+def test_iter_json_items():
+    items = list(gr1c.iter_json_items(
+        io.StringIO(u'' + REFERENCE_AUTJSON_smallbool)))
+    keys = [k for k, _ in items]
+    assert keys[:6] == ['version', 'gr1c', 'date', 'extra',
+                        'ENV', 'SYS'], keys
+    assert keys[6:] == [('nodes', '0x1E8FA40'), ('nodes', '0x1E8FA00'),
+                        ('nodes', '0x1E8F990')], keys
+    # values split across chunks
+    for chunk_size in range(1, 8):
+        r = list(gr1c.iter_json_items(
+            io.StringIO(u'' + REFERENCE_AUTJSON_smallbool),
+            chunk_size=chunk_size))
+        assert r == items, (chunk_size, r)
+    r = list(gr1c.iter_json_items(io.StringIO(u'{"a": 12345}'),
+                                  chunk_size=2))
+    assert r == [('a', 12345)], r
+    # numbers cut at any chunk boundary
+    doc = u'{"version": 1.25, "n": -3e+2, "b": true, "nodes": {"0": 10}}'
+    expected = [('version', 1.25), ('n', -300.0), ('b', True),
+                (('nodes', '0'), 10)]
+    for chunk_size in range(1, len(doc) + 2):
+        r = list(gr1c.iter_json_items(io.StringIO(doc),
+                                      chunk_size=chunk_size))
+        assert r == expected, (chunk_size, r)
+    r = list(gr1c.iter_json_items(io.StringIO(u' {"nodes": {}} ')))
+    assert r == [], r
+    for s in ['', 'Specification is not realizable.', '{"a": [1, 2']:
+        with assert_raises(ValueError):
+            list(gr1c.iter_json_items(io.StringIO(u'' + s)))
+
+
 @raises(ValueError)
 def synth_init_illegal_check(init_option):
     spc = GRSpec(moore=False, plus_one=False, qinit=init_option)
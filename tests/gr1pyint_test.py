@@ -65,3 +65,14 @@ class basic_test(object):
         assert len(g.env_vars) == 0
         assert len(g.sys_vars) == 1 and 'y' in g.sys_vars
         assert len(g) == 2, [g.nodes(data=True), g.edges(data=True)]
+
+    def test_strategy_states(self):
+        g = gr1py.synthesize(self.dcounter)
+        assert g.sys_vars == dict(y=(0, 5)), g.sys_vars
+        assert len(g.initial_nodes) == 1, g.initial_nodes
+        (u, ) = g.initial_nodes
+        assert g.nodes[u]['state'] == dict(y=0), g.nodes[u]
+        assert g.nodes[u]['initial'], g.nodes[u]
+        (v, ) = g.successors(u)
+        assert g.nodes[v]['state'] == dict(y=5), g.nodes[v]
+        assert list(g.successors(v)) == [u], g.edges()
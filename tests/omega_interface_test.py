@@ -134,6 +134,43 @@ def test_synthesis_unrealizable():
     assert h is None, h
 
 
+def test_synthesis_symbolic():
+    sp = grspec_4()
+    ctrl = omega_int.synthesize_symbolic_streett(sp)
+    assert ctrl is not None
+    # same reactions as the enumerated machine
+    u = 'Sinit'
+    for x, y in [(0, 'a'), (2, 'b'), (1, 'b'), (0, 'a')]:
+        u, r = ctrl.reaction(u, dict(x=x))
+        assert r == dict(y=y), r
+        assert u['x'] == x, u
+    with nt.assert_raises(ValueError):
+        ctrl.reaction(u, dict())
+    # enumeration on demand
+    h = ctrl.enumerate()
+    g = synth.strategy2mealy(h, sp)
+    n = len(g)
+    assert n == 5, n
+    # unrealizable
+    sp = grspec_0()
+    sp.sys_prog = ['False']
+    ctrl = omega_int.synthesize_symbolic_streett(sp)
+    assert ctrl is None, ctrl
+
+
+def test_synthesize_symbolic():
+    sp = grspec_1()
+    ctrl = synth.synthesize(sp, solver='omega', symbolic=True)
+    assert isinstance(ctrl, omega_int.SymbolicController), ctrl
+    u, r = ctrl.reaction('Sinit', dict(x=2))
+    assert r['y'] in range(4), r
+    for x in (3, 0, 1):
+        u, r = ctrl.reaction(u, dict(x=x))
+        assert r == dict(y=x), r
+    with nt.assert_raises(ValueError):
+        synth.synthesize(sp, solver='gr1py', symbolic=True)
+
+
 def test_is_circular_true():
     f = form.GRSpec()
     f.sys_vars['y'] = 'bool'
@@ -4,7 +4,8 @@ Tests for abstract.prop2partition
 """
 from __future__ import print_function
 
-from tulip.abstract import prop2part
+from tulip.abstract import prop2part, add_grid, pwa_partition
+from tulip import hybrid
 import polytope as pc
 import numpy as np
 
@@ -59,3 +60,91 @@ def prop2part_test():
     # invalidate it
     mypartition.regions += [pc.Region([pc.Polytope(A[0], b[0])], {})]
     assert(not mypartition.preserves_predicates())
+
+def prop2part_check_convex_test():
+    domain = pc.box2poly([[0., 4.], [0., 4.]])
+    cont_props = {
+        'p{i}{j}'.format(i=i, j=j): pc.box2poly(
+            [[2. * i + 0.5, 2. * i + 1.5], [2. * j + 0.5, 2. * j + 1.5]])
+        for i in range(2) for j in range(2)}
+    ppp = prop2part(domain, cont_props)
+    fast = prop2part(domain, cont_props, check_convex=False)
+    assert len(ppp.regions) == 5, len(ppp.regions)
+    assert len(fast.regions) == len(ppp.regions)
+    for r, q in zip(ppp.regions, fast.regions):
+        assert r.props == q.props, (r.props, q.props)
+        assert r == q
+    assert np.all(ppp.adj.todense() == fast.adj.todense())
+    # the complement of the propositions touches each of them
+    (i,) = [i for i, r in enumerate(ppp.regions) if not r.props]
+    assert np.all(ppp.adj.todense()[i] == 1)
+
+def add_grid_test():
+    domain = pc.box2poly([[0., 2.], [0., 1.]])
+    cont_props = {'a': pc.box2poly([[0., 1.], [0., 1.]])}
+    ppp = prop2part(domain, cont_props)
+    grid = add_grid(ppp, num_grid_pnts=[4, 2])
+    assert len(grid.regions) == 8, len(grid.regions)
+    for region in grid.regions:
+        l, u = region.bounding_box
+        if u[0, 0] <= 1. + 1e-7:
+            assert region.props == {'a'}, region.props
+        else:
+            assert not region.props, region.props
+    adj = grid.adj.todense()
+    # cells touching at a corner or side are adjacent
+    for i, r in enumerate(grid.regions):
+        for j, q in enumerate(grid.regions):
+            assert adj[i, j] == pc.is_adjacent(r, q), (i, j)
+
+def pwa_partition_test():
+    domain = pc.box2poly([[0., 3.], [0., 2.]])
+    cont_props = {'home': pc.box2poly([[0., 1.], [0., 1.]])}
+    ppp = prop2part(domain, cont_props)
+    subsystems = list()
+    for box in ([[0., 1.5], [0., 2.]], [[1.5, 3.], [0., 2.]]):
+        subsystems.append(hybrid.LtiSysDyn(
+            np.eye(2), np.eye(2), Uset=pc.box2poly([[0., 1.], [0., 1.]]),
+            domain=pc.box2poly(box)))
+    pwa = hybrid.PwaSysDyn(subsystems, domain)
+    for workers in (None, 2):
+        new_ppp, subsys_list, parents = pwa_partition(
+            pwa, ppp, workers=workers)
+        assert len(new_ppp.regions) == 3, len(new_ppp.regions)
+        assert sorted(subsys_list) == [0, 0, 1], subsys_list
+        adj = new_ppp.adj.todense()
+        for i, r in enumerate(new_ppp.regions):
+            for j, q in enumerate(new_ppp.regions):
+                assert adj[i, j] == pc.is_adjacent(r, q), (i, j)
+
+def locate_test():
+    domain = pc.box2poly([[0., 4.], [0., 2.]])
+    cont_props = {
+        'a': pc.box2poly([[0., 1.], [0., 1.]]),
+        'b': pc.box2poly([[0.5, 0.75], [1.5, 1.75]])}
+    ppp = prop2part(domain, cont_props)
+    rng = np.random.RandomState(0)
+    points = np.vstack([
+        rng.uniform([-1., -1.], [5., 3.], size=(200, 2)),
+        # boundaries
+        [[1., 0.5], [0.5, 1.5], [4., 2.], [0., 0.]]])
+    found = ppp.locate(points)
+    for x, i in zip(points, found):
+        expected = [j for j, r in enumerate(ppp.regions) if x in r]
+        if expected:
+            assert i == expected[0], (x, i, expected)
+        else:
+            assert i == -1, (x, i)
+    # single state
+    (i,) = ppp.locate(np.array([3., 1.]))
+    assert np.array([3., 1.]) in ppp.regions[i]
+    # changed regions are indexed again
+    ppp.regions.reverse()
+    (j,) = ppp.locate(np.array([3., 1.]))
+    assert j == len(ppp.regions) - 1 - i, (i, j)
+    ppp.regions = ppp.regions[::-1]
+    (k,) = ppp.locate(np.array([3., 1.]))
+    assert k == i, (i, k)
+    ppp.regions[i] = ppp.regions[0]
+    (k,) = ppp.locate(np.array([3., 1.]))
+    assert k != i, (i, k)
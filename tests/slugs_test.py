@@ -5,6 +5,8 @@ from __future__ import print_function
 import logging
 
 import networkx as nx
+from dd import bdd as _bdd
+from nose import tools as nt
 from tulip.interfaces import slugs
 from tulip.spec import GRSpec
 
@@ -42,6 +44,63 @@ def bitfields_to_ints_test():
         assert m == {'a': n}
 
 
+SLUGS_JSON = """
+{
+ "version": 0,
+ "slugs": "0.0.1",
+ "variables": ["x", "a@0.0.5", "a@1", "a@2"],
+ "nodes": {
+"0": {"rank": 0, "state": [1, 1, 0, 1],
+      "trans": [1]},
+"1": {"rank": 0, "state": [0, 0, 1, 0],
+      "trans": [0, 1]}
+}}
+"""
+
+
+def strategy_from_json_test():
+    spec = GRSpec(env_vars='x', sys_vars={'a': (0, 5)})
+    g = slugs._strategy_from_json(SLUGS_JSON, spec)
+    assert g.nodes[0]['state'] == dict(x=1, a=5), g.nodes[0]
+    assert g.nodes[1]['state'] == dict(x=0, a=2), g.nodes[1]
+    assert set(g.edges()) == {(0, 1), (1, 0), (1, 1)}, g.edges()
+
+
+def ints_to_bitfields_test():
+    t = {'a': (0, 30), 'b': 'boolean'}
+    for n in range(31):
+        bits = slugs._ints_to_bitfields({'a': n, 'b': 1}, t)
+        assert bits['b'] is True, bits
+        m = slugs._bitfields_to_ints(
+            {k: int(v) for k, v in bits.items()}, t)
+        assert m['a'] == n, (m, n)
+
+
+def symbolic_controller_test():
+    spec = GRSpec(env_vars='x', sys_vars={'y': (0, 3)})
+    bdd = _bdd.BDD()
+    bits = ['x', 'y@0.0.3', 'y@1', '_jx_b0']
+    for b in bits:
+        bdd.add_var(b)
+        bdd.add_var(b + "'")
+
+    def iff(p, q):
+        return bdd.apply('equiv', bdd.var(p), bdd.var(q))
+
+    # y' = (x' ? 3 : 0), and the memory bit toggles
+    u = bdd.apply('and', iff("x'", "y@0.0.3'"), iff("x'", "y@1'"))
+    u = bdd.apply('and', u, bdd.apply('not', iff('_jx_b0', "_jx_b0'")))
+    ctrl = slugs.SymbolicController(bdd, u, spec)
+    state, out = ctrl.reaction(dict(x=False, y=0), dict(x=True))
+    assert out == dict(y=3), out
+    assert state == dict(x=True, y=3, _jx_b0=True), state
+    state, out = ctrl.reaction(state, dict(x=False))
+    assert out == dict(y=0), out
+    assert state == dict(x=False, y=0, _jx_b0=False), state
+    with nt.assert_raises(ValueError):
+        ctrl.reaction('Sinit', dict(x=True))
+
+
 class basic_test(object):
     def setUp(self):
         self.check_realizable = lambda x: slugs.synthesize(x) is not None
@@ -8,6 +8,7 @@ logging.getLogger('tulip').setLevel(logging.ERROR)
 logging.getLogger('tulip.interfaces.omega').setLevel(logging.DEBUG)
 logging.getLogger('omega').setLevel(logging.WARNING)
 from nose.tools import assert_raises
+import networkx as nx
 import numpy as np
 from scipy import sparse as sp
 from tulip import spec, synth, transys
@@ -639,6 +640,41 @@ def test_determinize_machine_init():
         assert d['b'] == 1
 
 
+def test_strategy2mealy():
+    specs = spec.GRSpec(
+        env_vars={'x': 'boolean'},
+        sys_vars={'y': ['a', 'b']},
+        env_init=['x'],
+        sys_init=['y = "b"'])
+    # strategy with string variables encoded as integers
+    g = nx.DiGraph()
+    g.add_node(0, state=dict(x=True, y=1))
+    g.add_node(1, state=dict(x=False, y=0))
+    g.add_node(2, state=dict(x=True, y=1))
+    g.add_node(3, state=dict(x=True, y=0))
+    g.add_edges_from([(0, 1), (1, 2), (2, 1), (2, 3), (3, 0)])
+    mach = synth.strategy2mealy(g, specs)
+    assert isinstance(mach, transys.MealyMachine)
+    edges = {(u, v, tuple(sorted(d.items())))
+             for u, v, d in mach.edges(data=True)}
+    label = {
+        0: (('x', True), ('y', 'b')),
+        1: (('x', False), ('y', 'a')),
+        2: (('x', True), ('y', 'b')),
+        3: (('x', True), ('y', 'a'))}
+    expected = {(u, v, label[v]) for u, v in g.edges()}
+    # initial edges: `env_init => sys_init` holds at nodes 0, 1, 2,
+    # and nodes 0, 2 have the same state, so only one is initial
+    init = {v for u, v, d in edges if u == 'Sinit'}
+    assert len(init) == 2, init
+    assert 1 in init, init
+    (v, ) = init.intersection({0, 2})
+    expected.update(('Sinit', u, label[u]) for u in init)
+    assert edges == expected, edges
+    assert mach.reaction('Sinit', dict(x=True)) == (v, dict(y='b'))
+    assert mach.reaction(1, dict(x=True)) == (2, dict(y='b'))
+
+
 class synthesize_test(object):
     def setUp(self):
         self.f_triv = spec.GRSpec(
@@ -28,6 +28,31 @@ def test_translate_ast_to_gr1c():
                            "( ( env_alice' = 0 ) & ( env_bob' = 1 ) ) )")
 
 
+def test_translate_to_gr1py():
+    x = '(loc = "s2") -> X((env_alice = "left") <-> !ok)'
+    s = spec.GRSpec(env_vars={'ok': 'boolean'},
+                    sys_vars={'loc': ['s0', 's2'],
+                              'env_alice': ['left', 'right']},
+                    sys_init=['loc = "s0"'],
+                    sys_safety=[x],
+                    env_prog=['ok'])
+    symtab, exprtab = ts.translate(s, 'gr1py')
+    assert symtab[0] == dict(name='ok', type='boolean', domain=None,
+                             uncontrolled=True), symtab
+    d = {v['name']: v for v in symtab}
+    assert d['loc']['type'] == 'int', symtab
+    assert d['loc']['domain'] == (0, 1), symtab
+    assert not d['loc']['uncontrolled'], symtab
+    assert exprtab['ENVINIT'] == 'True', exprtab
+    assert exprtab['SYSINIT'] == '( ( loc == 0 ) )', exprtab
+    assert exprtab['ENVTRANS'] == ['True'], exprtab
+    assert exprtab['SYSTRANS'] == [
+        "( ( not ( loc == 1 ) ) or "
+        "( ( env_alice_next == 0 ) == ( not ok_next ) ) )"], exprtab
+    assert exprtab['ENVGOAL'] == ['ok'], exprtab
+    assert exprtab['SYSGOAL'] == ['True'], exprtab
+
+
 @raises(TypeError)
 def check_translate_unrecognized_types(spc):
     ts.translate(spc, 'gr1c')
@@ -3,6 +3,7 @@
 from __future__ import print_function
 
 from nose.tools import raises, assert_raises
+import scipy.sparse
 from tulip.transys import labeled_graphs
 from tulip.transys.mathset import PowerSet, MathSet
 from tulip.transys.transys import FTS
@@ -280,6 +281,135 @@ class LabeledDiGraph_test(object):
     def test_add_edge_illegal_value(self):
         self.G.add_edge(1, 2, month='haha')
 
+    def test_add_new_nodes(self):
+        self.G._add_new_nodes([3, 4])
+        assert 3 in self.G.states
+        assert self.G.nodes[4] == dict()
+        self.G.add_edge(3, 4, month='Jan')
+        assert list(self.G.successors(3)) == [4]
+
+    def test_add_new_edges(self):
+        self.G.states.add(3)
+        self.G._add_new_edges([
+            (2, 3, dict(month='Feb', day='Mon')),
+            (3, 1, dict(month='Feb', mo='Jan')),
+            (3, 1, dict(month='Jan'))])
+        assert self.G[2][3][0] == dict(month='Feb', day='Mon')
+        assert self.G[3][1] == {0: dict(month='Feb', mo='Jan'),
+                                1: dict(month='Jan')}
+        assert 3 in self.G.predecessors(1)
+        assert_raises(ValueError, self.G._add_new_edges,
+                      [(1, 3, dict(month='haha'))])
+        assert_raises(ValueError, self.G._add_new_edges,
+                      [(1, 4, dict(month='Jan'))])
+
+    def test_compact_labels(self):
+        G = self.G
+        G.compact_labels = True
+        G.add_nodes_from([3, (4, dict(month='Feb'))], day='Tue')
+        assert G.nodes[3] == dict(day='Tue')
+        assert G.nodes[4] == dict(month='Feb', day='Tue')
+        G.add_edges_from([
+            (3, 4, dict(month='Jan')),
+            (3, 4, dict(month='Feb')),
+            (4, 3)])
+        assert G[3][4] == {0: dict(month='Jan'), 1: dict(month='Feb')}
+        assert G[4][3] == {0: dict()}
+        # same label
+        G.add_edges_from([(3, 4, dict(month='Jan'))])
+        assert len(G[3][4]) == 2
+        # nothing added if any label is invalid
+        assert_raises(ValueError, G.add_edges_from,
+                      [(4, 1, dict(month='Jan')),
+                       (4, 1, dict(month='haha'))])
+        assert 1 not in G[4]
+        assert_raises(AttributeError, G.add_nodes_from,
+                      [(5, dict(mo='Jan'))])
+        assert 5 not in G
+        G.add_nodes_from([(5, dict(mo='Jan'))], check=False)
+        assert G.nodes[5] == dict(mo='Jan')
+        assert G.is_consistent()
+        G.nodes[5]['month'] = 'haha'
+        assert not G.is_consistent()
+
+    def test_mutable_defaults(self):
+        G = labeled_graphs.LabeledDiGraph([
+            dict(name='ap', values=PowerSet({'p'}), default=set()),
+            dict(name='color', values={'red', 'blue'}, default='red')])
+        G.add_nodes_from([1, 2])
+        G._add_new_nodes([3])
+        G.nodes[1]['ap'].add('p')
+        assert G.nodes[1] == dict(ap={'p'}, color='red')
+        assert G.nodes[2] == dict(ap=set(), color='red')
+        assert G.nodes[3] == dict(ap=set(), color='red')
+
+    def test_add_adj(self):
+        G = self.G
+        G.states.add_from(['a', 'b', 'c'])
+        adj = scipy.sparse.lil_matrix((3, 3))
+        adj[0, 1] = 1
+        adj[1, 2] = 1
+        adj[2, 2] = 1
+        G.transitions.add_adj(adj, ['a', 'b', 'c'], month='Feb')
+        assert set(G.edges(['a', 'b', 'c'])) == {
+            ('a', 'b'), ('b', 'c'), ('c', 'c')}
+        assert G['c']['c'] == {0: dict(month='Feb')}
+        # existing edges with same label are not added again
+        G.transitions.add_adj(adj.tocsr(), {0: 'a', 1: 'b', 2: 'c'},
+                              month='Feb', day='Mon')
+        G.transitions.add_adj(adj.toarray(), ['a', 'b', 'c'],
+                              month='Feb')
+        assert G['a']['b'] == {0: dict(month='Feb'),
+                               1: dict(month='Feb', day='Mon')}
+        assert_raises(ValueError, G.transitions.add_adj,
+                      adj, ['a', 'b', 'c'], month='haha')
+        assert_raises(AttributeError, G.transitions.add_adj,
+                      adj, ['a', 'b', 'c'], mo='Feb')
+        assert_raises(Exception, G.transitions.add_adj,
+                      adj, ['a', 'b', 'd'])
+        assert len(G['a']['b']) == 2
+
+    def test_index_labels(self):
+        G = self.G
+        G.index_labels()
+        G.add_nodes_from([3, 4], month='Feb')
+        G.add_edge(3, 4, month='Feb', day='Mon')
+        G.add_edge(3, 4, month='Jan', day='Mon')
+        G.add_edge(4, 3)
+        G.add_edge(4, 4, comb={1})
+        G.add_edge(2, 4, comb=frozenset({1}))
+        nodes = {u for u, _ in G.states.find(month='Feb')}
+        assert nodes == {3, 4}, nodes
+        G.add_node(4, month='Jan')
+        nodes = {u for u, _ in G.states.find(month='Feb')}
+        assert nodes == {3}, nodes
+        assert G.states.find(month='Feb', day='Tue') == list()
+        # unlabeled edges match any label
+        r = G.transitions.find(with_attr_dict=dict(month='Feb', day='Mon'))
+        assert sorted(r) == [(3, 4, dict(month='Feb', day='Mon')),
+                             (4, 3, dict())], r
+        r = G.transitions.find([4], comb={1})
+        assert sorted(r) == [(4, 3, dict()), (4, 4, dict(comb={1}))], r
+        r = G.transitions.find(comb={1}, to_states=[4])
+        assert len(r) == 2, r
+        G.remove_edge(4, 4)
+        G.states.remove(3)
+        assert G.transitions.find(month='Feb', day='Mon') == list()
+        r = G.transitions.find(comb={1})
+        assert r == [(2, 4, dict(comb={1}))], r
+        # labels changed in place are not tracked
+        G.nodes[4]['month'] = 'Feb'
+        assert G.states.find(month='Feb') == list()
+        G.index_labels()
+        assert G.states.find(month='Feb') == [(4, dict(month='Feb'))]
+
+    def test_find_states(self):
+        G = self.G
+        G.add_nodes_from([3, 4, 5], month='Feb')
+        r = G.states.find([3, 5, 6], month='Feb')
+        assert r == [(3, dict(month='Feb')), (5, dict(month='Feb'))], r
+        assert G.states.find(4) == [(4, dict(month='Feb'))]
+
 #    @raises(ValueError)
 #    def test_node_subscript_assign_illegal_value(self):
 #        self.G.nodes[1]['month'] = 'abc'
@@ -336,3 +466,28 @@ def test_remove_deadends():
 
     g.remove_deadends()
     assert(len(g) == 1)
+
+
+def test_remove_deadends_chain():
+    g = labeled_graphs.LabeledDiGraph()
+    n = 10**4
+    g.add_nodes_from(range(n))
+    g.add_edges_from((i, i + 1) for i in range(n - 1))
+    g.add_edge(0, 0)
+    g.states.initial.add(n - 1)
+    removed = g.remove_deadends()
+    assert removed == set(range(1, n))
+    assert list(g) == [0]
+    assert n - 1 not in g.states.initial
+
+
+def test_backward_prune():
+    g = labeled_graphs.LabeledDiGraph()
+    g.add_nodes_from(range(6))
+    g.add_edges_from([(0, 1), (1, 0), (1, 2), (3, 4), (4, 5), (4, 4)])
+    # graph not modified
+    assert labeled_graphs.backward_prune(g) == {2, 5}
+    assert len(g) == 6
+    assert labeled_graphs.backward_prune(g, dead=[4]) == {2, 3, 4, 5}
+    assert labeled_graphs.backward_prune(g, dead=[0, 6]) == {
+        0, 1, 2, 5}
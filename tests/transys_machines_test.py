@@ -6,6 +6,8 @@ import logging
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 
+from nose.tools import assert_raises
+
 from tulip.transys import machines
 
 def test_strip_ports():
@@ -42,3 +44,78 @@ def test_strip_ports():
         assert(u == x)
         assert(v == y)
         assert(d == b)
+
+
+def test_reaction():
+    mealy = machines.MealyMachine()
+    mealy.add_inputs({'door': {'open', 'closed'}})
+    mealy.add_outputs({'led': {'on', 'off'}})
+    mealy.add_nodes_from(range(3))
+    mealy.states.initial.add(0)
+    mealy.add_edge(0, 1, door='open', led='on')
+    mealy.add_edge(0, 2, door='closed', led='off')
+    mealy.add_edge(1, 0, door='open', led='off')
+
+    assert mealy.reaction(0, dict(door='open')) == (1, dict(led='on'))
+    assert mealy.reaction(0, dict(door='closed')) == (2, dict(led='off'))
+    # returned outputs are not shared with the index
+    _, outputs = mealy.reaction(0, dict(door='open'))
+    outputs['led'] = 'off'
+    assert mealy.reaction(0, dict(door='open')) == (1, dict(led='on'))
+    # mutation invalidates the index
+    mealy.transitions.remove(0, 1, door='open', led='on')
+    mealy.add_edge(0, 1, door='open', led='off')
+    assert mealy.reaction(0, dict(door='open')) == (1, dict(led='off'))
+    # input-nondeterminism
+    mealy.add_edge(0, 2, door='open', led='on')
+    with assert_raises(Exception):
+        mealy.reaction(0, dict(door='open'))
+    mealy.states.remove(2)
+    assert mealy.reaction(0, dict(door='open')) == (1, dict(led='off'))
+    # invalid input
+    with assert_raises(Exception):
+        mealy.reaction(0, dict(door='closed'))
+
+    states, outputs = machines.guided_run(
+        mealy, input_sequences=dict(door=['open', 'open', 'open']))
+    assert states == [1, 0, 1], states
+    assert outputs == dict(led=['off', 'off', 'off']), outputs
+
+
+def test_simulate_batch():
+    mealy = machines.MealyMachine()
+    mealy.add_inputs({'door': {'open', 'closed'}, 'lock': {0, 1}})
+    mealy.add_outputs({'led': {'on', 'off'}})
+    mealy.add_nodes_from(['a', 'b', 'c'])
+    mealy.states.initial.add('a')
+    mealy.add_edge('a', 'b', door='open', lock=0, led='on')
+    mealy.add_edge('a', 'a', door='closed', lock=0, led='off')
+    mealy.add_edge('a', 'c', door='closed', lock=1, led='off')
+    mealy.add_edge('b', 'a', door='open', lock=0, led='off')
+    mealy.add_edge('b', 'a', door='open', lock=1, led='on')
+    mealy.add_edge('b', 'b', door='closed', lock=1, led='on')
+    # 'c' is a dead-end
+    doors = [['open', 'open', 'closed', 'open'],
+             ['closed', 'closed', 'open', 'open'],
+             ['closed', 'open', 'open', 'open'],
+             ['open', 'closed', 'open', 'open']]
+    locks = [[0, 1, 0, 0],
+             [0, 1, 0, 0],
+             [0, 2, 0, 0],
+             [0, 0, 0, 0]]
+    states, outputs, lengths = machines.simulate_batch(
+        mealy, dict(door=doors, lock=locks))
+    assert states.shape == (4, 4), states.shape
+    assert outputs['led'].shape == (4, 4), outputs['led'].shape
+    # first trace completes, second reaches dead-end,
+    # third has invalid input, fourth has no transition
+    assert list(lengths) == [4, 2, 1, 1], lengths
+    ref_states, ref_outputs = machines.guided_run(
+        mealy, input_sequences=dict(door=doors[0], lock=locks[0]))
+    assert list(states[0]) == ref_states, states[0]
+    assert list(outputs['led'][0]) == ref_outputs['led'], outputs['led'][0]
+    assert list(states[1, :2]) == ['a', 'c'], states[1]
+    with assert_raises(ValueError):
+        machines.simulate_batch(mealy, dict(door=doors))
+    with assert_raises(ValueError):
+        machines.simulate_batch(mealy, dict(door=doors, lock=locks[0]))
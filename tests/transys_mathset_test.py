@@ -118,6 +118,72 @@ class MathSet_operations_test(object):
         assert not self.small2_listnum.intersects(self.small1_set)
 
 
+def mathset_unhashable_test():
+    s = MathSet([[1, 2], {'a': [3]}, {4}, (5, [6])])
+    assert [1, 2] in s
+    assert [2, 1] not in s
+    assert (1, 2) not in s
+    assert {'a': [3]} in s
+    assert {'a': (3,)} not in s
+    assert {4} in s
+    assert (5, [6]) in s
+    # duplicates by equality
+    s.add_from([[1, 2], {4}, [True, 2]])
+    assert len(s) == 4
+    s.remove({4})
+    assert {4} not in s
+    assert len(s._keys) == 3
+    assert s == MathSet([(5, [6]), {'a': [3]}, [1, 2]])
+    assert s != MathSet([(5, [6]), {'a': [3]}, [1, 3]])
+    assert s - s == MathSet()
+    # independent of the order of insertion
+    assert MathSet([[0], [8]]) == MathSet([[8], [0]])
+
+
+def mathset_set_frozenset_test():
+    # a set equals a frozenset with the same elements
+    s = MathSet([[frozenset({1})]])
+    assert [{1}] in s
+    assert [frozenset({1})] in s
+    s.add([{1}])
+    assert len(s) == 1
+    s.add({'a': {2}})
+    assert {'a': frozenset({2})} in s
+    # removes the equal element, and its key
+    s.remove([{1}])
+    assert len(s) == 1
+    assert [frozenset({1})] not in s
+    assert len(s._keys) == 1
+    s.add([{1}])
+    assert [frozenset({1})] in s
+    assert s == MathSet([[frozenset({1})], {'a': frozenset({2})}])
+    # unhashable elements without keys
+    t = MathSet([[bytearray(b'x')], [1]])
+    t.remove([1])
+    assert t._unfrozen == 1
+    assert len(t._keys) == 0
+
+
+def compare_lists_test():
+    assert compare_lists([[1], {2}, 3, 3], [3, {2}, 3, [1]])
+    assert compare_lists([[frozenset({1})]], [[{1}]])
+    assert not compare_lists([[1], 3, 3], [3, [1], [1]])
+    assert not compare_lists([1], [1, 1])
+
+
+def cartesian_test():
+    a = MathSet([1, [2]])
+    b = MathSet(['x'])
+    c = a.cartesian(b)
+    assert isinstance(c, trs.mathset.CartesianProduct)
+    assert len(c) == 2
+    assert (1, 'x') in c
+    assert ([2], 'x') in c
+    assert (1, 'y') not in c
+    assert (1,) not in c
+    assert MathSet(c) == a * b
+
+
 def unique_check(iterable, expected):
     print(unique(iterable))
     assert unique(iterable) == expected
@@ -171,6 +237,24 @@ def subset_test():
 
     return a
 
+def subset_checked_once_test():
+    class Superset(object):
+        def __init__(self):
+            self.n = 0
+
+        def __contains__(self, x):
+            self.n += 1
+            return x in {1, 2, 3}
+
+    superset = Superset()
+    s = SubSet(superset)
+    s.add(1)
+    s.add(1)
+    s.add_from([1, 2])
+    assert superset.n == 2, superset.n
+    assert s == MathSet([1, 2])
+
+
 def powerset_test():
     s = [[1, 2], '3', {'a':1}, 1]
 
@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 """Tests of `transys.transys.simu_abstract`."""
 import logging
+import random
 
+from nose.tools import assert_raises
 import numpy as np
 from polytope import box2poly
 from tulip import hybrid
@@ -65,6 +67,21 @@ def build_FTS(index):
     return ts
 
 
+def random_FTS(n, seed):
+    # FTS with random labels and transitions
+    rnd = random.Random(seed)
+    aps = ['a', 'b', 'c']
+    ts = FTS()
+    ts.atomic_propositions.add_from(aps)
+    ts.states.add_from(
+        (i, {'ap': {rnd.choice(aps)}}) for i in range(n))
+    ts.states.initial.add(0)
+    for i in range(n):
+        succ = {rnd.randrange(n) for k in range(rnd.randint(0, 2))}
+        ts.transitions.add_from((i, j) for j in succ)
+    return ts
+
+
 def check_simulation(ts1, ts2, L12, L21):
     # check if ts1 is simulated by ts2
     # L12 is a mapping for nodes from ts1 to ts2
@@ -126,5 +143,30 @@ def simu_abstract_test():
 simu_abstract_test.slow = True
 
 
+def simu_abstract_random_test():
+    for seed in range(10):
+        ts = random_FTS(30, seed)
+        bi_simu, bi_part = simu_abstract(ts, 'bi')
+        # each state is in exactly one cell
+        assert all(len(v) == 1 for v in bi_part['ts2simu'].values())
+        assert len(bi_part['ts2simu']) == len(ts)
+        assert check_simulation(ts, bi_simu, bi_part['ts2simu'],
+                                bi_part['simu2ts'])
+        assert check_simulation(bi_simu, ts, bi_part['simu2ts'],
+                                bi_part['ts2simu'])
+        # coarsest: merging cells with the same successors and
+        # atomic propositions would yield a smaller bisimulation
+        keys = {(repr(bi_simu.nodes[i]['ap']),
+                 frozenset(bi_simu.succ[i])) for i in bi_simu}
+        assert len(keys) == len(bi_simu)
+        dual_simu, dual_part = simu_abstract(ts, 'dual')
+        cells = [frozenset(c) for c in dual_part['simu2ts'].values()]
+        assert len(set(cells)) == len(cells)
+        assert check_simulation(dual_simu, ts, dual_part['simu2ts'],
+                                dual_part['ts2simu'])
+    with assert_raises(ValueError):
+        simu_abstract(ts, 'tri')
+
+
 if __name__ == '__main__':
     bi_simu = simu_abstract_test()
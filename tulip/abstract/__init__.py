@@ -39,7 +39,7 @@ from .discretization import (
     discretize, discretize_switched,
     multiproc_discretize_switched
 )
-from .feasible import is_feasible, solve_feasible
+from .feasible import is_feasible, solve_feasible, PreCache
 
 from .prop2partition import (
     prop2part, part2convex,
@@ -47,4 +47,6 @@ from .prop2partition import (
     PropPreservingPartition, PPP
 )
 
-from .find_controller import get_input, find_discrete_state
+from .find_controller import (
+    get_input, find_discrete_state,
+    OnlineController, ExplicitController)
@@ -0,0 +1,99 @@
+# Copyright (c) 2011-2016 by California Institute of Technology
+# Copyright (c) 2016 by The Regents of the University of Michigan
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder(s) nor the names of its
+#    contributors may be used to endorse or promote products derived
+#    from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED.  IN NO EVENT SHALL THE
+# COPYRIGHT HOLDERS OR THE CONTRIBUTORS BE LIABLE FOR ANY DIRECT,
+# INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION)
+# HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT,
+# STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING
+# IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+"""Process pools and batches of work shared by abstraction modules."""
+from __future__ import absolute_import
+
+import multiprocessing as mp
+
+
+# pairs of cells checked in parallel,
+# independent of the number of workers
+_BATCH_SIZE = 64
+# pairs popped while looking for a batch
+_BATCH_SCAN = 8 * _BATCH_SIZE
+
+def _make_pool(workers):
+    """Return process pool for C{workers > 1}, otherwise C{None}."""
+    if workers is None:
+        return None
+    if workers < 1:
+        raise ValueError(
+            '`workers` must be `None` or positive, '
+            'got: {w}'.format(w=workers))
+    if workers == 1:
+        return None
+    return mp.Pool(workers)
+
+def _map_pairs(pool, f, args):
+    """Return C{[f(x) for x in args]}, using C{pool} if given."""
+    if pool is None:
+        return [f(x) for x in args]
+    return pool.map(f, args, chunksize=1)
+
+def _imap_pairs(pool, f, args):
+    """Like L{_map_pairs}, but return an iterator over the results.
+
+    Results are yielded in the order of C{args}, as they arrive.
+    """
+    if pool is None:
+        return (f(x) for x in args)
+    return pool.imap(f, args, chunksize=1)
+
+def _pop_batch(IJ, workers):
+    """Pop pairs of cells from C{IJ} that can be checked together.
+
+    If C{workers is None}, then pop only the least pair.
+    Otherwise, pop pairs in order, skipping any pair that shares
+    a cell with a pair already in the batch.
+    Skipped pairs are returned to C{IJ}.
+    The batch does not depend on the value of C{workers}.
+
+    @type IJ: C{_PairQueue} from L{discretization}
+    @rtype: list of C{(j, i)}
+    """
+    if workers is None:
+        return [IJ.pop()]
+    batch = list()
+    skipped = list()
+    used = set()
+    while IJ and len(batch) < _BATCH_SIZE and len(skipped) < _BATCH_SCAN:
+        j, i = IJ.pop()
+        if i in used or j in used:
+            skipped.append((j, i))
+            continue
+        used.add(i)
+        used.add(j)
+        batch.append((j, i))
+    for j, i in skipped:
+        IJ.add(j, i)
+    return batch
@@ -44,6 +44,7 @@ from __future__ import print_function
 import logging
 logger = logging.getLogger(__name__)
 
+import heapq
 import os
 import warnings
 import pprint
@@ -59,8 +60,11 @@ from tulip import transys as trs
 from tulip.hybrid import LtiSysDyn, PwaSysDyn
 
 from .prop2partition import (PropPreservingPartition,
-                             pwa_partition, part2convex)
-from .feasible import is_feasible, solve_feasible
+                             pwa_partition, part2convex,
+                             _RegionIndex, _bounding_boxes,
+                             _find_adjacent)
+from .feasible import solve_feasible, feasible_key
+from ._parallel import _make_pool, _map_pairs, _imap_pairs, _pop_batch
 from .plot import plot_ts_on_partition
 
 # inline imports:
@@ -459,7 +463,8 @@ def discretize(
     trans_length=1, remove_trans=False,
     abs_tol=1e-7,
     plotit=False, save_img=False, cont_props=None,
-    plot_every=1, simu_type='bi'
+    plot_every=1, simu_type='bi', workers=None,
+    pre_cache=None
 ):
     """Refine the partition via bisimulation 
     or dual-simulation algorithms, and establish transitions
@@ -514,30 +519,44 @@ def discretize(
     @type simu_type: string,
         default = 'bi'
 
+    @param workers: number of processes that check pairs of cells.
+        If C{None}, then pairs are checked one at a time.
+        Otherwise, pairs that share no cell are checked in batches,
+        by a pool of C{workers} processes.
+        Batches do not depend on C{workers}, so neither does the result.
+        It can differ from the result for C{None},
+        because the order of refinement changes.
+    @type workers: C{None} or int >= 1
+
+    @param pre_cache: reuse reachable sets computed earlier,
+        for example by a previous call with another C{trans_length},
+        and store those computed now.
+    @type pre_cache: L{PreCache} or C{None}
+
     @rtype: L{AbstractPwa}
     """
     if simu_type == 'bi':
-        AbstractPwa = _discretize_bi(
-            part, ssys, N, min_cell_volume,
-            closed_loop, conservative,
-            max_num_poly, use_all_horizon,
-            trans_length, remove_trans,
-            abs_tol,
-            plotit, save_img, cont_props,
-            plot_every)
+        _discretize = _discretize_bi
     elif simu_type == 'dual':
-        AbstractPwa = _discretize_dual(
+        _discretize = _discretize_dual
+    else:
+        raise ValueError(
+            'Unknown simulation type: "{st}"'.format(
+            st=simu_type))
+    pool = _make_pool(workers)
+    try:
+        AbstractPwa = _discretize(
             part, ssys, N, min_cell_volume,
             closed_loop, conservative,
             max_num_poly, use_all_horizon,
             trans_length, remove_trans,
             abs_tol,
             plotit, save_img, cont_props,
-            plot_every)
-    else:
-        raise ValueError(
-            'Unknown simulation type: "{st}"'.format(
-            st=simu_type))
+            plot_every, workers, pool, pre_cache)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
     return AbstractPwa
 
 def _discretize_bi(
@@ -547,7 +566,7 @@ def _discretize_bi(
     trans_length=1, remove_trans=False,
     abs_tol=1e-7,
     plotit=False, save_img=False, cont_props=None,
-    plot_every=1
+    plot_every=1, workers=None, pool=None, pre_cache=None
 ):
     """Refine the partition and establish transitions
     based on reachability analysis. Use bi-simulation algorithm.
@@ -599,6 +618,12 @@ def _discretize_bi(
     @param cont_props: continuous propositions to plot
     @type cont_props: list of C{Polytope}
 
+    @param workers: see L{discretize}
+    @param pool: processes for checking pairs of cells
+    @type pool: C{multiprocessing.Pool} or C{None}
+
+    @param pre_cache: see L{discretize}
+
     @rtype: L{AbstractPwa}
     """
     start_time = os.times()[0]
@@ -608,7 +633,8 @@ def _discretize_bi(
     ispwa = isinstance(ssys, PwaSysDyn)
     islti = isinstance(ssys, LtiSysDyn)
     if ispwa:
-        (part, ppp2pwa, part2orig) = pwa_partition(ssys, part)
+        (part, ppp2pwa, part2orig) = pwa_partition(
+            ssys, part, workers=workers)
     else:
         part2orig = range(len(part))
     # Save original polytopes, require them to be convex
@@ -641,24 +667,15 @@ def _discretize_bi(
             rd = ssys.Wset.chebR
         else:
             rd = 0.
-    # Initialize matrix for pairs to check
-    IJ = part.adj.copy()
-    IJ = IJ.todense()
-    IJ = np.array(IJ)
-    logger.debug("\n Starting IJ: \n" + str(IJ) )
-    # next line omitted in discretize_overlap
-    IJ = reachable_within(trans_length, IJ,
-                          np.array(part.adj.todense()) ) 
     # Initialize output
     num_regions = len(part)
-    transitions = np.zeros(
-        [num_regions, num_regions],
-        dtype = int
-    )
+    transitions = _Relation(num_regions)
     sol = deepcopy(part.regions)
-    adj = part.adj.copy()
-    adj = adj.todense()
-    adj = np.array(adj)
+    adj = _Relation.from_matrix(part.adj)
+    # Initialize worklist of pairs to check
+    # next line omitted in discretize_overlap
+    IJ = _reachable_pairs(trans_length, adj)
+    logger.debug("\n Starting IJ: \n" + str(IJ) )
     # next 2 lines omitted in discretize_overlap
     if ispwa:
         subsys_list = list(ppp2pwa)
@@ -688,12 +705,24 @@ def _discretize_bi(
     #num_orig_neigh = np.sum(adj, axis=1).flatten() - 1
     progress = list()
     # Do the abstraction
-    while np.sum(IJ) > 0:
-        ind = np.nonzero(IJ)
+    batch = list()
+    while IJ or batch:
+        if not batch:
+            pairs = _pop_batch(IJ, workers)
+            # Use original cell as trans_set,
+            # unless conservative
+            args = [
+                (sol[i], sol[j],
+                 _active_subsys(ssys, subsys_list, i), N,
+                 closed_loop, use_all_horizon,
+                 None if conservative else orig_list[orig[i]],
+                 max_num_poly)
+                for j, i in pairs]
+            batch = list(zip(
+                pairs, _check_pairs(pool, _check_pair_bi, args, pre_cache)))
+            batch.reverse()
         # i,j swapped in discretize_overlap
-        i = ind[1][0]
-        j = ind[0][0]
-        IJ[j, i] = 0
+        (j, i), checked = batch.pop()
         si = sol[i]
         sj = sol[j]
         si_tmp = deepcopy(si)
@@ -704,16 +733,7 @@ def _discretize_bi(
                 rd, xd = pc.cheby_ball(ss.Wset)
             else:
                 rd = 0.
-        if conservative:
-            # Don't use trans_set
-            trans_set = None
-        else:
-            # Use original cell as trans_set
-            trans_set = orig_list[orig[i]]
-        S0 = solve_feasible(
-            si, sj, ss, N, closed_loop,
-            use_all_horizon, trans_set, max_num_poly
-        )
+        S0, isect, vol1, risect, diff, vol2, rdiff = checked
         msg = '\n Working with partition cells: {i}, {j}'.format(i=i, 
                                                 j=j)
         logger.info(msg)
@@ -727,14 +747,6 @@ def _discretize_bi(
         msg += '\t Computed reachable set S0 with volume: '
         msg += '{vol}\n'.format(vol=S0.volume)
         logger.debug(msg)
-        #logger.debug('si \cap s0')
-        isect = si.intersect(S0)
-        vol1 = isect.volume
-        risect, xi = pc.cheby_ball(isect)
-        #logger.debug('si \ s0')
-        diff = si.diff(S0)
-        vol2 = diff.volume
-        rdiff, xd = pc.cheby_ball(diff)
         # if pc.is_fulldim(pc.Region([isect]).intersect(diff)):
         #     logging.getLogger('tulip.polytope').setLevel(logging.DEBUG)
         #     diff = pc.mldivide(si, S0, save=True)
@@ -803,41 +815,38 @@ def _discretize_bi(
             n_cells = len(sol)
             new_idx = range(n_cells-1, n_cells-num_new-1, -1)
             """Update transition matrix"""
-            transitions = np.pad(transitions, (0,num_new), 'constant')
-            transitions[i, :] = np.zeros(n_cells)
-            for r in new_idx:
-                #transitions[:, r] = transitions[:, i]
-                # All sets reachable from start are reachable from both part's
-                # except possibly the new part
-                transitions[i, r] = 0
-                transitions[j, r] = 0
+            transitions.grow(num_new)
+            # All sets reachable from start are reachable from both part's
+            # except possibly the new part,
+            # and new parts have no transitions yet
+            transitions.clear_row(i)
             # sol[j] is reachable from intersection of sol[i] and S0
             if i != j:
-                transitions[j, i] = 1
+                transitions.add(j, i)
                 # sol[j] is reachable from each piece os S0 \cap sol[i]
                 #for k in range(n_cells-n_isect-2, n_cells):
-                #    transitions[j, k] = 1
+                #    transitions.add(j, k)
             """Update adjacency matrix"""
-            old_adj = np.nonzero(adj[i, :])[0]
+            old_adj = sorted(adj.row(i))
             # reset new adjacencies
-            adj[i, :] = np.zeros([n_cells -num_new])
-            adj[:, i] = np.zeros([n_cells -num_new])
-            adj[i, i] = 1
-            adj = np.pad(adj, (0, num_new), 'constant')
+            adj.clear_row(i)
+            adj.clear_col(i)
+            adj.add(i, i)
+            adj.grow(num_new)
             for r in new_idx:
-                adj[i, r] = 1
-                adj[r, i] = 1
-                adj[r, r] = 1
+                adj.add(i, r)
+                adj.add(r, i)
+                adj.add(r, r)
                 if not conservative:
                     orig = np.hstack([orig, orig[i]])
             # adjacencies between pieces of isect and diff
             for r in new_idx:
                 for k in new_idx:
-                    if r is k:
+                    if r == k:
                         continue
                     if pc.is_adjacent(sol[r], sol[k]):
-                        adj[r, k] = 1
-                        adj[k, r] = 1
+                        adj.add(r, k)
+                        adj.add(k, r)
             msg = ''
             if logger.getEffectiveLevel() <= logging.DEBUG:
                 msg += '\t\n Adding states {i} and '.format(i=i)
@@ -845,30 +854,31 @@ def _discretize_bi(
                     msg += '{r} and '.format(r=r)
                 msg += '\n'
                 logger.debug(msg)
-            for k in np.setdiff1d(old_adj, [i,n_cells-1]):
+            for k in old_adj:
+                if k == i:
+                    continue
                 # Every "old" neighbor must be the neighbor
                 # of at least one of the new
                 if pc.is_adjacent(sol[i], sol[k]):
-                    adj[i, k] = 1
-                    adj[k, i] = 1
+                    adj.add(i, k)
+                    adj.add(k, i)
                 elif remove_trans and (trans_length == 1):
                     # Actively remove transitions between non-neighbors
-                    transitions[i, k] = 0
-                    transitions[k, i] = 0
+                    transitions.discard(i, k)
+                    transitions.discard(k, i)
                 for r in new_idx:
                     if pc.is_adjacent(sol[r], sol[k]):
-                        adj[r, k] = 1
-                        adj[k, r] = 1
+                        adj.add(r, k)
+                        adj.add(k, r)
                     elif remove_trans and (trans_length == 1):
                         # Actively remove transitions between non-neighbors
-                        transitions[r, k] = 0
-                        transitions[k, r] = 0
-            """Update IJ matrix"""
-            IJ = np.pad(IJ, (0,num_new), 'constant')
-            adj_k = reachable_within(trans_length, adj, adj)
-            sym_adj_change(IJ, adj_k, transitions, i)
+                        transitions.discard(r, k)
+                        transitions.discard(k, r)
+            """Update IJ worklist"""
+            IJ.grow(num_new)
+            _sym_adj_change(IJ, adj, trans_length, transitions, i)
             for r in new_idx:
-                sym_adj_change(IJ, adj_k, transitions, r)
+                _sym_adj_change(IJ, adj, trans_length, transitions, r)
             if logger.getEffectiveLevel() <= logging.DEBUG:
                 msg = '\n\n Updated adj: \n{adj}'.format(adj=adj)
                 msg += '\n\n Updated trans: \n{trans}'.format(trans=
@@ -878,7 +888,7 @@ def _discretize_bi(
             logger.info('Divided region: {i}\n'.format(i=i))
         elif vol2 < abs_tol:
             logger.info('Found: {i} ---> {j}\n'.format(i=i, j=j))
-            transitions[j,i] = 1
+            transitions.add(j, i)
         else:
             if logger.level <= logging.DEBUG:
                 msg = '\t Unreachable: {i} --X--> {j}\n'.format(i=i, j=j)
@@ -887,18 +897,18 @@ def _discretize_bi(
                 logger.debug(msg)
             else:
                 logger.info('\t unreachable\n')
-            transitions[j,i] = 0
+            transitions.discard(j, i)
         # check to avoid overlapping Regions
         if debug:
             tmp_part = PropPreservingPartition(
                 domain=part.domain,
-                regions=sol, adj=sp.lil_matrix(adj),
+                regions=sol, adj=adj.tolil(part.adj.dtype),
                 prop_regions=part.prop_regions
             )
             assert(tmp_part.is_partition() )
 
         n_cells = len(sol)
-        progress_ratio = 1 - float(np.sum(IJ) ) /n_cells**2
+        progress_ratio = 1 - float(len(IJ)) /n_cells**2
         progress += [progress_ratio]
         msg = '\t total # polytopes: {n_cells}\n'.format(n_cells=n_cells)
         msg += '\t progress ratio: {pr}\n'.format(pr=progress_ratio)
@@ -913,7 +923,7 @@ def _discretize_bi(
             continue
         tmp_part = PropPreservingPartition(
             domain=part.domain,
-            regions=sol, adj=sp.lil_matrix(adj),
+            regions=sol, adj=adj.tolil(part.adj.dtype),
             prop_regions=part.prop_regions
         )
         # plot pair under reachability check
@@ -925,7 +935,8 @@ def _discretize_bi(
         fig.canvas.draw()
         # plot partition
         ax1.clear()
-        plot_partition(tmp_part, transitions.T, ax=ax1, color_seed=23)
+        plot_partition(
+            tmp_part, transitions.tolil().T, ax=ax1, color_seed=23)
         # plot dynamics
         ssys.plot(ax1, show_domain=False)
         # plot hatched continuous propositions
@@ -943,7 +954,7 @@ def _discretize_bi(
         plt.pause(1)
     new_part = PropPreservingPartition(
         domain=part.domain,
-        regions=sol, adj=sp.lil_matrix(adj),
+        regions=sol, adj=adj.tolil(part.adj.dtype),
         prop_regions=part.prop_regions
     )
     # check completeness of adjacency matrix
@@ -952,7 +963,7 @@ def _discretize_bi(
         tmp_part.compute_adj()
     # Generate transition system and add transitions
     ofts = trs.FTS()
-    adj = sp.lil_matrix(transitions.T)
+    adj = transitions.tolil().T
     n = adj.shape[0]
     ofts_states = range(n)
     ofts.states.add_from(ofts_states)
@@ -1004,7 +1015,7 @@ def _discretize_dual(
     trans_length=1, remove_trans=False,
     abs_tol=1e-7,
     plotit=False, save_img=False, cont_props=None,
-    plot_every=1
+    plot_every=1, workers=None, pool=None, pre_cache=None
 ):
     """Refine the partition and establish transitions
     based on reachability analysis. Use dual-simulation algorithm.
@@ -1060,7 +1071,13 @@ def _discretize_dual(
         (bisimulation or dual-simulation). 
     @type simu_type: string, 'bi' or 'dual'
         default = 'bi'
-    
+
+    @param workers: see L{discretize}
+    @param pool: processes for checking pairs of cells
+    @type pool: C{multiprocessing.Pool} or C{None}
+
+    @param pre_cache: see L{discretize}
+
     @rtype: L{AbstractPwa}
     """
     start_time = os.times()[0]
@@ -1070,7 +1087,8 @@ def _discretize_dual(
     ispwa = isinstance(ssys, PwaSysDyn)
     islti = isinstance(ssys, LtiSysDyn)
     if ispwa:
-        (part, ppp2pwa, part2orig) = pwa_partition(ssys, part)
+        (part, ppp2pwa, part2orig) = pwa_partition(
+            ssys, part, workers=workers)
     else:
         part2orig = range(len(part))
     # Save original polytopes, require them to be convex
@@ -1102,24 +1120,15 @@ def _discretize_dual(
             rd = ssys.Wset.chebR
         else:
             rd = 0.
-    # Initialize matrix for pairs to check
-    IJ = part.adj.copy()
-    IJ = IJ.todense()
-    IJ = np.array(IJ)
-    logger.debug("\n Starting IJ: \n" + str(IJ) )
-    # next line omitted in discretize_overlap
-    IJ = reachable_within(trans_length, IJ,
-                          np.array(part.adj.todense()))
     # Initialize output
     num_regions = len(part)
-    transitions = np.zeros(
-        [num_regions, num_regions],
-        dtype = int
-    )
+    transitions = _Relation(num_regions)
     sol = deepcopy(part.regions)
-    adj = part.adj.copy()
-    adj = adj.todense()
-    adj = np.array(adj)
+    adj = _Relation.from_matrix(part.adj)
+    # Initialize worklist of pairs to check
+    # next line omitted in discretize_overlap
+    IJ = _reachable_pairs(trans_length, adj)
+    logger.debug("\n Starting IJ: \n" + str(IJ) )
     # next 2 lines omitted in discretize_overlap
     if ispwa:
         subsys_list = list(ppp2pwa)
@@ -1148,12 +1157,24 @@ def _discretize_dual(
     #num_orig_neigh = np.sum(adj, axis=1).flatten() - 1
     progress = list()
     # Do the abstraction
-    while np.sum(IJ) > 0:
-        ind = np.nonzero(IJ)
+    batch = list()
+    while IJ or batch:
+        if not batch:
+            pairs = _pop_batch(IJ, workers)
+            # Use original cell as trans_set,
+            # unless conservative
+            args = [
+                (sol[i], sol[j],
+                 _active_subsys(ssys, subsys_list, i), N,
+                 closed_loop, use_all_horizon,
+                 None if conservative else orig_list[orig[i]],
+                 max_num_poly)
+                for j, i in pairs]
+            batch = list(zip(
+                pairs, _check_pairs(pool, _check_pair_dual, args, pre_cache)))
+            batch.reverse()
         # i,j swapped in discretize_overlap
-        i = ind[1][0]
-        j = ind[0][0]
-        IJ[j, i] = 0
+        (j, i), checked = batch.pop()
         si = sol[i]
         sj = sol[j]
         si_tmp = deepcopy(si)
@@ -1166,16 +1187,7 @@ def _discretize_dual(
                 rd, xd = pc.cheby_ball(ss.Wset)
             else:
                 rd = 0.
-        if conservative:
-            # Don't use trans_set
-            trans_set = None
-        else:
-            # Use original cell as trans_set
-            trans_set = orig_list[orig[i]]
-        S0 = solve_feasible(
-            si, sj, ss, N, closed_loop,
-            use_all_horizon, trans_set, max_num_poly
-        )
+        S0, isect, vol1, risect, rsi, vol2 = checked
         msg = '\n Working with partition cells: {i}, {j}'.format(i=i, 
                                                 j=j)
         logger.info(msg)
@@ -1189,13 +1201,6 @@ def _discretize_dual(
         msg += '\t Computed reachable set S0 with volume: '
         msg += '{vol}\n'.format(vol=S0.volume)
         logger.debug(msg)
-        #logger.debug('si \cap s0')
-        isect = si.intersect(S0)
-        vol1 = isect.volume
-        risect, xi = pc.cheby_ball(isect)
-        #logger.debug('si \ s0')
-        rsi, xd = pc.cheby_ball(si)
-        vol2 = si.volume-vol1 # not accurate. need to check polytope class
         if vol1 <= min_cell_volume:
             logger.warning('\t too small: si \cap Pre(sj), '
                            'so discard intersection')
@@ -1218,7 +1223,7 @@ def _discretize_dual(
                     logger.info('Found: {idx} ---> {j} '.format(idx=idx,
                                 j=j))
                     logger.info('intersection exists.\n')
-                    transitions[j, idx] = 1
+                    transitions.add(j, idx)
                     check_isect = True
             if not check_isect:
                 # Make sure new areas are Regions and add proposition lists
@@ -1232,43 +1237,45 @@ def _discretize_dual(
                 n_cells = len(sol)
                 new_idx = n_cells-1
                 """Update adjacency matrix"""
-                old_adj = np.nonzero(adj[i, :])[0]            
-                adj = np.pad(adj, (0, 1), 'constant')            
+                old_adj = sorted(adj.row(i))
+                adj.grow(1)
                 # cell i and new_idx are adjacent
-                adj[i, new_idx] = 1
-                adj[new_idx, i] = 1
-                adj[new_idx, new_idx] = 1
+                adj.add(i, new_idx)
+                adj.add(new_idx, i)
+                adj.add(new_idx, new_idx)
                 if not conservative:
-                    orig = np.hstack([orig, orig[i]])    
+                    orig = np.hstack([orig, orig[i]])
                 msg = ''
                 if logger.getEffectiveLevel() <= logging.DEBUG:
                     msg += '\t\n Adding states {new_idx}\n'.format(new_idx=
                                                new_idx)
                     logger.debug(msg)
-                for k in np.setdiff1d(old_adj, [i,n_cells-1]):
+                """Update transition matrix"""
+                transitions.grow(1)
+                for k in old_adj:
+                    if k == i:
+                        continue
                     # Every "old" neighbor must be the neighbor
                     # of at least one of the new
                     if pc.is_adjacent(sol[new_idx], sol[k]):
-                        adj[new_idx, k] = 1
-                        adj[k, new_idx] = 1
+                        adj.add(new_idx, k)
+                        adj.add(k, new_idx)
                     elif remove_trans and (trans_length == 1):
                         # Actively remove transitions between non-neighbors
-                        transitions[new_idx, k] = 0
-                        transitions[k, new_idx] = 0
-                """Update transition matrix"""
-                transitions = np.pad(transitions, (0,1), 'constant')
-                adj_k = reachable_within(trans_length, adj, adj)
+                        transitions.discard(new_idx, k)
+                        transitions.discard(k, new_idx)
                 # transitions i ---> k for k is neighbor of new_idx should be 
                 # kept by new_idx
-                transitions[:, new_idx] = np.multiply(transitions[:, i], 
-                           adj_k[:, i])
+                near_i = adj.walk(i, trans_length, backward=True)
+                for k in transitions.col(i) & near_i:
+                    transitions.add(k, new_idx)
                 # if j and new_idx are neighbor, then add new_idx ---> j
-                if adj_k[j, new_idx] != 0:
-                    transitions[j, new_idx] = 1
-                """Update IJ matrix"""
-                IJ = np.pad(IJ, (0, 1), 'constant')
-                sym_adj_change(IJ, adj_k, transitions, i)
-                sym_adj_change(IJ, adj_k, transitions, new_idx)
+                if j in adj.walk(new_idx, trans_length, backward=True):
+                    transitions.add(j, new_idx)
+                """Update IJ worklist"""
+                IJ.grow(1)
+                _sym_adj_change(IJ, adj, trans_length, transitions, i)
+                _sym_adj_change(IJ, adj, trans_length, transitions, new_idx)
                 if logger.getEffectiveLevel() <= logging.DEBUG:
                     msg = '\n\n Updated adj: \n{adj}'.format(adj=adj)
                     msg += '\n\n Updated trans: \n{trans}'.format(trans=
@@ -1278,7 +1285,7 @@ def _discretize_dual(
                 logger.info('Divided region: {i}\n'.format(i=i))
         elif vol2 < abs_tol:
             logger.info('Found: {i} ---> {j}\n'.format(i=i, j=j))
-            transitions[j, i] = 1
+            transitions.add(j, i)
         else:
             if logger.level <= logging.DEBUG:
                 msg = '\t Unreachable: {i} --X--> {j}\n'.format(i=i, j=j)
@@ -1287,17 +1294,17 @@ def _discretize_dual(
                 logger.debug(msg)
             else:
                 logger.info('\t unreachable\n')
-            transitions[j, i] = 0
+            transitions.discard(j, i)
         # check to avoid overlapping Regions
         if debug:
             tmp_part = PropPreservingPartition(
                 domain=part.domain,
-                regions=sol, adj=sp.lil_matrix(adj),
+                regions=sol, adj=adj.tolil(part.adj.dtype),
                 prop_regions=part.prop_regions
             )
             assert(tmp_part.is_partition() )
         n_cells = len(sol)
-        progress_ratio = 1 - float(np.sum(IJ) ) /n_cells**2
+        progress_ratio = 1 - float(len(IJ)) /n_cells**2
         progress += [progress_ratio]
         msg = '\t total # polytopes: {n_cells}\n'.format(n_cells=n_cells)
         msg += '\t progress ratio: {pr}\n'.format(pr=progress_ratio)
@@ -1315,7 +1322,7 @@ def _discretize_dual(
             continue
         tmp_part = PropPreservingPartition(
             domain=part.domain,
-            regions=sol, adj=sp.lil_matrix(adj),
+            regions=sol, adj=adj.tolil(part.adj.dtype),
             prop_regions=part.prop_regions
         )
         # plot pair under reachability check
@@ -1327,7 +1334,8 @@ def _discretize_dual(
         fig.canvas.draw()
         # plot partition
         ax1.clear()
-        plot_partition(tmp_part, transitions.T, ax=ax1, color_seed=23)
+        plot_partition(
+            tmp_part, transitions.tolil().T, ax=ax1, color_seed=23)
         # plot dynamics
         ssys.plot(ax1, show_domain=False)
         # plot hatched continuous propositions
@@ -1345,7 +1353,7 @@ def _discretize_dual(
         plt.pause(1)        
     new_part = PropPreservingPartition(
         domain=part.domain,
-        regions=sol, adj=sp.lil_matrix(adj),
+        regions=sol, adj=adj.tolil(part.adj.dtype),
         prop_regions=part.prop_regions
     )
     # check completeness of adjacency matrix
@@ -1354,7 +1362,7 @@ def _discretize_dual(
         tmp_part.compute_adj()
     # Generate transition system and add transitions
     ofts = trs.FTS()
-    adj = sp.lil_matrix(transitions.T)
+    adj = transitions.tolil().T
     n = adj.shape[0]
     ofts_states = range(n)
     ofts.states.add_from(ofts_states)
@@ -1420,6 +1428,267 @@ def sym_adj_change(IJ, adj_k, transitions, i):
     IJ[i, :] = horizontal.astype(int)
     IJ[:, i] = vertical.astype(int)
 
+class _Relation(object):
+    """Sparse binary relation over cell indices that can grow.
+
+    Entry C{(i, j)} corresponds to the nonzero element C{[i, j]}
+    of the matrices used by L{reachable_within} and L{sym_adj_change}.
+    Both the row and the column of each index are stored as sets,
+    so that a row or column can be read or cleared in time
+    proportional to its number of nonzeros.
+    """
+    def __init__(self, n=0):
+        self._rows = [set() for i in range(n)]
+        self._cols = [set() for i in range(n)]
+
+    @classmethod
+    def from_matrix(cls, m):
+        """Return relation with the nonzero pattern of C{m}.
+
+        @param m: square matrix
+        @type m: C{scipy.sparse} matrix or C{numpy.ndarray}
+        """
+        n = m.shape[0]
+        rel = cls(n)
+        rows, cols = sp.coo_matrix(m).nonzero()
+        for i, j in zip(rows.tolist(), cols.tolist()):
+            rel.add(i, j)
+        return rel
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, pair):
+        i, j = pair
+        return j in self._rows[i]
+
+    def __str__(self):
+        pairs = sorted(
+            (i, j) for i, row in enumerate(self._rows) for j in row)
+        return str(pairs)
+
+    def grow(self, k):
+        """Append C{k} new indices, unrelated to any other."""
+        for r in range(k):
+            self._rows.append(set())
+            self._cols.append(set())
+
+    def add(self, i, j):
+        self._rows[i].add(j)
+        self._cols[j].add(i)
+
+    def discard(self, i, j):
+        self._rows[i].discard(j)
+        self._cols[j].discard(i)
+
+    def row(self, i):
+        """Return C{set} of C{j} related to C{i} (do not mutate)."""
+        return self._rows[i]
+
+    def col(self, j):
+        """Return C{set} of C{i} related to C{j} (do not mutate)."""
+        return self._cols[j]
+
+    def clear_row(self, i):
+        for j in self._rows[i]:
+            self._cols[j].discard(i)
+        self._rows[i] = set()
+
+    def clear_col(self, j):
+        for i in self._cols[j]:
+            self._rows[i].discard(j)
+        self._cols[j] = set()
+
+    def nnz(self):
+        return sum(len(row) for row in self._rows)
+
+    def tolil(self, dtype=int):
+        """Return relation as C{scipy.sparse.lil_matrix}."""
+        n = len(self._rows)
+        rows = [i for i, row in enumerate(self._rows) for j in row]
+        cols = [j for row in self._rows for j in row]
+        data = np.ones(len(rows), dtype=dtype)
+        m = sp.coo_matrix((data, (rows, cols)), shape=(n, n))
+        return m.tolil()
+
+    def walk(self, i, length, backward=False):
+        """Return indices reachable from C{i} in exactly C{length} steps.
+
+        The result is the nonzero pattern of row C{i}
+        (column C{i} if C{backward}) of the matrix returned
+        by L{reachable_within}.
+        """
+        step = self._cols if backward else self._rows
+        reached = step[i]
+        for k in range(1, max(length, 1)):
+            reached = set().union(*(step[r] for r in reached))
+        return reached
+
+class _PairQueue(object):
+    """Worklist of cell pairs C{(j, i)} pending a reachability check.
+
+    Pairs are popped in the same order that C{np.nonzero}
+    enumerates a dense C{IJ} matrix, i.e., lexicographically.
+    Removed pairs stay in the heap until popped,
+    and are skipped if no longer pending.
+    """
+    def __init__(self, n=0):
+        self._pending = _Relation(n)
+        self._heap = list()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def grow(self, k):
+        self._pending.grow(k)
+
+    def add(self, j, i):
+        if (j, i) in self._pending:
+            return
+        self._pending.add(j, i)
+        self._size += 1
+        heapq.heappush(self._heap, (j, i))
+
+    def discard(self, j, i):
+        if (j, i) not in self._pending:
+            return
+        self._pending.discard(j, i)
+        self._size -= 1
+
+    def pop(self):
+        """Remove and return the least pending pair."""
+        while self._heap:
+            j, i = heapq.heappop(self._heap)
+            if (j, i) in self._pending:
+                self._pending.discard(j, i)
+                self._size -= 1
+                return j, i
+        raise KeyError('pop from empty queue')
+
+    def clear_row(self, j):
+        self._size -= len(self._pending.row(j))
+        self._pending.clear_row(j)
+
+    def clear_col(self, i):
+        self._size -= len(self._pending.col(i))
+        self._pending.clear_col(i)
+
+    def __str__(self):
+        return str(self._pending)
+
+def _reachable_pairs(trans_length, adj):
+    """Return L{_PairQueue} with the pairs of C{reachable_within}."""
+    n = len(adj)
+    IJ = _PairQueue(n)
+    for i in range(n):
+        for k in sorted(adj.walk(i, trans_length)):
+            IJ.add(i, k)
+    return IJ
+
+def _sym_adj_change(IJ, adj, trans_length, transitions, i):
+    """Sparse version of L{sym_adj_change}.
+
+    Replace row and column C{i} of C{IJ} with those pairs
+    that are reachable within C{trans_length} hops in C{adj},
+    but do not yet have a transition.
+    """
+    IJ.clear_row(i)
+    IJ.clear_col(i)
+    for k in adj.walk(i, trans_length):
+        if (i, k) not in transitions:
+            IJ.add(i, k)
+    for k in adj.walk(i, trans_length, backward=True):
+        if (k, i) not in transitions:
+            IJ.add(k, i)
+
+def _check_pairs(pool, check, args, pre_cache):
+    """Map C{check} over pairs of cells, reusing cached C{S0}.
+
+    Each tuple in C{args} is extended with C{(S0, pre_cache)}.
+    Without a pool, C{check} uses C{pre_cache} directly.
+    The processes of a pool do not share C{pre_cache},
+    so it is accessed here: C{S0} is looked up before mapping,
+    and each newly computed one is stored as its result arrives.
+
+    @return: iterator over the results of C{check},
+        in the order of C{args}
+    """
+    if pre_cache is None or pool is None:
+        args = [x + (None, pre_cache) for x in args]
+        for c in _imap_pairs(pool, check, args):
+            yield c
+        return
+    keys = [feasible_key(*x) for x in args]
+    cached = [pre_cache.get(key) for key in keys]
+    args = [x + (S0, None) for x, S0 in zip(args, cached)]
+    checked = _imap_pairs(pool, check, args)
+    for key, S0, c in zip(keys, cached, checked):
+        if S0 is None:
+            pre_cache.put(key, c[0].copy())
+        yield c
+
+def _active_subsys(ssys, subsys_list, i):
+    """Return dynamics active in cell C{i}."""
+    if subsys_list is None:
+        return ssys
+    return ssys.list_subsys[subsys_list[i]]
+
+def _check_pair_bi(args):
+    """Compute C{S0} for a pair of cells, and how it splits C{si}.
+
+    Used by L{_discretize_bi}. Takes a single tuple
+    of arguments, so that it can be mapped over a process pool.
+    If C{S0} is given, then it is not computed again.
+
+    @return: C{(S0, isect, vol1, risect, diff, vol2, rdiff)}
+    """
+    (si, sj, ss, N, closed_loop, use_all_horizon,
+     trans_set, max_num_poly, S0, pre_cache) = args
+    if S0 is None:
+        S0 = solve_feasible(
+            si, sj, ss, N, closed_loop,
+            use_all_horizon, trans_set, max_num_poly,
+            pre_cache=pre_cache
+        )
+    else:
+        S0 = S0.copy()
+    #logger.debug('si \cap s0')
+    isect = si.intersect(S0)
+    vol1 = isect.volume
+    risect, xi = pc.cheby_ball(isect)
+    #logger.debug('si \ s0')
+    diff = si.diff(S0)
+    vol2 = diff.volume
+    rdiff, xd = pc.cheby_ball(diff)
+    return S0, isect, vol1, risect, diff, vol2, rdiff
+
+def _check_pair_dual(args):
+    """Compute C{S0} for a pair of cells, and its intersection with C{si}.
+
+    Used by L{_discretize_dual}, like L{_check_pair_bi}.
+
+    @return: C{(S0, isect, vol1, risect, rsi, vol2)}
+    """
+    (si, sj, ss, N, closed_loop, use_all_horizon,
+     trans_set, max_num_poly, S0, pre_cache) = args
+    if S0 is None:
+        S0 = solve_feasible(
+            si, sj, ss, N, closed_loop,
+            use_all_horizon, trans_set, max_num_poly,
+            pre_cache=pre_cache
+        )
+    else:
+        S0 = S0.copy()
+    #logger.debug('si \cap s0')
+    isect = si.intersect(S0)
+    vol1 = isect.volume
+    risect, xi = pc.cheby_ball(isect)
+    #logger.debug('si \ s0')
+    rsi, xd = pc.cheby_ball(si)
+    vol2 = si.volume-vol1 # not accurate. need to check polytope class
+    return S0, isect, vol1, risect, rsi, vol2
+
 # DEFUNCT until further notice
 def discretize_overlap(closed_loop=False, conservative=False):
     """default False.
@@ -1564,7 +1833,7 @@ def multiproc_discretize_switched(
         job.join()
 
     # merge their domains
-    (merged_abstr, ap_labeling) = merge_partitions(abstractions)
+    (merged_abstr, ap_labeling) = multiproc_merge_partitions(abstractions)
     n = len(merged_abstr.ppp)
     logger.info('Merged partition has: ' + str(n) + ', states')
 
@@ -1597,7 +1866,8 @@ def multiproc_discretize_switched(
 
 def discretize_switched(
     ppp, hybrid_sys, disc_params=None,
-    plot=False, show_ts=False, only_adjacent=True
+    plot=False, show_ts=False, only_adjacent=True,
+    workers=None, pre_cache=None
 ):
     """Abstract switched dynamics over given partition.
 
@@ -1615,6 +1885,18 @@ def discretize_switched(
 
     @param show_ts, only_adjacent: options for L{AbstractPwa.plot}.
 
+    @param workers: number of processes, passed to L{discretize}
+        (unless given in C{disc_params}) and L{get_transitions}.
+        If given, then partitions are merged with
+        L{multiproc_merge_partitions}.
+    @type workers: C{None} or int >= 1
+
+    @param pre_cache: passed to L{discretize}
+        (unless given in C{disc_params}) and L{get_transitions}.
+        The transitions over the merged partition
+        reuse reachable sets computed for the modes.
+    @type pre_cache: L{PreCache} or C{None}
+
     @return: abstracted dynamics,
         some attributes are dict keyed by mode
     @rtype: L{AbstractSwitched}
@@ -1635,16 +1917,23 @@ def discretize_switched(
 
         cont_dyn = hybrid_sys.dynamics[mode]
 
+        params = dict(disc_params[mode])
+        params.setdefault('workers', workers)
+        params.setdefault('pre_cache', pre_cache)
         absys = discretize(
             ppp, cont_dyn,
-            **disc_params[mode]
+            **params
         )
         logger.debug('Mode Abstraction:\n' + str(absys) +'\n')
 
         abstractions[mode] = absys
 
     # merge their domains
-    (merged_abstr, ap_labeling) = merge_partitions(abstractions)
+    if workers is None:
+        (merged_abstr, ap_labeling) = merge_partitions(abstractions)
+    else:
+        (merged_abstr, ap_labeling) = multiproc_merge_partitions(
+            abstractions, workers)
     n = len(merged_abstr.ppp)
     logger.info('Merged partition has: ' + str(n) + ', states')
 
@@ -1657,7 +1946,9 @@ def discretize_switched(
 
         trans[mode] = get_transitions(
             merged_abstr, mode, cont_dyn,
-            N=params['N'], trans_length=params['trans_length']
+            N=params['N'], trans_length=params['trans_length'],
+            workers=params.get('workers', workers),
+            pre_cache=params.get('pre_cache', pre_cache)
         )
 
     # merge the abstractions, creating a common TS
@@ -1773,12 +2064,21 @@ def merge_abstractions(merged_abstr, trans, abstr, modes, mode_nums):
 def get_transitions(
     abstract_sys, mode, ssys, N=10,
     closed_loop=True,
-    trans_length=1
+    trans_length=1, workers=None, pre_cache=None
 ):
     """Find which transitions are feasible in given mode.
 
     Used for the candidate transitions of the merged partition.
 
+    @param workers: number of processes that check transitions.
+        If C{None}, then check them in the calling process.
+        The cells are not refined, so the result does not
+        depend on C{workers}.
+    @type workers: C{None} or int >= 1
+
+    @param pre_cache: see L{discretize}
+    @type pre_cache: L{PreCache} or C{None}
+
     @rtype: scipy.sparse.lil_matrix
     """
     logger.info('checking which transitions remain feasible after merging')
@@ -1789,7 +2089,7 @@ def get_transitions(
     if trans_length > 1:
         k = 1
         while k < trans_length:
-            IJ = np.dot(IJ, part.adj)
+            IJ = IJ.dot(part.adj)
             k += 1
         IJ = (IJ > 0).astype(int)
 
@@ -1798,18 +2098,10 @@ def get_transitions(
     transitions = sp.lil_matrix((n, n), dtype=int)
 
     # Do the abstraction
-    n_checked = 0
-    n_found = 0
-    while np.sum(IJ) > 0:
-        n_checked += 1
-
-        ind = np.nonzero(IJ)
-        i = ind[1][0]
-        j = ind[0][0]
-        IJ[j,i] = 0
-
-        logger.debug('checking transition: ' + str(i) + ' -> ' + str(j))
-
+    rows, cols = sp.coo_matrix(IJ).nonzero()
+    pairs = sorted(zip(rows.tolist(), cols.tolist()))
+    args = list()
+    for j, i in pairs:
         si = part[i]
         sj = part[j]
 
@@ -1817,20 +2109,29 @@ def get_transitions(
         trans_set = abstract_sys.ppp2pwa(mode, i)[1]
         active_subsystem = abstract_sys.ppp2sys(mode, i)[1]
 
-        trans_feasible = is_feasible(
-            si, sj, active_subsystem, N,
-            closed_loop = closed_loop,
-            trans_set = trans_set
-        )
-
-        if trans_feasible:
-            transitions[i, j] = 1
-            msg = '\t Feasible transition.'
-            n_found += 1
-        else:
-            transitions[i, j] = 0
-            msg = '\t Not feasible transition.'
-        logger.debug(msg)
+        args.append((si, sj, active_subsystem, N,
+                     closed_loop, False, trans_set, 5))
+    n_checked = 0
+    n_found = 0
+    pool = _make_pool(workers)
+    try:
+        checked = _check_pairs(pool, _check_transition, args, pre_cache)
+        for (j, i), (S0, trans_feasible) in zip(pairs, checked):
+            n_checked += 1
+            logger.debug('checking transition: ' + str(i) + ' -> ' + str(j))
+
+            if trans_feasible:
+                transitions[i, j] = 1
+                msg = '\t Feasible transition.'
+                n_found += 1
+            else:
+                transitions[i, j] = 0
+                msg = '\t Not feasible transition.'
+            logger.debug(msg)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
     logger.info('Checked: ' + str(n_checked))
     logger.info('Found: ' + str(n_found))
     assert n_checked != 0, 'would divide '
@@ -1838,15 +2139,65 @@ def get_transitions(
 
     return transitions
 
-def multiproc_merge_partitions(abstractions):
+def _check_transition(args):
+    """Return C{(S0, feasible)} for the transition C{si -> sj}.
+
+    Used by L{get_transitions}, like L{_check_pair_bi}.
+    """
+    (si, sj, ssys, N, closed_loop, use_all_horizon,
+     trans_set, max_num_poly, S0, pre_cache) = args
+    if S0 is None:
+        S0 = solve_feasible(
+            si, sj, ssys, N, closed_loop,
+            use_all_horizon, trans_set, max_num_poly,
+            pre_cache=pre_cache
+        )
+    return S0, si <= S0
+
+def multiproc_merge_partitions(abstractions, workers=None):
     """LOGTIME in #processors parallel merging.
 
-    Assuming sufficient number of processors.
+    Partitions are merged in pairs, in parallel,
+    then the results are merged in pairs, and so on.
+    Assuming sufficient number of processors,
+    the time is logarithmic in the number of modes.
 
-    UNDER DEVELOPMENT; function signature may change without notice.
-    Calling will result in NotImplementedError.
+    @param abstractions: keyed by mode
+    @type abstractions: dict of L{AbstractPwa}
+
+    @param workers: number of processes,
+        by default C{multiprocessing.cpu_count()}
+    @type workers: C{None} or int >= 1
+
+    @return: same as L{merge_partitions}
     """
-    raise NotImplementedError
+    if len(abstractions) == 0:
+        warnings.warn('Abstractions empty, nothing to merge.')
+        return
+    _check_mergeable(abstractions)
+    merged = list()
+    for mode, ab in abstractions.items():
+        n = len(ab.ppp)
+        merged.append((
+            list(ab.ppp),
+            {mode: list(range(n))},
+            {j: ab.ts.states[j]['ap'] for j in range(n)}))
+    if workers is None:
+        workers = mp.cpu_count()
+    pool = _make_pool(workers)
+    try:
+        while len(merged) > 1:
+            pairs = [merged[k] + merged[k + 1]
+                     for k in range(0, len(merged) - 1, 2)]
+            odd = merged[len(pairs) * 2:]
+            merged = _map_pairs(pool, _overlay_pair, pairs) + odd
+        regions, parents, ap_labeling = merged[0]
+        return _merged_abstraction(
+            abstractions, regions, parents, ap_labeling, pool)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
 
 def merge_partitions(abstractions):
     """Merge multiple abstractions.
@@ -1862,25 +2213,7 @@ def merge_partitions(abstractions):
     if len(abstractions) == 0:
         warnings.warn('Abstractions empty, nothing to merge.')
         return
-
-    # consistency check
-    for ab1 in abstractions.values():
-        for ab2 in abstractions.values():
-            p1 = ab1.ppp
-            p2 = ab2.ppp
-
-            if p1.prop_regions != p2.prop_regions:
-                msg = 'merge: partitions have different sets '
-                msg += 'of continuous propositions'
-                raise Exception(msg)
-
-            if not (p1.domain.A == p2.domain.A).all() or \
-            not (p1.domain.b == p2.domain.b).all():
-                raise Exception('merge: partitions have different domains')
-
-            # check equality of original PPP partitions
-            if ab1.orig_ppp == ab2.orig_ppp:
-                logger.info('original partitions happen to be equal')
+    _check_mergeable(abstractions)
 
     init_mode = list(abstractions.keys())[0]
     all_modes = set(abstractions)
@@ -1906,7 +2239,36 @@ def merge_partitions(abstractions):
         )
         regions, parents, ap_labeling = r
         prev_modes += [cur_mode]
-    new_list = regions
+    return _merged_abstraction(abstractions, regions, parents, ap_labeling)
+
+def _check_mergeable(abstractions):
+    """Raise C{Exception} if C{abstractions} cannot be merged."""
+    for ab1 in abstractions.values():
+        for ab2 in abstractions.values():
+            p1 = ab1.ppp
+            p2 = ab2.ppp
+
+            if p1.prop_regions != p2.prop_regions:
+                msg = 'merge: partitions have different sets '
+                msg += 'of continuous propositions'
+                raise Exception(msg)
+
+            if not (p1.domain.A == p2.domain.A).all() or \
+            not (p1.domain.b == p2.domain.b).all():
+                raise Exception('merge: partitions have different domains')
+
+            # check equality of original PPP partitions
+            if ab1.orig_ppp == ab2.orig_ppp:
+                logger.info('original partitions happen to be equal')
+
+def _merged_abstraction(
+    abstractions, new_list, parents, ap_labeling, pool=None
+):
+    """Return result of L{merge_partitions}, given merged regions.
+
+    Adjacency is checked over C{pool}, if given.
+    """
+    ab0 = list(abstractions.values())[0]
 
     # build adjacency based on spatial adjacencies of
     # component abstractions.
@@ -1914,29 +2276,20 @@ def merge_partitions(abstractions):
 	# Basically, if two regions are either 1) part of the same region in one of
 	# the abstractions or 2) adjacent in one of the abstractions, then the two
 	# regions are adjacent in the switched dynamics.
-    n_reg = len(new_list)
+    mode_adj = {
+        mode: sp.csr_matrix(ab.ppp.adj)
+        for mode, ab in abstractions.items()}
 
-    adj = np.zeros([n_reg, n_reg], dtype=int)
-    for i, reg_i in enumerate(new_list):
-        for j, reg_j in enumerate(new_list[0:i]):
-            touching = False
-            for mode in abstractions:
-                pi = parents[mode][i]
-                pj = parents[mode][j]
+    def touching(i, j):
+        for mode in abstractions:
+            pi = parents[mode][i]
+            pj = parents[mode][j]
 
-                part = abstractions[mode].ppp
+            if (mode_adj[mode][pi, pj] == 1) or (pi == pj):
+                return True
+        return False
 
-                if (part.adj[pi, pj] == 1) or (pi == pj):
-                    touching = True
-                    break
-
-            if not touching:
-                continue
-
-            if pc.is_adjacent(reg_i, reg_j):
-                adj[i,j] = 1
-                adj[j,i] = 1
-        adj[i,i] = 1
+    adj = _find_adjacent(new_list, touching, pool)
 
     ppp = PropPreservingPartition(
         domain=ab0.ppp.domain,
@@ -1995,17 +2348,43 @@ def merge_partition_pair(
     logger.info('merging partitions')
 
     part2 = ab2.ppp
+    parents_1 = {mode: old_parents[mode] for mode in prev_modes}
+    parents_2 = {cur_mode: list(range(len(part2)))}
+    ap_labeling_2 = {j: ab2.ts.states[j]['ap'] for j in range(len(part2))}
+    return _overlay(
+        old_regions, parents_1, old_ap_labeling,
+        list(part2), parents_2, ap_labeling_2)
+
+def _overlay(
+    regions_1, parents_1, ap_labeling_1,
+    regions_2, parents_2, ap_labeling_2
+):
+    """Intersect each region in C{regions_1} with each in C{regions_2}.
+
+    Only pairs of regions with intersecting
+    bounding boxes are intersected.
+    Used by L{merge_partition_pair} and L{multiproc_merge_partitions}.
 
-    modes = prev_modes + [cur_mode]
+    @param parents_1, parents_2: map modes to indices of
+        parent regions, as C{old_parents} of L{merge_partition_pair}
+    @param ap_labeling_1, ap_labeling_2: map region indices
+        to sets of propositions
 
+    @return: C{(new_list, parents, ap_labeling)},
+        as L{merge_partition_pair}
+    """
     new_list = []
-    parents = {mode:dict() for mode in modes}
+    parents = {mode:dict() for mode in parents_1}
+    parents.update({mode:dict() for mode in parents_2})
     ap_labeling = dict()
 
-    for i in range(len(old_regions)):
-        for j in range(len(part2)):
-            isect = pc.intersect(old_regions[i],
-                                 part2[j])
+    index = _RegionIndex(regions_2)
+    lower, upper = _bounding_boxes(regions_1)
+    candidates = index.intersecting(lower, upper)
+    for i, region_ind in enumerate(candidates):
+        for j in region_ind:
+            isect = pc.intersect(regions_1[i],
+                                 regions_2[j])
             rc, xc = pc.cheby_ball(isect)
 
             # no intersection ?
@@ -2019,19 +2398,20 @@ def merge_partition_pair(
                 isect = pc.Region([isect])
 
             # label the Region with propositions
-            isect.props = old_regions[i].props.copy()
+            isect.props = regions_1[i].props.copy()
 
+            idx = len(new_list)
             new_list.append(isect)
-            idx = new_list.index(isect)
 
             # keep track of parents
-            for mode in prev_modes:
-                parents[mode][idx] = old_parents[mode][i]
-            parents[cur_mode][idx] = j
+            for mode, p in parents_1.items():
+                parents[mode][idx] = p[i]
+            for mode, p in parents_2.items():
+                parents[mode][idx] = p[j]
 
             # union of AP labels from parent states
-            ap_label_1 = old_ap_labeling[i]
-            ap_label_2 = ab2.ts.states[j]['ap']
+            ap_label_1 = ap_labeling_1[i]
+            ap_label_2 = ap_labeling_2[j]
 
             logger.debug('AP label 1: ' + str(ap_label_1))
             logger.debug('AP label 2: ' + str(ap_label_2))
@@ -2050,3 +2430,11 @@ def merge_partition_pair(
             ap_labeling[idx] = ap_label_1
 
     return new_list, parents, ap_labeling
+
+def _overlay_pair(args):
+    """Call L{_overlay} with a single tuple of arguments.
+
+    Used by L{multiproc_merge_partitions},
+    so that it can be mapped over a process pool.
+    """
+    return _overlay(*args)
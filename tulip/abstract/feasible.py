@@ -37,6 +37,10 @@ Primary functions:
     - L{solve_feasible}
     - L{createLM}
     - L{get_max_extreme}
+    - L{horizon_model}
+
+Memoization of reachability computations:
+    - L{PreCache}
 
 See Also
 ========
@@ -47,16 +51,23 @@ from __future__ import print_function
 import logging
 logger = logging.getLogger(__name__)
 
-from collections import Iterable
+from collections import Iterable, OrderedDict
+import hashlib
+import weakref
 
 import numpy as np
 import polytope as pc
 
+# vertices of `Wset`, keyed by system
+_extreme_cache = weakref.WeakKeyDictionary()
+# horizon models, keyed by system, then horizon
+_horizon_cache = weakref.WeakKeyDictionary()
+
 def is_feasible(
     from_region, to_region, sys, N,
     closed_loop=True,
     use_all_horizon=False,
-    trans_set=None
+    trans_set=None, pre_cache=None
 ):
     """Return True if to_region is reachable from_region.
 
@@ -65,13 +76,14 @@ def is_feasible(
     S0 = solve_feasible(
         from_region, to_region, sys, N,
         closed_loop, use_all_horizon,
-        trans_set
+        trans_set, pre_cache=pre_cache
     )
     return from_region <= S0
 
 def solve_feasible(
     P1, P2, ssys, N=1, closed_loop=True,
-    use_all_horizon=False, trans_set=None, max_num_poly=5
+    use_all_horizon=False, trans_set=None, max_num_poly=5,
+    pre_cache=None
 ):
     r"""Compute S0 \subseteq trans_set from which P2 is N-reachable.
 
@@ -118,16 +130,47 @@ def solve_feasible(
         then force transitions to be in this set.
         Otherwise, P1 is used.
 
+    @param pre_cache: If given, then reuse results
+        computed earlier for the same arguments,
+        and store new results in it.
+        The steps of the closed-loop algorithm are cached too.
+    @type pre_cache: L{PreCache}
+
     @return: states from which P2 is reachable
     @rtype: C{Polytope} or C{Region}
     """
+    if pre_cache is None:
+        return _solve_feasible(
+            P1, P2, ssys, N, closed_loop,
+            use_all_horizon, trans_set, max_num_poly)
+    key = feasible_key(
+        P1, P2, ssys, N, closed_loop,
+        use_all_horizon, trans_set, max_num_poly)
+    S0 = pre_cache.get(key)
+    if S0 is None:
+        S0 = _solve_feasible(
+            P1, P2, ssys, N, closed_loop,
+            use_all_horizon, trans_set, max_num_poly,
+            pre_cache)
+        pre_cache.put(key, S0)
+    return S0.copy()
+
+
+def _solve_feasible(
+    P1, P2, ssys, N, closed_loop,
+    use_all_horizon, trans_set, max_num_poly,
+    pre_cache=None
+):
+    """Dispatch for L{solve_feasible}, without caching its result."""
     if closed_loop:
         if use_all_horizon:
             return _underapproximate_attractor(
-                P1, P2, ssys, N, trans_set=trans_set)
+                P1, P2, ssys, N, trans_set=trans_set,
+                pre_cache=pre_cache)
         else:
             return _solve_closed_loop_fixed_horizon(
-                P1, P2, ssys, N, trans_set=trans_set)
+                P1, P2, ssys, N, trans_set=trans_set,
+                pre_cache=pre_cache)
     else:
         if use_all_horizon:
             raise ValueError(
@@ -136,12 +179,13 @@ def solve_feasible(
         return solve_open_loop(
             P1, P2, ssys, N,
             trans_set=trans_set,
-            max_num_poly=max_num_poly
+            max_num_poly=max_num_poly,
+            pre_cache=pre_cache
         )
 
 
 def _solve_closed_loop_fixed_horizon(
-        P1, P2, ssys, N, trans_set=None):
+        P1, P2, ssys, N, trans_set=None, pre_cache=None):
     """Under-approximate states in P1 that can reach P2 in N > 0 steps.
 
     If intermediate polytopes are convex,
@@ -160,6 +204,8 @@ def _solve_closed_loop_fixed_horizon(
         to be in trans_set.
 
         Otherwise, P1 is used.
+
+    @param pre_cache: see L{solve_feasible}
     """
     assert N > 0, N
     p1 = P1.copy()  # initial set
@@ -173,7 +219,8 @@ def _solve_closed_loop_fixed_horizon(
         # first step from P1
         if i == 1:
             pinit = p1
-        p2 = solve_open_loop(pinit, p2, ssys, 1, trans_set)
+        p2 = solve_open_loop(pinit, p2, ssys, 1, trans_set,
+                             pre_cache=pre_cache)
         p2 = pc.reduce(p2)
         if not pc.is_fulldim(p2):
             return pc.Polytope()
@@ -181,7 +228,7 @@ def _solve_closed_loop_fixed_horizon(
 
 
 def _solve_closed_loop_bounded_horizon(
-        P1, P2, ssys, N, trans_set=None):
+        P1, P2, ssys, N, trans_set=None, pre_cache=None):
     """Under-approximate states in P1 that can reach P2 in <= N steps.
 
     See docstring of function `_solve_closed_loop_fixed_horizon`
@@ -200,7 +247,8 @@ def _solve_closed_loop_bounded_horizon(
         # first step from P1
         if i == 1:
             pinit = p1
-        p2 = solve_open_loop(pinit, p2, ssys, 1, trans_set)
+        p2 = solve_open_loop(pinit, p2, ssys, 1, trans_set,
+                             pre_cache=pre_cache)
         p2 = pc.reduce(p2)
         # running union
         s = s.union(p2, check_convex=True)
@@ -215,7 +263,7 @@ def _solve_closed_loop_bounded_horizon(
 
 
 def _underapproximate_attractor(
-        P1, P2, ssys, N, trans_set=None):
+        P1, P2, ssys, N, trans_set=None, pre_cache=None):
     """Under-approximate N-step attractor of polytope P2, with N > 0.
 
     See docstring of function `_solve_closed_loop_fixed_horizon`
@@ -234,7 +282,8 @@ def _underapproximate_attractor(
         # first step from P1
         if i == 1:
             pinit = p1
-        r = solve_open_loop(pinit, p2, ssys, 1, trans_set)
+        r = solve_open_loop(pinit, p2, ssys, 1, trans_set,
+                            pre_cache=pre_cache)
         p2 = p2.union(r, check_convex=True)
         p2 = pc.reduce(p2)
         # empty target polytope ?
@@ -253,7 +302,7 @@ def _print_horizon_warning():
 
 def solve_open_loop(
     P1, P2, ssys, N,
-    trans_set=None, max_num_poly=5
+    trans_set=None, max_num_poly=5, pre_cache=None
 ):
     r1 = P1.copy() # Initial set
     r2 = P2.copy() # Terminal set
@@ -276,14 +325,29 @@ def solve_open_loop(
     s0 = pc.Polytope()
     for p1 in start_polys:
         for p2 in target_polys:
-            cur_s0 = poly_to_poly(p1, p2, ssys, N, trans_set)
+            cur_s0 = poly_to_poly(
+                p1, p2, ssys, N, trans_set, pre_cache=pre_cache)
             s0 = s0.union(cur_s0, check_convex=True)
 
     return s0
 
-def poly_to_poly(p1, p2, ssys, N, trans_set=None):
+def poly_to_poly(p1, p2, ssys, N, trans_set=None, pre_cache=None):
     """Compute s0 for open-loop polytope to polytope N-reachability.
+
+    @param pre_cache: see L{solve_feasible}
+    @type pre_cache: L{PreCache}
     """
+    if pre_cache is None:
+        return _poly_to_poly(p1, p2, ssys, N, trans_set)
+    key = _cache_key('poly_to_poly', p1, p2, ssys, N, trans_set)
+    s0 = pre_cache.get(key)
+    if s0 is None:
+        s0 = _poly_to_poly(p1, p2, ssys, N, trans_set)
+        pre_cache.put(key, s0)
+    return s0.copy()
+
+def _poly_to_poly(p1, p2, ssys, N, trans_set=None):
+    """Compute s0 for L{poly_to_poly}, without caching."""
     p1 = p1.copy()
     p2 = p2.copy()
 
@@ -319,7 +383,8 @@ def volumes_for_reachability(part, max_num_poly):
     part = pc.Region(temp, [])
     return part
 
-def createLM(ssys, N, list_P, Pk=None, PN=None, disturbance_ind=None):
+def createLM(ssys, N, list_P, Pk=None, PN=None, disturbance_ind=None,
+             pre_cache=None):
     """Compute the components of the polytope::
 
         L [x(0)' u(0)' ... u(N-1)']' <= M
@@ -354,137 +419,64 @@ def createLM(ssys, N, list_P, Pk=None, PN=None, disturbance_ind=None):
     @param disturbance_ind: list indicating which k's
         that disturbance should be taken into account.
         Default is [1,2, ... N]
+
+    @param pre_cache: see L{solve_feasible}
+    @type pre_cache: L{PreCache}
+
+    @return: C{(L, M)}
     """
+    if pre_cache is None:
+        return _createLM(ssys, N, list_P, Pk, PN, disturbance_ind)
+    # the rows of (L, M) follow the rows of each polytope
+    key = _exact_cache_key(
+        'createLM', ssys, N, list_P, Pk, PN, disturbance_ind)
+    LM = pre_cache.get(key)
+    if LM is None:
+        LM = _createLM(ssys, N, list_P, Pk, PN, disturbance_ind)
+        pre_cache.put(key, LM)
+    L, M = LM
+    return L.copy(), M.copy()
+
+def _createLM(ssys, N, list_P, Pk=None, PN=None, disturbance_ind=None):
+    """Compute C{(L, M)} for L{createLM}, without caching."""
     if not isinstance(list_P, Iterable):
         list_P = [list_P] +(N-1) *[Pk] +[PN]
 
     if disturbance_ind is None:
         disturbance_ind = range(1,N+1)
 
-    A = ssys.A
-    B = ssys.B
-    E = ssys.E
-    K = ssys.K
-
-    D = ssys.Wset
-    PU = ssys.Uset
-
-    n = A.shape[1]  # State space dimension
-    m = B.shape[1]  # Input space dimension
-    p = E.shape[1]  # Disturbance space dimension
-
-    # non-zero disturbance matrix E ?
-    if not np.all(E==0):
-        if not pc.is_fulldim(D):
-            E = np.zeros(K.shape)
-
-    list_len = np.array([P.A.shape[0] for P in list_P])
-    sumlen = np.sum(list_len)
-
-    LUn = np.shape(PU.A)[0]
-
-    Lk = np.zeros([sumlen, n+N*m])
-    LU = np.zeros([LUn*N, n+N*m])
-
-    Mk = np.zeros([sumlen, 1])
-    MU = np.tile(PU.b.reshape(PU.b.size, 1), (N, 1))
-
-    Gk = np.zeros([sumlen, p*N])
-    GU = np.zeros([LUn*N, p*N])
-
-    K_hat = np.tile(K, (N, 1))
-
-    B_diag = B
-    E_diag = E
-    for i in range(N-1):
-        B_diag = _block_diag2(B_diag, B)
-        E_diag = _block_diag2(E_diag, E)
-
-    A_n = np.eye(n)
-    A_k = np.zeros([n, n*N])
-
-    sum_vert = 0
-    for i in range(N+1):
-        Li = list_P[i]
-
+    for Li in list_P:
         if not isinstance(Li, pc.Polytope):
             logger.warning('createLM: Li of type: ' +str(type(Li) ) )
 
-        ######### FOR M #########
-        idx = range(sum_vert, sum_vert + Li.A.shape[0])
-        Mk[idx, :] = Li.b.reshape(Li.b.size,1) - \
-                     Li.A.dot(A_k).dot(K_hat)
-
-        ######### FOR G #########
-        if i in disturbance_ind:
-            idx = np.ix_(
-                range(sum_vert, sum_vert + Li.A.shape[0]),
-                range(Gk.shape[1])
-            )
-            Gk[idx] = Li.A.dot(A_k).dot(E_diag)
-
-            if (PU.A.shape[1] == m+n) and (i < N):
-                A_k_E_diag = A_k.dot(E_diag)
-                d_mult = np.vstack([np.zeros([m, p*N]), A_k_E_diag])
-
-                idx = np.ix_(range(LUn*i, LUn*(i+1)), range(p*N))
-                GU[idx] = PU.A.dot(d_mult)
-
-        ######### FOR L #########
-        AB_line = np.hstack([A_n, A_k.dot(B_diag)])
-
-        idx = np.ix_(
-            range(sum_vert, sum_vert + Li.A.shape[0]),
-            range(0,Lk.shape[1])
-        )
-        Lk[idx] = Li.A.dot(AB_line)
-
-        if i >= N:
-            continue
-
-        if PU.A.shape[1] == m:
-            idx = np.ix_(
-                range(i*LUn, (i+1)*LUn),
-                range(n + m*i, n + m*(i+1))
-            )
-            LU[idx] = PU.A
-        elif PU.A.shape[1] == m+n:
-            uk_line = np.zeros([m, n + m*N])
-
-            idx = np.ix_(range(m), range(n+m*i, n+m*(i+1)))
-            uk_line[idx] = np.eye(m)
-
-            A_mult = np.vstack([uk_line, AB_line])
-
-            b_mult = np.zeros([m+n, 1])
-            b_mult[range(m, m+n), :] = A_k.dot(K_hat)
+    hm = horizon_model(ssys, N)
 
-            idx = np.ix_(
-                range(i*LUn, (i+1)*LUn),
-                range(n+m*N)
-            )
-            LU[idx] = PU.A.dot(A_mult)
-
-            MU[range(i*LUn, (i+1)*LUn), :] -= PU.A.dot(b_mult)
-
-        ####### Iterate #########
-        sum_vert += Li.A.shape[0]
-        A_n = A.dot(A_n)
-        A_k = A.dot(A_k)
-
-        idx = np.ix_(range(n), range(i*n, (i+1)*n))
-        A_k[idx] = np.eye(n)
+    # only the rows of the polytopes depend on list_P
+    list_P = list_P[:N+1]
+    Lk = np.vstack([Li.A.dot(AB) for Li, AB in zip(list_P, hm.AB)])
+    Mk = np.vstack([
+        Li.b.reshape(Li.b.size, 1) - Li.A.dot(AK)
+        for Li, AK in zip(list_P, hm.AK)])
+    Gk = np.vstack([
+        Li.A.dot(AE) if i in disturbance_ind
+        else np.zeros([Li.A.shape[0], AE.shape[1]])
+        for i, (Li, AE) in enumerate(zip(list_P, hm.AE))])
 
     # Get disturbance sets
     if not np.all(Gk==0):
+        GU = hm.GU.copy()
+        LUn = hm.GU.shape[0] // N
+        for i in range(N):
+            if i not in disturbance_ind:
+                GU[i*LUn:(i+1)*LUn, :] = 0
         G = np.vstack([Gk, GU])
-        D_hat = get_max_extreme(G, D, N)
+        D_hat = get_max_extreme(G, ssys.Wset, N, _disturbance_extreme(ssys))
     else:
-        D_hat = np.zeros([sumlen + LUn*N, 1])
+        D_hat = np.zeros([Lk.shape[0] + hm.LU.shape[0], 1])
 
     # Put together matrices L, M
-    L = np.vstack([Lk, LU])
-    M = np.vstack([Mk, MU]) - D_hat
+    L = np.vstack([Lk, hm.LU])
+    M = np.vstack([Mk, hm.MU]) - D_hat
 
     msg = 'Computed S0 polytope: L x <= M, where:\n\t L = \n'
     msg += str(L) +'\n\t M = \n' + str(M) +'\n'
@@ -492,7 +484,113 @@ def createLM(ssys, N, list_P, Pk=None, PN=None, disturbance_ind=None):
 
     return L,M
 
-def get_max_extreme(G,D,N):
+class HorizonModel(object):
+    """Dynamics of a system stacked over a horizon.
+
+    For an L{LtiSysDyn} and horizon C{N}, the states::
+
+        x(k) = A^k x(0) + sum_{j < k} A^(k-1-j) (B u(j) + E d(j) + K)
+
+    are affine in C{[x(0)' u(0)' ... u(N-1)']'}.
+    The blocks of this map, and the constraints from C{ssys.Uset}
+    on all inputs, do not depend on the polytopes passed to
+    L{createLM}, so they are computed once, by L{horizon_model}.
+
+    Attributes, with C{k = 0, ..., N} indexing the first axis:
+
+      - C{AB}: C{[A^k, A^(k-1) B, ..., B, 0, ..., 0]},
+        the map from C{[x(0); u]} to C{x(k)}
+      - C{AE}: C{[A^(k-1) E, ..., E, 0, ..., 0]},
+        the map from C{[d(0); ...; d(N-1)]} to C{x(k)}
+      - C{AK}: C{sum_{j < k} A^j K}
+      - C{LU}, C{MU}, C{GU}: rows of C{L}, C{M}, C{G}
+        for the input constraints of L{createLM}
+    """
+
+    def __init__(self, ssys, N):
+        A = ssys.A
+        B = ssys.B
+        E = ssys.E
+        K = ssys.K
+        D = ssys.Wset
+        PU = ssys.Uset
+
+        n = A.shape[1]  # State space dimension
+        m = B.shape[1]  # Input space dimension
+        p = E.shape[1]  # Disturbance space dimension
+
+        # non-zero disturbance matrix E ?
+        if not np.all(E==0):
+            if not pc.is_fulldim(D):
+                E = np.zeros(E.shape)
+
+        # A_pow[k] = A^k
+        A_pow = np.empty([N+1, n, n])
+        A_pow[0] = np.eye(n)
+        for k in range(N):
+            A_pow[k+1] = A.dot(A_pow[k])
+
+        # block j of row k is A^(k-1-j) if j < k, else zero
+        k, j = np.ogrid[0:N+1, 0:N]
+        power = k - 1 - j
+        below = (power >= 0)[:, :, np.newaxis, np.newaxis]
+        power = np.maximum(power, 0)
+
+        def stack(X):
+            AX = A_pow[:N].dot(X)
+            blocks = np.where(below, AX[power], 0.0)
+            # (k, j, n, cols) -> (k, n, j * cols)
+            return blocks.transpose(0, 2, 1, 3).reshape(
+                N+1, n, N*X.shape[1])
+
+        self.N = N
+        self.AB = np.concatenate([A_pow, stack(B)], axis=2)
+        self.AE = stack(E)
+        self.AK = np.zeros([N+1, n, 1])
+        self.AK[1:] = np.cumsum(A_pow[:N].dot(K), axis=0)
+
+        # input constraints for k = 0, ..., N-1
+        LUn = PU.A.shape[0]
+        self.LU = np.zeros([LUn*N, n+N*m])
+        self.MU = np.tile(PU.b.reshape(PU.b.size, 1), (N, 1))
+        self.GU = np.zeros([LUn*N, p*N])
+        if PU.A.shape[1] == m:
+            self.LU[:, n:] = np.kron(np.eye(N), PU.A)
+        elif PU.A.shape[1] == m+n:
+            PU_u = PU.A[:, :m]
+            PU_x = PU.A[:, m:]
+            self.LU[:] = np.vstack(np.matmul(PU_x, self.AB[:N]))
+            self.LU[:, n:] += np.kron(np.eye(N), PU_u)
+            self.MU -= np.vstack(np.matmul(PU_x, self.AK[:N]))
+            self.GU[:] = np.vstack(np.matmul(PU_x, self.AE[:N]))
+        self._data = [np.array(x, copy=True) for x in _system_data(ssys)]
+
+def horizon_model(ssys, N):
+    """Return L{HorizonModel} of C{ssys} over horizon C{N}.
+
+    Computed once per system and horizon,
+    and recomputed if the matrices or sets of C{ssys} change.
+    """
+    models = _horizon_cache.setdefault(ssys, dict())
+    hm = models.get(N)
+    # compare the arrays of ssys with copies stored by hm,
+    # without copying them on each lookup
+    data = _system_data(ssys)
+    if hm is not None and len(hm._data) == len(data) and all(
+            np.array_equal(x, y) for x, y in zip(hm._data, data)):
+        return hm
+    hm = HorizonModel(ssys, N)
+    models[N] = hm
+    return hm
+
+def _system_data(ssys):
+    """Return the arrays that define C{ssys}."""
+    data = [ssys.A, ssys.B, ssys.E, ssys.K, ssys.Uset.A, ssys.Uset.b]
+    if ssys.Wset is not None:
+        data.extend([ssys.Wset.A, ssys.Wset.b])
+    return data
+
+def get_max_extreme(G, D, N, D_extreme=None):
     """Calculate the array d_hat such that::
 
         d_hat = max(G*DN_extreme),
@@ -510,40 +608,183 @@ def get_max_extreme(G,D,N):
 
     for every possible d_i in the set of extreme points to D^N.
 
+    The maximum of a linear function over the product D^N
+    is the sum of its maxima over each factor D,
+    so the C{nv**N} vertices of D^N are not enumerated.
+    Instead, each block of columns of G that multiplies
+    d(k) is maximized over the C{nv} vertices of D.
+
     @param G: The matrix to maximize with respect to
     @param D: Polytope describing the disturbance set
     @param N: Horizon length
+    @param D_extreme: vertices of C{D}, one per row.
+        If C{None}, then computed with C{polytope.extreme}.
 
     @return: d_hat: Array describing the maximum possible
         effect from the disturbance
     """
-    D_extreme = pc.extreme(D)
-    nv = D_extreme.shape[0]
+    if D_extreme is None:
+        D_extreme = pc.extreme(D)
     dim = D_extreme.shape[1]
-    DN_extreme = np.zeros([dim*N, nv**N])
-
-    for i in range(nv**N):
-        # Last N digits are indices we want!
-        ind = np.base_repr(i, base=nv, padding=N)
-        for j in range(N):
-            DN_extreme[range(j*dim,(j+1)*dim),i] = D_extreme[int(ind[-j-1]),:]
-
-    d_hat = np.amax(np.dot(G,DN_extreme), axis=1)
+    # G_blocks[r, k, :] multiplies d(k) in row r
+    G_blocks = G.reshape(G.shape[0], N, dim)
+    d_hat = np.amax(G_blocks.dot(D_extreme.T), axis=2).sum(axis=1)
     return d_hat.reshape(d_hat.size,1)
 
-def _block_diag2(A,B):
-    """Like block_diag() in scipy.linalg, but restricted to 2 inputs.
+def _disturbance_extreme(ssys):
+    """Return vertices of C{ssys.Wset}, computed once per system.
+
+    Recomputed if C{ssys.Wset} changes.
+    """
+    D = ssys.Wset
+    cached = _extreme_cache.get(ssys)
+    if cached is not None:
+        A, b, D_extreme = cached
+        if np.array_equal(A, D.A) and np.array_equal(b, D.b):
+            return D_extreme
+    D_extreme = pc.extreme(D)
+    _extreme_cache[ssys] = (D.A.copy(), D.b.copy(), D_extreme)
+    return D_extreme
+
+class PreCache(object):
+    """Bounded cache of reachability computations (Pre, S0).
+
+    Results of L{solve_feasible} and L{poly_to_poly}
+    are stored with keys that hash the normalized
+    H-representation of the polytopes and the system matrices.
+    Results of L{createLM} depend on the order and scaling of
+    the constraints, so they are stored with keys that hash
+    the H-representation as given.
+    When full, the least recently used result is dropped.
+
+    Pass the same instance as C{pre_cache} to
+    L{solve_feasible}, L{discretize}, L{get_transitions},
+    or L{get_input}, to share results between these calls,
+    for example when discretizing again with a different
+    C{trans_length}.
+
+    Attributes:
+
+      - C{maxsize}: maximal number of stored results
+      - C{hits}, C{misses}: counts of lookups
+    """
 
-    Old versions of the linear algebra package in SciPy (i.e.,
-    scipy.linalg) do not have a block_diag() function.  Providing
-    _block_diag2() here until most folks are using sufficiently
-    up-to-date SciPy installations improves portability.
+    def __init__(self, maxsize=4096):
+        if maxsize < 1:
+            raise ValueError(
+                '`maxsize` must be positive, got: {m}'.format(m=maxsize))
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def __contains__(self, key):
+        return key in self._results
+
+    def __str__(self):
+        return (
+            'PreCache with {n} of at most {m} results, '
+            '{h} hits, {x} misses').format(
+                n=len(self), m=self.maxsize,
+                h=self.hits, x=self.misses)
+
+    def get(self, key):
+        """Return result stored with C{key}, or C{None}.
+
+        Counts a hit or a miss.
+        """
+        result = self._results.pop(key, None)
+        if result is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # most recently used last
+        self._results[key] = result
+        return result
+
+    def put(self, key, result):
+        """Store C{result} with C{key}."""
+        self._results.pop(key, None)
+        self._results[key] = result
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def clear(self):
+        """Remove all results and reset the counters."""
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
+
+def feasible_key(
+    P1, P2, ssys, N=1, closed_loop=True,
+    use_all_horizon=False, trans_set=None, max_num_poly=5
+):
+    """Return key of L{solve_feasible} arguments in a L{PreCache}."""
+    return _cache_key(
+        'solve_feasible', P1, P2, ssys, N, closed_loop,
+        use_all_horizon, trans_set, max_num_poly)
+
+# decimals kept when hashing normalized constraints
+_KEY_DECIMALS = 10
+
+def _cache_key(*args):
+    """Return hash of C{args}, for use as key of L{PreCache}."""
+    h = hashlib.sha1()
+    for x in args:
+        _hash_update(h, x)
+    return h.hexdigest()
+
+def _exact_cache_key(*args):
+    """Return hash of C{args}, with polytopes as given.
+
+    Unlike L{_cache_key}, polytopes that differ in the order,
+    scaling, or repetition of constraints have different keys.
     """
-    if len(A.shape) == 1:  # Cast 1d array into matrix
-        A = np.array([A])
-    if len(B.shape) == 1:
-        B = np.array([B])
-    C = np.zeros((A.shape[0]+B.shape[0], A.shape[1]+B.shape[1]))
-    C[:A.shape[0], :A.shape[1]] = A.copy()
-    C[A.shape[0]:, A.shape[1]:] = B.copy()
-    return C
+    h = hashlib.sha1()
+    for x in args:
+        _hash_update(h, x, exact=True)
+    return h.hexdigest()
+
+def _hash_update(h, x, exact=False):
+    if isinstance(x, pc.Region):
+        h.update('R{n}:'.format(n=len(x)).encode())
+        for p in x:
+            _hash_update(h, p, exact)
+    elif isinstance(x, pc.Polytope):
+        if exact:
+            h.update(b'Q:')
+            _hash_update(h, np.asarray(x.A))
+            _hash_update(h, np.asarray(x.b))
+        else:
+            h.update(b'P:')
+            _hash_update(h, _normalized_hrep(x))
+    elif isinstance(x, (list, tuple)):
+        h.update('L{n}:'.format(n=len(x)).encode())
+        for y in x:
+            _hash_update(h, y, exact)
+    elif isinstance(x, np.ndarray):
+        h.update('{s}:'.format(s=x.shape).encode())
+        h.update(np.ascontiguousarray(x, dtype=float).tobytes())
+    elif hasattr(x, 'A') and hasattr(x, 'Uset'):
+        # system dynamics
+        h.update(b'S:')
+        for name in ('A', 'B', 'E', 'K', 'Uset', 'Wset'):
+            _hash_update(h, getattr(x, name), exact)
+    else:
+        h.update('{x!r}:'.format(x=x).encode())
+
+def _normalized_hrep(p):
+    """Return rows of C{[A, b]} scaled to unit normals, sorted, unique."""
+    A = np.asarray(p.A, dtype=float)
+    if A.size == 0:
+        return np.zeros((0, 0))
+    b = np.asarray(p.b, dtype=float).reshape(A.shape[0], 1)
+    norms = np.linalg.norm(A, axis=1).reshape(A.shape[0], 1)
+    norms[norms == 0] = 1.0
+    H = np.hstack([A, b]) / norms
+    # + 0.0 maps -0.0 to 0.0
+    H = np.round(H, _KEY_DECIMALS) + 0.0
+    return np.unique(H, axis=0)
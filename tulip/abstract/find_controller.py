@@ -35,6 +35,8 @@ Algorithms related to controller synthesis for discretized dynamics.
 
 Primary functions:
     - L{get_input}
+    - L{OnlineController}
+    - L{ExplicitController}
 
 Helper functions:
     - L{get_input_helper}
@@ -59,7 +61,8 @@ except ImportError:
 from tulip.abstract.feasible import (
     solve_feasible,
     createLM,
-    _block_diag2)
+    horizon_model)
+from tulip.abstract.prop2partition import _RegionIndex
 
 
 logger = logging.getLogger(__name__)
@@ -81,7 +84,7 @@ def get_input(
     x0, ssys, abstraction,
     start, end,
     R=None, r=None, Q=None,
-    ord=1, mid_weight=0.0, solver=None
+    ord=1, mid_weight=0.0, solver=None, pre_cache=None
 ):
     """Compute continuous control input for discrete transition.
 
@@ -164,76 +167,103 @@ def get_input(
               mid_weight *|xc - x(N)|_{ord}
     @type ord: ord \in {1, 2, np.inf}
 
+    @param pre_cache: reuse the reachable sets and constraints
+        computed by earlier calls, or by L{discretize}
+    @type pre_cache: L{PreCache}
+
     @return: array A where row k contains the
         control input: u(k)
         for k = 0, 1 ... N-1
     @rtype: (N x m) numpy 2darray
     """
-    part = abstraction.ppp
-    regions = part.regions
-
+    regions = abstraction.ppp.regions
     ofts = abstraction.ts
-    original_regions = abstraction.orig_ppp
-    orig = abstraction._ppp2orig
-
     params = abstraction.disc_params
     N = params['N']  # horizon length
-    conservative = params['conservative']
     closed_loop = params['closed_loop']
     if closed_loop:
         logger.warning(
             '`closed_loop = True` for controller computation. '
             'This option is under development: use with caution.')
+    n = ssys.A.shape[1]
+    m = ssys.B.shape[1]
+    R, r, Q, mid_weight = _cost_parameters(N, n, m, R, r, Q, mid_weight)
+    if ofts is not None:
+        start_state = start
+        end_state = end
+
+        if end_state not in ofts.states.post(start_state):
+            raise Exception('get_input: '
+                            'no transition from state s' + str(start) +
+                            ' to state s' + str(end)
+                            )
+    else:
+        print("get_input: "
+              "Warning, no transition matrix found, assuming feasible")
+    P1 = _start_polytope(abstraction, start)
+    low_cost = np.inf
+    low_u = np.zeros([N, m])
+    # for each polytope in target region
+    for P3, R3, r3 in _target_costs(regions[end], N, n, R, r, mid_weight):
+        u, cost = get_input_helper(
+            x0, ssys, P1, P3, N, R3, r3, Q, ord,
+            closed_loop=closed_loop, solver=solver,
+            pre_cache=pre_cache
+        )
+        if cost < low_cost:
+            low_u = u
+            low_cost = cost
+    if low_cost == np.inf:
+        raise Exception("get_input: Did not find any trajectory")
+    return low_u
+
+
+def _cost_parameters(N, n, m, R, r, Q, mid_weight):
+    """Return cost parameters of L{get_input}, with defaults.
+
+    @return: C{(R, r, Q, mid_weight)}
+    """
     if (
             R is None and
             Q is None and
             r is None and
             mid_weight == 0):
         # Default behavior
-        Q = np.eye(N * ssys.B.shape[1])
-        R = np.zeros([N * x0.size, N * x0.size])
-        r = np.zeros([N * x0.size, 1])
         mid_weight = 3
     if R is None:
-        R = np.zeros([N * x0.size, N * x0.size])
+        R = np.zeros([N * n, N * n])
     if Q is None:
-        Q = np.eye(N * ssys.B.shape[1])
+        Q = np.eye(N * m)
     if r is None:
-        r = np.zeros([N * x0.size, 1])
-
-    if (R.shape[0] != R.shape[1]) or (R.shape[0] != N * x0.size):
+        r = np.zeros([N * n, 1])
+    if (R.shape[0] != R.shape[1]) or (R.shape[0] != N * n):
         raise Exception("get_input: "
                         "R must be square and have side N * dim(state space)")
-
-    if (Q.shape[0] != Q.shape[1]) or (Q.shape[0] != N * ssys.B.shape[1]):
+    if (Q.shape[0] != Q.shape[1]) or (Q.shape[0] != N * m):
         raise Exception("get_input: "
                         "Q must be square and have side N * dim(input space)")
-    if ofts is not None:
-        start_state = start
-        end_state = end
+    return R, r, Q, mid_weight
 
-        if end_state not in ofts.states.post(start_state):
-            raise Exception('get_input: '
-                            'no transition from state s' + str(start) +
-                            ' to state s' + str(end)
-                            )
-    else:
-        print("get_input: "
-              "Warning, no transition matrix found, assuming feasible")
 
+def _start_polytope(abstraction, start):
+    """Return polytope that contains the states along transitions.
+
+    If C{abstraction} is conservative, then this polytope is
+    the convex hull of region C{start}, otherwise the
+    original proposition preserving region that contains it.
+
+    @type abstraction: L{AbstractPwa}
+    @param start: index of the initial state in C{abstraction.ts}
+    @rtype: C{Polytope}
+    """
+    P_start = abstraction.ppp.regions[start]
+    original_regions = abstraction.orig_ppp
+    orig = abstraction._ppp2orig
+    conservative = abstraction.disc_params['conservative']
     if (not conservative) & (orig is None):
         print("List of original proposition preserving "
               "partitions not given, reverting to conservative mode")
         conservative = True
-
-    P_start = regions[start]
-    P_end = regions[end]
-
-    n = ssys.A.shape[1]
-    m = ssys.B.shape[1]
-
-    idx = range((N - 1) * n, N * n)
-
     if conservative:
         # Take convex hull or P_start as constraint
         if len(P_start) > 0:
@@ -262,56 +292,38 @@ def get_input(
             raise Exception(
                 '`conservative = False` arg requires '
                 'that original regions be convex')
+    return P1
 
-    if len(P_end) > 0:
-        low_cost = np.inf
-        low_u = np.zeros([N, m])
-
-        # for each polytope in target region
-        for P3 in P_end:
-            if mid_weight > 0:
-                rc, xc = pc.cheby_ball(P3)
-                R[
-                    np.ix_(
-                        range(n * (N - 1), n * N),
-                        range(n * (N - 1), n * N)
-                    )
-                ] += mid_weight * np.eye(n)
-
-                r[idx, 0] += -mid_weight * xc
-                u, cost = get_input_helper(
-                    x0, ssys, P1, P3, N, R, r, Q, ord,
-                    closed_loop=closed_loop, solver=solver
-                )
-                r[idx, 0] += mid_weight * xc
 
-            if cost < low_cost:
-                low_u = u
-                low_cost = cost
+def _target_costs(P_end, N, n, R, r, mid_weight):
+    """Yield each polytope of C{P_end}, with its cost parameters.
 
-        if low_cost == np.inf:
-            raise Exception("get_input: Did not find any trajectory")
+    The cost of distance from the Chebyshev center of the polytope
+    is added to copies of C{R} and C{r}.
+
+    @type P_end: C{Polytope} or C{Region}
+    @return: C{(P3, R3, r3)}
+    """
+    if len(P_end) > 0:
+        polytopes = list(P_end)
     else:
-        P3 = P_end
+        polytopes = [P_end]
+    idx = slice(n * (N - 1), n * N)
+    for P3 in polytopes:
+        R3 = R
+        r3 = r
         if mid_weight > 0:
             rc, xc = pc.cheby_ball(P3)
-            R[
-                np.ix_(
-                    range(n * (N - 1), n * N),
-                    range(n * (N - 1), n * N)
-                )
-            ] += mid_weight * np.eye(n)
-            r[idx, 0] += -mid_weight * xc
-        low_u, cost = get_input_helper(
-            x0, ssys, P1, P3, N, R, r, Q, ord,
-            closed_loop=closed_loop, solver=solver
-        )
-    return low_u
+            R3 = R.copy()
+            r3 = r.astype(float)
+            R3[idx, idx] += mid_weight * np.eye(n)
+            r3[idx, 0] += -mid_weight * xc
+        yield P3, R3, r3
 
 
 def get_input_helper(
     x0, ssys, P1, P3, N, R, r, Q, ord=1,
-    closed_loop=True, solver=None
+    closed_loop=True, solver=None, pre_cache=None
 ):
     """Calculate the sequence u_seq such that:
 
@@ -324,6 +336,20 @@ def get_input_helper(
         |Rx|_{ord} + |Qu|_{ord} + r'x +
         mid_weight * |xc - x(N)|_{ord}
     """
+    program = _input_program(
+        ssys, P1, P3, N, R, r, Q, ord,
+        closed_loop=closed_loop, pre_cache=pre_cache)
+    return program.solve(x0, solver=solver)
+
+
+def _input_program(
+    ssys, P1, P3, N, R, r, Q, ord=1,
+    closed_loop=True, pre_cache=None
+):
+    """Return the problem solved by L{get_input_helper}.
+
+    @rtype: L{_InputProgram}
+    """
     n = ssys.A.shape[1]
     m = ssys.B.shape[1]
 
@@ -334,55 +360,33 @@ def get_input_helper(
         for i in range(N - 1, 0, -1):
             temp_part = solve_feasible(
                 P1, temp_part, ssys, N=1,
-                closed_loop=False, trans_set=P1
+                closed_loop=False, trans_set=P1,
+                pre_cache=pre_cache
             )
             list_P.insert(0, temp_part)
         list_P.insert(0, P1)
-        L, M = createLM(ssys, N, list_P, disturbance_ind=[1])
+        L, M = createLM(ssys, N, list_P, disturbance_ind=[1],
+                        pre_cache=pre_cache)
     else:
         list_P.append(P1)
         for i in range(N - 1, 0, -1):
             list_P.append(P1)
         list_P.append(P3)
-        L, M = createLM(ssys, N, list_P)
+        L, M = createLM(ssys, N, list_P, pre_cache=pre_cache)
 
     # Remove first constraint on x(0)
-    L = L[range(list_P[0].A.shape[0], L.shape[0]), :]
-    M = M[range(list_P[0].A.shape[0], M.shape[0]), :]
+    L = L[list_P[0].A.shape[0]:, :]
+    M = M[list_P[0].A.shape[0]:, :]
 
     # Separate L matrix
-    Lx = L[:, range(n)]
-    Lu = L[:, range(n, L.shape[1])]
-    M = M - Lx.dot(x0).reshape(Lx.shape[0], 1)
-
-    B_diag = ssys.B
-    for i in range(N - 1):
-        B_diag = _block_diag2(B_diag, ssys.B)
-    K_hat = np.tile(ssys.K, (N, 1))
-    A_it = ssys.A.copy()
-    A_row = np.zeros([n, n * N])
-    A_K = np.zeros([n * N, n * N])
-    A_N = np.zeros([n * N, n])
-
-    for i in range(N):
-        A_row = ssys.A.dot(A_row)
-        A_row[np.ix_(
-            range(n),
-            range(i * n, (i + 1) * n)
-        )] = np.eye(n)
-
-        A_N[np.ix_(
-            range(i * n, (i + 1) * n),
-            range(n)
-        )] = A_it
-
-        A_K[np.ix_(
-            range(i * n, (i + 1) * n),
-            range(A_K.shape[1])
-        )] = A_row
-
-        A_it = ssys.A.dot(A_it)
-    Ct = A_K.dot(B_diag)
+    Lx = L[:, :n]
+    Lu = L[:, n:]
+
+    # x = A_N*x0 + Ct*u + A_K_hat, for x = [x(1); ... x(N)]
+    hm = horizon_model(ssys, N)
+    A_N = hm.AB[1:, :, :n].reshape(N * n, n)
+    Ct = hm.AB[1:, :, n:].reshape(N * n, N * m)
+    A_K_hat = hm.AK[1:].reshape(N * n, 1)
     if ord == 1:
         # f(\epsilon,u) = sum(\epsilon)
         c_LP = np.hstack((np.ones((1, N * (n + m))), r.T.dot(Ct)))
@@ -403,37 +407,17 @@ def get_input_helper(
                        - np.eye(N * m), Q)),
             np.hstack((np.zeros((Lu.shape[0], N * n + N * m)), Lu))
         ))
-        h_LP = np.vstack((np.zeros((2 * N * (n + m), 1)), M))
     elif ord == 2:
-        assert_cvxopt()
         # symmetrize
         Q2 = Q.T.dot(Q)
         R2 = R.T.dot(R)
-        # constraints
-        G = matrix(Lu)
-        h = matrix(M)
-        P = matrix(Q2 + Ct.T.dot(R2).dot(Ct))
-        q = matrix(
-            np.dot(
-                np.dot(x0.reshape(1, x0.size), A_N.T) +
-                A_K.dot(K_hat).T,
-                R2.dot(Ct)
-            ) +
-            0.5 * r.T.dot(Ct)
-        ).T
-        if solvers != None:
-            raise Exception(
-                "_get_input_helper: ",
-                "solver specified but only 'None' allowed for ord = 2")
-        sol = solvers.qp(P, q, G, h)
-        if sol['status'] != "optimal":
-            raise Exception(
-                "getInputHelper: "
-                "QP solver finished with status " +
-                str(sol['status']))
-        u = np.array(sol['x']).flatten()
-        cost = sol['primal objective']
-        return u.reshape(N, m), cost
+        P = Q2 + Ct.T.dot(R2).dot(Ct)
+        # q = (A_N*x0 + A_K_hat)'*R2*Ct + 0.5 * r'*Ct
+        RC = R2.dot(Ct)
+        q = A_K_hat.T.dot(RC) + 0.5 * r.T.dot(Ct)
+        return _InputProgram(
+            N, m, ord, q.flatten(), Lu, M.flatten(), Lx,
+            P=P, F=RC.T.dot(A_N))
     elif ord == np.inf:
         c_LP = np.hstack((np.ones((1, 2)), r.T.dot(Ct)))
         G_LP = np.vstack((
@@ -449,17 +433,475 @@ def get_input_helper(
                        -np.ones((N * m, 1)), Q)),
             np.hstack((np.zeros((Lu.shape[0], 2)), Lu))
         ))
-        h_LP = np.vstack((np.zeros((2 * N * (n + m), 1)), M))
-    sol = pc.polytope.lpsolve(c_LP.flatten(), G_LP, h_LP, solver=solver)
+    else:
+        raise ValueError(
+            '`ord` must be in `{1, 2, np.inf}`, got: ' + str(ord))
+    k = 2 * N * (n + m)
+    h_LP = np.vstack((np.zeros((k, 1)), M))
+    H = np.vstack((np.zeros((k, n)), Lx))
+    return _InputProgram(
+        N, m, ord, c_LP.flatten(), G_LP, h_LP.flatten(), H)
+
+
+class _InputProgram(object):
+    """Optimization problem over inputs, with initial state as parameter.
+
+    For C{ord} 1 or C{inf}, the linear program::
+
+        min c'z  s.t.  G z <= h - H x0
+
+    whose last C{N * m} variables are the inputs.
+    For C{ord = 2}, the quadratic program::
+
+        min 0.5 u'P u + (c + F x0)'u  s.t.  G u <= h - H x0
+
+    The right-hand side is computed in a preallocated array,
+    so a single instance should not be solved concurrently.
+    """
+
+    def __init__(self, N, m, ord, c, G, h, H, P=None, F=None):
+        self.N = N
+        self.m = m
+        self.ord = ord
+        self.c = c
+        self.G = G
+        self.h = h
+        self.H = H
+        self.P = P
+        self.F = F
+        self._h = np.empty_like(h)
+        if ord == 2 and solvers is not None:
+            self._P = matrix(P)
+            self._G = matrix(G)
+
+    def solve(self, x0, solver=None):
+        """Return input sequence and cost, for initial state C{x0}.
+
+        @rtype: C{(u, cost)}, where C{u} is an (N x m) numpy 2darray
+        """
+        x0 = np.asarray(x0, dtype=float).reshape(self.H.shape[1])
+        h = self._h
+        np.dot(self.H, x0, out=h)
+        np.subtract(self.h, h, out=h)
+        if self.ord == 2:
+            assert_cvxopt()
+            if solver is not None:
+                raise Exception(
+                    "_get_input_helper: ",
+                    "solver specified but only 'None' allowed for ord = 2")
+            q = self.c + self.F.dot(x0)
+            sol = solvers.qp(self._P, matrix(q), self._G, matrix(h))
+            if sol['status'] != "optimal":
+                raise Exception(
+                    "getInputHelper: "
+                    "QP solver finished with status " +
+                    str(sol['status']))
+            u = np.array(sol['x']).flatten()
+            cost = sol['primal objective']
+            return u.reshape(self.N, self.m), cost
+        sol = pc.polytope.lpsolve(self.c, self.G, h, solver=solver)
+        if sol['status'] != 0:
+            raise Exception(
+                "getInputHelper: "
+                "LP solver finished with error code " +
+                str(sol['status']))
+        var = np.array(sol['x']).flatten()
+        u = var[-self.N * self.m:]
+        cost = sol['fun']
+        return u.reshape(self.N, self.m), cost
+
+
+class OnlineController(object):
+    """Compute continuous inputs for transitions of an abstraction.
+
+    Computes the same inputs as L{get_input}.
+    The optimization problems of all transitions are
+    formulated once, when the controller is constructed.
+    At each step, only the constraints and cost that depend
+    on the initial state C{x0} are updated, and the solver is called.
+
+    Example::
+
+        controller = OnlineController(sys_dyn, disc_dynamics)
+        u = controller.get_input(x0, start, end)
+
+    The parameters are as for L{get_input}, and:
+
+    @param transitions: formulate problems only for these
+        pairs C{(start, end)}. If C{None}, then for all
+        transitions of C{abstraction.ts}.
+    @type transitions: iterable of C{tuple}
+    """
+
+    def __init__(
+        self, ssys, abstraction,
+        R=None, r=None, Q=None,
+        ord=1, mid_weight=0.0, solver=None, pre_cache=None,
+        transitions=None
+    ):
+        params = abstraction.disc_params
+        N = params['N']
+        closed_loop = params['closed_loop']
+        if closed_loop:
+            logger.warning(
+                '`closed_loop = True` for controller computation. '
+                'This option is under development: use with caution.')
+        n = ssys.A.shape[1]
+        m = ssys.B.shape[1]
+        R, r, Q, mid_weight = _cost_parameters(
+            N, n, m, R, r, Q, mid_weight)
+        if transitions is None:
+            if abstraction.ts is None:
+                raise ValueError(
+                    '`abstraction.ts is None`, so pass `transitions`')
+            transitions = abstraction.ts.transitions()
+        regions = abstraction.ppp.regions
+        self.N = N
+        self.solver = solver
+        self._programs = dict()
+        start_polytopes = dict()
+        for start, end in transitions:
+            if (start, end) in self._programs:
+                continue
+            if start not in start_polytopes:
+                start_polytopes[start] = _start_polytope(abstraction, start)
+            P1 = start_polytopes[start]
+            self._programs[(start, end)] = [
+                _input_program(
+                    ssys, P1, P3, N, R3, r3, Q, ord,
+                    closed_loop=closed_loop, pre_cache=pre_cache)
+                for P3, R3, r3 in _target_costs(
+                    regions[end], N, n, R, r, mid_weight)]
+
+    def get_input(self, x0, start, end):
+        """Compute continuous control input for discrete transition.
+
+        @param x0: initial continuous state
+        @type x0: numpy 1darray
+        @param start: index of the initial state in C{abstraction.ts}
+        @param end: index of the end state in C{abstraction.ts}
+        @return: array A where row k contains the
+            control input: u(k)
+            for k = 0, 1 ... N-1
+        @rtype: (N x m) numpy 2darray
+        """
+        programs = self._programs.get((start, end))
+        if programs is None:
+            raise Exception('get_input: '
+                            'no transition from state s' + str(start) +
+                            ' to state s' + str(end))
+        low_cost = np.inf
+        low_u = None
+        for program in programs:
+            u, cost = program.solve(x0, solver=self.solver)
+            if cost < low_cost:
+                low_u = u
+                low_cost = cost
+        if low_u is None:
+            raise Exception("get_input: Did not find any trajectory")
+        return low_u
+
+
+class ExplicitController(OnlineController):
+    """Explicit piecewise affine control laws for an abstraction.
+
+    For C{ord} 1 or C{inf}, the problem solved by L{get_input}
+    is a linear program whose parameter is the initial state C{x0}.
+    Its solution is piecewise affine in C{x0}: each polytope of the
+    start region is covered by critical regions, and in each critical
+    region the inputs are C{F x0 + g}. The regions and gains are computed for
+    each transition upon construction, so computing an input needs
+    only point location and an affine function.
+
+    If C{x0} is not in any critical region, for example in a region
+    thinner than the step used to explore regions,
+    then the linear program is solved.
+
+    The parameters are as for L{OnlineController}.
+
+    @ivar laws: for each transition C{(start, end)},
+        one law per polytope of the end region
+    @type laws: C{dict} of C{list} of L{ExplicitLaw}
+    """
+
+    def __init__(
+        self, ssys, abstraction,
+        R=None, r=None, Q=None,
+        ord=1, mid_weight=0.0, solver=None, pre_cache=None,
+        transitions=None
+    ):
+        if ord not in (1, np.inf):
+            raise ValueError(
+                '`ord` must be in `{1, np.inf}`, got: ' + str(ord))
+        super(ExplicitController, self).__init__(
+            ssys, abstraction, R=R, r=r, Q=Q, ord=ord,
+            mid_weight=mid_weight, solver=solver, pre_cache=pre_cache,
+            transitions=transitions)
+        self.laws = dict()
+        for (start, end), programs in self._programs.items():
+            P_start = abstraction.ppp.regions[start]
+            self.laws[(start, end)] = [
+                _explicit_law(program, P_start, solver=solver)
+                for program in programs]
+
+    def get_input(self, x0, start, end):
+        """Compute continuous control input for discrete transition.
+
+        See L{OnlineController.get_input}.
+        """
+        laws = self.laws.get((start, end))
+        if laws is None:
+            raise Exception('get_input: '
+                            'no transition from state s' + str(start) +
+                            ' to state s' + str(end))
+        x0 = np.asarray(x0, dtype=float).flatten()
+        low_cost = np.inf
+        low_u = None
+        for law, program in zip(laws, self._programs[(start, end)]):
+            r = law.evaluate(x0)
+            if r is None:
+                logger.debug(
+                    'no critical region contains: {x}'.format(x=x0))
+                r = program.solve(x0, solver=self.solver)
+            u, cost = r
+            if cost < low_cost:
+                low_u = u
+                low_cost = cost
+        if low_u is None:
+            raise Exception("get_input: Did not find any trajectory")
+        return low_u
+
+
+class ExplicitLaw(object):
+    """Piecewise affine solution of a parametric linear program.
+
+    In the polytope C{regions[i]}, the optimal inputs are
+    C{F[i].dot(x0) + g[i]}, and the optimal cost is
+    C{cost_F[i].dot(x0) + cost_g[i]}.
+
+    @ivar regions: critical regions
+    @type regions: C{list} of C{Polytope}
+    @ivar F, g: gains, of shapes (k x N*m x n) and (k x N*m),
+        for k regions
+    @ivar cost_F, cost_g: gains of the cost, of shapes
+        (k x n) and (k,)
+    """
+
+    def __init__(self, N, m, regions, F, g, cost_F, cost_g):
+        self.N = N
+        self.m = m
+        self.regions = regions
+        self.F = F
+        self.g = g
+        self.cost_F = cost_F
+        self.cost_g = cost_g
+        self._index = _RegionIndex(regions)
+
+    def __len__(self):
+        return len(self.regions)
+
+    def evaluate(self, x0):
+        """Return inputs and cost at C{x0}, or C{None}.
+
+        @return: C{None} if C{x0} is in no critical region
+        @rtype: C{(u, cost)}, where C{u} is an (N x m) numpy 2darray
+        """
+        (i,) = self._index.locate(x0.reshape(1, x0.size))
+        if i < 0:
+            return None
+        u = self.F[i].dot(x0) + self.g[i]
+        cost = self.cost_F[i].dot(x0) + self.cost_g[i]
+        return u.reshape(self.N, self.m), cost
+
+
+# relative tolerance for constraints to be active
+_ACTIVE_TOL = 1e-7
+# distance of points from facets, when exploring critical regions
+_FACET_STEP = 1e-5
+
+
+def _explicit_law(program, region, solver=None):
+    """Return explicit solution of linear C{program} over C{region}.
+
+    In each polytope of C{region}, critical regions are
+    explored starting from the Chebyshev center of the polytope,
+    by stepping across the facets of each critical region found.
+
+    @type program: L{_InputProgram}, with C{ord} 1 or C{inf}
+    @type region: C{Polytope} or C{Region}
+    @rtype: L{ExplicitLaw}
+    """
+    if len(region) == 0:
+        polytopes = [region]
+    else:
+        polytopes = list(region)
+    regions = list()
+    gains = list()
+    for domain in polytopes:
+        rc, xc = pc.cheby_ball(domain)
+        queue = [np.array(xc, dtype=float).flatten()]
+        while queue:
+            x = queue.pop()
+            if any(x in cr for cr in regions):
+                continue
+            found = _critical_region(program, x, domain, solver)
+            if found is None:
+                continue
+            cr, gain = found
+            regions.append(cr)
+            gains.append(gain)
+            queue.extend(_across_facets(cr, domain, solver))
+    logger.info('{k} critical regions'.format(k=len(regions)))
+    n = program.H.shape[1]
+    k = len(regions)
+    Nm = program.N * program.m
+    F = np.zeros((k, Nm, n))
+    g = np.zeros((k, Nm))
+    cost_F = np.zeros((k, n))
+    cost_g = np.zeros(k)
+    for i, (Fz, gz) in enumerate(gains):
+        F[i] = Fz[-Nm:]
+        g[i] = gz[-Nm:]
+        cost_F[i] = program.c.dot(Fz)
+        cost_g[i] = program.c.dot(gz)
+    return ExplicitLaw(program.N, program.m, regions, F, g, cost_F, cost_g)
+
+
+def _critical_region(program, x, domain, solver=None):
+    """Return critical region of linear C{program} that contains C{x}.
+
+    The optimal basis at C{x} is a set of active constraints,
+    for which the multipliers are nonnegative.
+    The critical region is where the solution of these
+    constraints as equalities satisfies the other constraints.
+
+    @return: C{None} if the program is infeasible at C{x},
+        or the critical region is not full-dimensional,
+        otherwise C{(region, (Fz, gz))}, where the solution
+        is C{Fz.dot(x) + gz} in C{region}
+    """
+    G = program.G
+    h = program.h
+    H = program.H
+    n_z = G.shape[1]
+    b = h - H.dot(x)
+    sol = pc.polytope.lpsolve(program.c, G, b, solver=solver)
+    if sol['status'] != 0:
+        return None
+    z = _optimal_vertex(G, b, np.array(sol['x']).flatten())
+    if z is None:
+        return None
+    slack = b - G.dot(z)
+    (active,) = np.nonzero(slack <= _ACTIVE_TOL * (1.0 + np.abs(b)))
+    # multipliers of active constraints: G_A' lam = -c, lam >= 0
+    GA = G[active]
+    n_a = len(active)
+    c_dual = np.ones(n_a)
+    G_dual = np.vstack((GA.T, -GA.T, -np.eye(n_a)))
+    tol = _ACTIVE_TOL * (1.0 + np.abs(program.c))
+    h_dual = np.hstack((-program.c + tol, program.c + tol, np.zeros(n_a)))
+    sol = pc.polytope.lpsolve(c_dual, G_dual, h_dual, solver=solver)
     if sol['status'] != 0:
-        raise Exception(
-            "getInputHelper: "
-            "LP solver finished with error code " +
-            str(sol['status']))
-    var = np.array(sol['x']).flatten()
-    u = var[-N * m:]
-    cost = sol['fun']
-    return u.reshape(N, m), cost
+        return None
+    lam = np.array(sol['x']).flatten()
+    # basis: constraints with positive multipliers,
+    # completed with other active constraints
+    order = np.argsort(-lam, kind='mergesort')
+    basis = list()
+    for i in order:
+        rows = basis + [active[i]]
+        if np.linalg.matrix_rank(G[rows]) == len(rows):
+            basis = rows
+        if len(basis) == n_z:
+            break
+    if len(basis) < n_z:
+        return None
+    gains = np.linalg.solve(G[basis], np.hstack((-H[basis], h[basis, None])))
+    Fz = gains[:, :-1]
+    gz = gains[:, -1]
+    other = np.ones(len(h), dtype=bool)
+    other[basis] = False
+    A = G[other].dot(Fz) + H[other]
+    c = h[other] - G[other].dot(gz)
+    norms = np.linalg.norm(A, axis=1)
+    flat = norms <= _ACTIVE_TOL
+    if np.any(c[flat] < -_ACTIVE_TOL):
+        return None
+    A = np.vstack((A[~flat], domain.A))
+    c = np.hstack((c[~flat], domain.b))
+    region = pc.reduce(pc.Polytope(A, c))
+    if not pc.is_fulldim(region) or x not in region:
+        return None
+    return region, (Fz, gz)
+
+
+def _optimal_vertex(G, b, z):
+    """Return vertex of C{G z <= b}, by moving from C{z} in its face.
+
+    If the optimal solutions of a linear program are not unique,
+    then the solver can return a point in the relative interior
+    of the optimal face. Moving within the affine hull of the
+    active constraints does not change the cost, so a vertex of
+    the optimal face is reached by moving along null space
+    directions of the active constraints until more become active.
+
+    @return: C{None} if the face is unbounded
+    """
+    n = G.shape[1]
+    for _ in range(n):
+        slack = b - G.dot(z)
+        (active,) = np.nonzero(slack <= _ACTIVE_TOL * (1.0 + np.abs(b)))
+        if len(active) == 0:
+            d = np.zeros(n)
+            d[0] = 1.0
+        else:
+            u, sv, vt = np.linalg.svd(G[active])
+            rank = np.sum(sv > _ACTIVE_TOL * max(1.0, sv[0]))
+            if rank == n:
+                return z
+            d = vt[rank]
+        Gd = G.dot(d)
+        if not np.any(Gd > _ACTIVE_TOL):
+            d = -d
+            Gd = -Gd
+        (bounding,) = np.nonzero(Gd > _ACTIVE_TOL)
+        if len(bounding) == 0:
+            return None
+        t = np.min(np.maximum(slack[bounding], 0.0) / Gd[bounding])
+        z = z + t * d
+    return z
+
+
+def _across_facets(region, domain, solver=None):
+    """Return points just outside the facets of C{region}, in C{domain}.
+
+    For each facet, the point is at distance C{_FACET_STEP}
+    from the Chebyshev center of that facet.
+    """
+    A = region.A
+    b = region.b
+    n = A.shape[1]
+    norms = np.linalg.norm(A, axis=1)
+    points = list()
+    for i in range(A.shape[0]):
+        # Chebyshev center of facet i: max r, s.t.
+        # A_j x + r |A_j| <= b_j for j != i, and A_i x = b_i
+        others = np.arange(A.shape[0]) != i
+        G = np.vstack((
+            np.hstack((A[others], norms[others, np.newaxis])),
+            np.hstack((A[[i]], np.zeros((1, 1)))),
+            np.hstack((-A[[i]], np.zeros((1, 1))))))
+        h = np.hstack((b[others], b[i], -b[i]))
+        c = np.zeros(n + 1)
+        c[-1] = -1.0
+        sol = pc.polytope.lpsolve(c, G, h, solver=solver)
+        if sol['status'] != 0:
+            continue
+        x = np.array(sol['x']).flatten()[:n]
+        x = x + _FACET_STEP * A[i] / norms[i]
+        if x in domain:
+            points.append(x)
+    return points
 
 
 def is_seq_inside(x0, u_seq, ssys, P0, P1):
@@ -516,6 +958,8 @@ def find_discrete_state(x0, part):
         (i.e., x0 belongs to more than one discrete state),
         then return the first discrete state ID
 
+    2. For many states, use L{PropPreservingPartition.locate}
+
     @param x0: initial continuous state
     @type x0: numpy 1darray
 
@@ -530,7 +974,7 @@ def find_discrete_state(x0, part):
         C{x0} does not belong to any discrete state.
     @rtype: int
     """
-    for (i, region) in enumerate(part):
-        if x0 in region:
-            return i
-    return None
+    (i,) = part.locate(x0)
+    if i < 0:
+        return None
+    return int(i)
@@ -45,10 +45,12 @@ import copy
 
 import numpy as np
 from scipy import sparse as sp
+from scipy.spatial import cKDTree
 import polytope as pc
 from polytope.plot import plot_partition
 
 from tulip import transys as trs
+from ._parallel import _make_pool
 
 # inline imports:
 #
@@ -56,7 +58,7 @@ from tulip import transys as trs
 
 _hl = 40 * '-'
 
-def prop2part(state_space, cont_props_dict):
+def prop2part(state_space, cont_props_dict, check_convex=True):
     """Main function that takes a domain (state_space) and a list of
     propositions (cont_props), and returns a proposition preserving
     partition of the state space.
@@ -72,6 +74,15 @@ def prop2part(state_space, cont_props_dict):
     @param cont_props_dict: propositions
     @type cont_props_dict: dict of C{polytope.Polytope}
 
+    @param check_convex: if C{True}, then merge polytopes
+        of a region when their union is convex,
+        as C{polytope.union} does.
+        Otherwise, subtract each proposition only from the polytopes
+        whose bounding box intersects it, and keep the others,
+        which is much faster for many propositions,
+        but can describe regions with more polytopes.
+    @type check_convex: bool
+
     @return: state space quotient partition induced by propositions
     @rtype: L{PropPreservingPartition}
     """
@@ -79,20 +90,29 @@ def prop2part(state_space, cont_props_dict):
     first_poly.append(state_space)
 
     regions = [pc.Region(first_poly)]
+    # adjacent pairs (i, j) with i < j
+    adj = set()
 
     for cur_prop in cont_props_dict:
         cur_prop_poly = cont_props_dict[cur_prop]
-
-        num_reg = len(regions)
-        prop_holds_reg = []
-
-        for i in range(num_reg): #i region counter
+        lower, upper = _bounding_boxes(regions)
+        (prop_lower,), (prop_upper,) = _bounding_boxes([cur_prop_poly])
+        # regions whose box misses cur_prop remain unchanged
+        overlap = np.all(
+            (lower <= prop_upper) & (prop_lower <= upper), axis=1)
+
+        # pieces where cur_prop holds, then the other pieces,
+        # as (region, parent index, whether the parent was split)
+        holds = []
+        rest = []
+        for i in range(len(regions)): #i region counter
             region_now = regions[i].copy()
-            #loop for prop holds
-            prop_holds_reg.append(0)
-
             prop_now = regions[i].props.copy()
 
+            if not overlap[i]:
+                rest.append((region_now, i, False))
+                continue
+
             dummy = region_now.intersect(cur_prop_poly)
 
             # does cur_prop hold in dummy ?
@@ -102,50 +122,112 @@ def prop2part(state_space, cont_props_dict):
 
                 # is dummy a Polytope ?
                 if len(dummy) == 0:
-                    regions[i] = pc.Region([dummy], dum_prop)
+                    holds.append((pc.Region([dummy], dum_prop), i, True))
                 else:
                     # dummy is a Region
                     dummy.props = dum_prop.copy()
-                    regions[i] = dummy.copy()
-                prop_holds_reg[-1] = 1
+                    holds.append((dummy.copy(), i, True))
             else:
                 #does not hold in the whole region
                 # (-> no need for the 2nd loop)
-                regions.append(region_now)
+                rest.append((region_now, i, False))
                 continue
 
             #loop for prop does not hold
-            regions.append(pc.Region([], props=prop_now) )
-            dummy = region_now.diff(cur_prop_poly)
+            dummy = _region_diff(region_now, cur_prop_poly, check_convex)
 
             if pc.is_fulldim(dummy):
                 dum_prop = prop_now.copy()
 
                 # is dummy a Polytope ?
                 if len(dummy) == 0:
-                    regions[-1] = pc.Region([pc.reduce(dummy)], dum_prop)
+                    rest.append(
+                        (pc.Region([pc.reduce(dummy)], dum_prop), i, True))
                 else:
                     # dummy is a Region
                     dummy.props = dum_prop.copy()
-                    regions[-1] = dummy.copy()
-            else:
-                regions.pop()
+                    rest.append((dummy.copy(), i, True))
+
+        pieces = holds + rest
+        regions = [r for r, i, split in pieces]
+        adj = _refine_adjacency(regions, pieces, adj)
 
-        count = 0
-        for hold_count in range(len(prop_holds_reg)):
-            if prop_holds_reg[hold_count]==0:
-                regions.pop(hold_count-count)
-                count+=1
+    n = len(regions)
+    adj_matrix = sp.lil_matrix((n, n), dtype=np.int8)
+    adj_matrix.setdiag(1)
+    for i, j in adj:
+        adj_matrix[i, j] = 1
+        adj_matrix[j, i] = 1
 
     mypartition = PropPreservingPartition(
         domain = copy.deepcopy(state_space),
         regions = regions,
+        adj = adj_matrix,
         prop_regions = copy.deepcopy(cont_props_dict)
     )
+    return mypartition
 
-    mypartition.adj = pc.find_adjacent_regions(mypartition).copy()
+def _region_diff(region, poly, check_convex):
+    """Return C{region} minus C{poly}.
 
-    return mypartition
+    @param check_convex: if C{False}, then subtract C{poly}
+        only from the polytopes of C{region} whose bounding box
+        intersects that of C{poly}, without merging the results.
+    @rtype: C{Region}
+    """
+    if check_convex:
+        return region.diff(poly)
+    lower, upper = _bounding_boxes(region.list_poly)
+    (poly_lower,), (poly_upper,) = _bounding_boxes([poly])
+    overlap = np.all((lower <= poly_upper) & (poly_lower <= upper), axis=1)
+    pieces = list()
+    for p, p_overlaps in zip(region.list_poly, overlap):
+        if not p_overlaps:
+            pieces.append(p)
+            continue
+        d = p.diff(poly)
+        # is d a Polytope ?
+        if len(d) == 0:
+            d = [d]
+        pieces.extend(q for q in d if pc.is_fulldim(q))
+    return pc.Region(pieces)
+
+def _refine_adjacency(regions, pieces, parent_adj):
+    """Return adjacent pairs of C{regions}, from those of their parents.
+
+    Pieces of two regions can be adjacent only if
+    the regions are the same, or adjacent.
+    Pairs of regions that were not split remain adjacent.
+    Other pairs are checked with C{polytope.is_adjacent},
+    if their bounding boxes intersect.
+
+    @param pieces: C{(region, parent, split)} for each region
+    @param parent_adj: adjacent pairs C{(i, j)} of parents, C{i < j}
+
+    @return: adjacent pairs C{(i, j)} of C{regions}, C{i < j}
+    @rtype: set
+    """
+    children = dict()
+    for k, (region, parent, split) in enumerate(pieces):
+        children.setdefault(parent, list()).append(k)
+    lower, upper = _bounding_boxes(regions)
+    parent_pairs = [(i, i) for i in children]
+    parent_pairs.extend(parent_adj)
+    adj = set()
+    for i, j in parent_pairs:
+        for a in children.get(i, ()):
+            for b in children.get(j, ()):
+                if a >= b and i == j:
+                    continue
+                pair = (min(a, b), max(a, b))
+                if not pieces[a][2] and not pieces[b][2]:
+                    adj.add(pair)
+                    continue
+                touch = np.all(
+                    (lower[a] <= upper[b]) & (lower[b] <= upper[a]))
+                if touch and pc.is_adjacent(regions[a], regions[b]):
+                    adj.add(pair)
+    return adj
 
 def part2convex(ppp):
     """This function takes a proposition preserving partition and generates
@@ -180,7 +262,7 @@ def part2convex(ppp):
 
     return (cvxpart, new2old)
 
-def pwa_partition(pwa_sys, ppp, abs_tol=1e-5):
+def pwa_partition(pwa_sys, ppp, abs_tol=1e-5, workers=None):
     """This function takes:
 
       - a piecewise affine system C{pwa_sys} and
@@ -206,6 +288,11 @@ def pwa_partition(pwa_sys, ppp, abs_tol=1e-5):
     @type pwa_sys: L{hybrid.PwaSysDyn}
     @type ppp: L{PropPreservingPartition}
 
+    @param workers: number of processes for checking
+        which regions are adjacent. If C{None},
+        then check them in the calling process.
+    @type workers: C{None} or int >= 1
+
     @return: new partition and associated maps:
 
         - new partition C{new_ppp}
@@ -253,18 +340,20 @@ def pwa_partition(pwa_sys, ppp, abs_tol=1e-5):
                 subsys_list.append(i)
 
     # compute spatial adjacency matrix
-    n = len(new_list)
-    adj = sp.lil_matrix((n, n), dtype=np.int8)
-    for i, ri in enumerate(new_list):
+    parent_adj = sp.csr_matrix(ppp.adj)
+
+    def may_touch(i, j):
         pi = parents[i]
-        for j, rj in enumerate(new_list[0:i]):
-            pj = parents[j]
+        pj = parents[j]
+        return (parent_adj[pi, pj] == 1) or (pi == pj)
 
-            if (ppp.adj[pi, pj] == 1) or (pi == pj):
-                if pc.is_adjacent(ri, rj):
-                    adj[i, j] = 1
-                    adj[j, i] = 1
-        adj[i, i] = 1
+    pool = _make_pool(workers)
+    try:
+        adj = _find_adjacent(new_list, may_touch, pool)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
 
     new_ppp = PropPreservingPartition(
         domain = ppp.domain,
@@ -362,16 +451,24 @@ def add_grid(ppp, grid_size=None, num_grid_pnts=None, abs_tol=1e-10):
                 re_list=product_interval(re_list, list_grid[j])
         j+=1
 
-    new_list = []
-    parent = []
+    boxes = list()
     for i in range(len(re_list)):
         temp_list=list()
         j=0
         while j<dim*2:
             temp_list.append([re_list[i][j],re_list[i][j+1]])
             j=j+2
-        for j in range(len(ppp.regions)):
-            tmp = pc.box2poly(temp_list)
+        boxes.append(temp_list)
+    # only regions whose bounding box meets a grid box can intersect it
+    boxes = np.array(boxes, dtype=float)
+    index = _RegionIndex(ppp.regions)
+    candidates = index.intersecting(boxes[:, :, 0], boxes[:, :, 1])
+
+    new_list = []
+    parent = []
+    for temp_list, region_ind in zip(boxes, candidates):
+        tmp = pc.box2poly(temp_list)
+        for j in region_ind:
             isect = tmp.intersect(ppp.regions[j], abs_tol)
 
             #if pc.is_fulldim(isect):
@@ -387,15 +484,14 @@ def add_grid(ppp, grid_size=None, num_grid_pnts=None, abs_tol=1e-10):
                 new_list.append(isect)
                 parent.append(j)
 
-    adj = sp.lil_matrix((len(new_list), len(new_list)), dtype=np.int8)
-    for i in range(len(new_list)):
-        adj[i,i] = 1
-        for j in range(i+1, len(new_list)):
-            if (ppp.adj[parent[i], parent[j]] == 1) or \
-                    (parent[i] == parent[j]):
-                if pc.is_adjacent(new_list[i], new_list[j]):
-                    adj[i,j] = 1
-                    adj[j,i] = 1
+    # pieces of the same or adjacent regions
+    parent_adj = sp.csr_matrix(ppp.adj)
+
+    def may_touch(i, j):
+        return (parent_adj[parent[i], parent[j]] == 1) or \
+            (parent[i] == parent[j])
+
+    adj = _find_adjacent(new_list, may_touch)
 
     return PropPreservingPartition(
         domain = ppp.domain,
@@ -484,7 +580,7 @@ class PropPreservingPartition(pc.MetricPartition):
                 msg = "adj size doesn't agree with number of regions"
                 raise ValueError(msg)
 
-        self.regions = regions[:]
+        self.regions = regions
 
         if check:
             for region in regions:
@@ -500,9 +596,43 @@ class PropPreservingPartition(pc.MetricPartition):
         super(PropPreservingPartition, self).__init__(domain)
         self.adj = adj
 
+    @property
+    def regions(self):
+        """Regions of the partition, as a list."""
+        return self._regions
+
+    @regions.setter
+    def regions(self, regions):
+        self._regions = _RegionList(regions)
+        self._region_index = None
+
     def reg2props(self, region_index):
         return self.regions[region_index].props.copy()
 
+    def locate(self, points):
+        """Return indices of regions that contain C{points}.
+
+        Candidate regions are found using an index of
+        their bounding boxes, which is built on first use,
+        and rebuilt after C{self.regions} changes.
+        Candidates are checked with the H-representation.
+
+        @param points: continuous states, one per row
+        @type points: numpy 2darray, or 1darray for one state
+
+        @return: for each point, the index of the first region
+            that contains it, or -1 if none does
+        @rtype: numpy 1darray of int
+        """
+        points = np.asarray(points, dtype=float)
+        points = points.reshape(-1, points.shape[-1])
+        version = self._regions.version
+        cached = self._region_index
+        if cached is None or cached[0] != version:
+            cached = (version, _RegionIndex(self._regions))
+            self._region_index = cached
+        return cached[1].locate(points)
+
     #TODO: iterator over pairs
     #TODO: use nx graph to store partition
 
@@ -623,6 +753,166 @@ class PropPreservingPartition(pc.MetricPartition):
             isect_poly.text(prop, ax, color=text_color)
         return ax
 
+class _RegionList(list):
+    """List of regions that counts the changes made to it.
+
+    Used by L{PropPreservingPartition.locate} to know
+    when its index is out of date.
+    """
+
+    version = 0
+
+def _counting(name):
+    """Return method C{name} of C{list} that increments C{version}."""
+    method = getattr(list, name)
+    def f(self, *args, **kw):
+        self.version += 1
+        return method(self, *args, **kw)
+    f.__name__ = name
+    f.__doc__ = method.__doc__
+    return f
+
+for _name in (
+        '__setitem__', '__delitem__', '__setslice__', '__delslice__',
+        '__iadd__', '__imul__', 'append', 'extend', 'insert',
+        'pop', 'remove', 'reverse', 'sort', 'clear'):
+    if hasattr(list, _name):
+        setattr(_RegionList, _name, _counting(_name))
+
+class _RegionIndex(object):
+    """Bounding boxes of regions, stored in k-d trees.
+
+    Regions are grouped by the size of their bounding box,
+    so that large regions do not increase the radius of
+    the queries for small ones.
+    Used by L{PropPreservingPartition.locate}, L{prop2part},
+    and L{add_grid}.
+    """
+
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.lower, self.upper = _bounding_boxes(regions)
+        self.trees = list()
+        if not regions:
+            return
+        centers = (self.lower + self.upper) / 2.0
+        radii = np.amax(self.upper - self.lower, axis=1) / 2.0
+        # group regions by radius, in powers of 2
+        sizes = np.floor(np.log2(radii / np.amin(radii))).astype(int)
+        for size in np.unique(sizes):
+            (ind,) = np.nonzero(sizes == size)
+            tree = cKDTree(centers[ind])
+            self.trees.append((tree, ind, np.amax(radii[ind])))
+
+    def intersecting(self, lower, upper):
+        """Return indices of regions with box intersecting given boxes.
+
+        @param lower, upper: corners of boxes, one per row
+
+        @return: for each box, sorted indices of regions
+        @rtype: list of numpy 1darray of int
+        """
+        candidates = [list() for x in lower]
+        if not self.regions:
+            return [np.array(c, dtype=int) for c in candidates]
+        centers = (lower + upper) / 2.0
+        r = np.amax(upper - lower) / 2.0
+        for tree, ind, radius in self.trees:
+            near = tree.query_ball_point(centers, radius + r, p=np.inf)
+            for c, k in zip(candidates, near):
+                c.extend(ind[k])
+        result = list()
+        for l, u, c in zip(lower, upper, candidates):
+            c = np.array(sorted(c), dtype=int)
+            overlap = np.all(
+                (self.lower[c] <= u) & (l <= self.upper[c]), axis=1)
+            result.append(c[overlap])
+        return result
+
+    def locate(self, points):
+        """Return index of first region containing each point, or -1."""
+        found = np.full(points.shape[0], -1, dtype=int)
+        candidates = self.intersecting(points, points)
+        for i, (x, c) in enumerate(zip(points, candidates)):
+            for j in c:
+                if x in self.regions[j]:
+                    found[i] = j
+                    break
+        return found
+
+def _find_adjacent(regions, may_touch=None, pool=None):
+    """Return adjacency matrix of C{regions}.
+
+    Only pairs of regions with intersecting bounding boxes,
+    for which C{may_touch(i, j)} is C{True} (if given),
+    are checked with C{polytope.is_adjacent}.
+    The checks are mapped in batches over C{pool}, if given.
+
+    @param may_touch: returns C{False} if regions C{i < j}
+        are known not to be adjacent
+    @type may_touch: callable
+
+    @type pool: C{multiprocessing.Pool} or C{None}
+
+    @return: adjacency matrix, with ones on the diagonal
+    @rtype: scipy.sparse.lil_matrix
+    """
+    n = len(regions)
+    index = _RegionIndex(regions)
+    near = index.intersecting(index.lower, index.upper)
+    pairs = [
+        (i, j)
+        for i, near_i in enumerate(near)
+        for j in near_i[near_i > i]
+        if may_touch is None or may_touch(i, j)]
+    batches = [
+        pairs[k:k + _ADJACENCY_BATCH]
+        for k in range(0, len(pairs), _ADJACENCY_BATCH)]
+    args = [[(regions[i], regions[j]) for i, j in batch]
+            for batch in batches]
+    if pool is None:
+        checked = [_are_adjacent(x) for x in args]
+    else:
+        checked = pool.map(_are_adjacent, args, chunksize=1)
+    rows = list(range(n))
+    cols = list(range(n))
+    for batch, adjacent in zip(batches, checked):
+        for (i, j), a in zip(batch, adjacent):
+            if a:
+                rows.extend([i, j])
+                cols.extend([j, i])
+    data = np.ones(len(rows), dtype=np.int8)
+    adj = sp.coo_matrix((data, (rows, cols)), shape=(n, n))
+    return adj.tolil()
+
+# number of region pairs per task of L{_find_adjacent}
+_ADJACENCY_BATCH = 64
+
+def _are_adjacent(pairs):
+    """Return list of C{polytope.is_adjacent} for C{pairs} of regions.
+
+    Used by L{_find_adjacent}, with a single argument,
+    so that it can be mapped over a process pool.
+    """
+    return [pc.is_adjacent(a, b) for a, b in pairs]
+
+def _bounding_boxes(regions):
+    """Return corners of bounding boxes of C{regions}.
+
+    The boxes are enlarged by C{polytope.polytope.ABS_TOL},
+    so that boxes of adjacent regions intersect.
+
+    @return: C{(lower, upper)}, one box per row
+    @rtype: pair of numpy 2darray
+    """
+    if not regions:
+        return np.zeros((0, 0)), np.zeros((0, 0))
+    boxes = [r.bounding_box for r in regions]
+    tol = pc.polytope.ABS_TOL
+    lower = np.hstack([l for l, u in boxes]).T - tol
+    upper = np.hstack([u for l, u in boxes]).T + tol
+    return lower, upper
+
 class PPP(PropPreservingPartition):
     """Alias to L{PropPreservingPartition}.
 
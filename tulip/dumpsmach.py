@@ -50,6 +50,17 @@ def write_python_case(filename, *args, **kwargs):
         f.write(python_case(*args, **kwargs))
 
 
+def write_python_table(filename, *args, **kwargs):
+    """Convenience wrapper for writing output of python_table to file.
+
+    @type  filename: str
+    @param filename: Name of file in which to place the code generated
+        by L{python_table}.
+    """
+    with open(filename, 'w') as f:
+        f.write(python_table(*args, **kwargs))
+
+
 def python_case(M, classname="TulipStrategy", start='Sinit'):
     """Export MealyMachine as Python class based on flat if-else block.
 
@@ -175,3 +186,161 @@ def python_case(M, classname="TulipStrategy", start='Sinit'):
                 args=','.join('\n{t}{v}={v}'.format(v=v, t=4*tab)
                               for v in M.inputs))
     return code
+
+
+def python_table(M, classname="TulipStrategy", start='Sinit'):
+    """Export MealyMachine as Python class based on transition tables.
+
+    The generated class has the same interface as that of
+    L{python_case}, but the transitions are stored in tables,
+    so the time of a move does not depend on the size of C{M}:
+
+      - the input values are encoded as an integer,
+        with one more code for each input variable,
+        which stands for any value not labeling an edge,
+      - for each state, a C{dict} maps these integers to
+        the next state and the index of the output values,
+      - each output valuation is stored once, as a C{tuple}.
+
+    If an edge is not labeled with some input variable,
+    then it is enabled for each value of that variable.
+    If more than one edge is enabled, then the first is taken,
+    as in L{python_case}.
+
+    @type M: L{MealyMachine}
+    @type classname: C{str}
+    @param start: initial node in C{M}
+
+    @rtype: str
+    @return: valid Python code, as for L{python_case}
+    """
+    tab = 4 * ' '
+    node_to_int = dict([(s, i) for i, s in enumerate(M)])
+    input_vars = [input_var for input_var in M.inputs] if M.inputs else []
+    output_vars = [output_var for output_var in M.outputs]
+    input_args = ', '.join(input_vars)
+    input_args_str = "'"+"', '".join(input_vars)+"'"
+    edges = [(node_to_int[u], node_to_int[w], d)
+             for u, w, d in M.edges(data=True)]
+    # encode input values as digits of an integer
+    input_codes = list()
+    stride = 1
+    for k in input_vars:
+        values = dict()
+        for _, _, d in edges:
+            if k in d:
+                values.setdefault(d[k], len(values))
+        input_codes.append((k, stride, values))
+        # the last code is for any other value
+        stride *= len(values) + 1
+    # intern output valuations
+    outputs = dict()
+    transitions = [dict() for u in node_to_int]
+    for u, w, d in edges:
+        out = tuple((k, d[k]) for k in d if k in M.outputs)
+        i = outputs.setdefault(out, len(outputs))
+        codes = [0]
+        for k, stride, values in input_codes:
+            if k in d:
+                digits = [values[d[k]]]
+            else:
+                digits = range(len(values) + 1)
+            codes = [c + x * stride for c in codes for x in digits]
+        for c in codes:
+            # the first enabled edge is taken
+            transitions[u].setdefault(c, (w, i))
+    output_table = sorted(outputs, key=outputs.get)
+    # one row per line
+    table = lambda rows: ''.join(
+        '\n{t2}{row},'.format(t2=2*tab, row=row)
+        for row in rows) + '\n' + tab
+    code = (
+        'class {classname}(object):\n'
+        '{t}"""Mealy transducer.\n'
+        '\n'
+        '{t}Internal states are integers, the current state\n'
+        '{t}is stored in the attribute "state".\n'
+        '{t}To take a transition, call method "move".\n'
+        '\n'
+        '{t}The names of input variables are stored in the\n'
+        '{t}attribute "input_vars".\n'
+        '\n'
+        '{t}Transitions are stored in tables: for each state,\n'
+        '{t}a dict maps the code of the input values\n'
+        '{t}to the next state and the index of the outputs.\n'
+        '\n'
+        '{t}Automatically generated by tulip.dumpsmach on {date}\n'
+        '{t}To learn more about TuLiP, visit http://tulip-control.org\n'
+        '{t}"""\n'
+        '{t}# for each input variable, the code of each value\n'
+        '{t}# (any other value has the next code)\n'
+        '{t}_input_codes = [{input_codes}]\n'
+        '{t}# output valuations, as tuples of (name, value) pairs\n'
+        '{t}_outputs = [{outputs}]\n'
+        '{t}# for each state, maps input code to\n'
+        '{t}# (next state, index of outputs)\n'
+        '{t}_transitions = [{transitions}]\n'
+        '\n'
+        '{t}def __init__(self):\n'
+        '{t2}self.state = {sinit}\n'
+        '{t2}self.input_vars = [{input_args_str}]\n'
+        '\n'
+        '{t}def move(self{comma}{input_args}):\n'
+        '{t2}"""Given inputs, take move and return outputs.\n'
+        '\n'
+        '{t2}@rtype: dict\n'
+        '{t2}@return: dictionary with keys of the output variable names:\n'
+        '{t2}    {output_names}\n'
+        '{t2}"""\n'
+        '{t2}if not (0 <= self.state < {n}):\n'
+        '{t3}raise Exception("Unrecognized internal state: " + '
+        'str(self.state))\n'
+        '{t2}transitions = self._transitions[self.state]\n'
+        '{t2}if not transitions:\n'
+        '{t3}raise Exception("Reached dead-end state !")\n'
+        '{t2}codes = self._input_codes\n'
+        '{t2}try:\n'
+        '{t3}self.state, i = transitions[\n'
+        '{t4}{input_code}]\n'
+        '{t2}except KeyError:\n'
+        '{t3}self._error({input_args})\n'
+        '{t2}return dict(self._outputs[i])\n'
+        '\n'
+        '{t}def _error(self{comma}{input_args}):\n'
+        '{t2}raise ValueError("Unrecognized input: " + ('
+        '{inputs}).format({args}))\n'
+        ).format(
+            classname=classname,
+            t=tab,
+            t2=2*tab,
+            t3=3*tab,
+            t4=4*tab,
+            date=time.strftime('%Y-%m-%d %H:%M:%S UTC', time.gmtime()),
+            input_codes=table(
+                '{' + ', '.join(
+                    '{v!r}: {c}'.format(v=v, c=c)
+                    for v, c in values.items()) + '}'
+                for k, stride, values in input_codes),
+            outputs=table(repr(out) for out in output_table),
+            transitions=table(
+                '{' + ', '.join(
+                    '{c}: ({w}, {i})'.format(c=c, w=w, i=i)
+                    for c, (w, i) in sorted(trans.items())) + '}'
+                for trans in transitions),
+            n=len(transitions),
+            sinit=node_to_int[start],
+            input_args_str=input_args_str,
+            comma=', ' if input_vars else '',
+            input_args=input_args,
+            input_code=' + '.join(
+                'codes[{j}].get({k}, {other}) * {stride}'.format(
+                    j=j, k=k, other=len(values), stride=stride)
+                for j, (k, stride, values) in enumerate(input_codes))
+            or '0',
+            output_names=output_vars,
+            inputs=''.join(
+                '\n{t}"{v} = {{{v}}}; "'.format(v=v, t=3*tab)
+                for v in input_vars),
+            args=','.join('\n{t}{v}={v}'.format(v=v, t=4*tab)
+                          for v in input_vars))
+    return code
@@ -46,11 +46,17 @@ from __future__ import print_function
 import errno
 from pkg_resources import parse_version
 import logging
-import copy
+import io
 import os
+import re
 import subprocess
 import tempfile
+import threading
 import json
+try:
+    import queue
+except ImportError:  # Python 2.7
+    import Queue as queue
 import xml.etree.ElementTree as ET
 import networkx as nx
 from tulip.spec import GRSpec, translate
@@ -204,7 +210,11 @@ def _untagdict(x, cast_f_keys=None, cast_f_values=None,
 def load_aut_xml(x, namespace=DEFAULT_NAMESPACE):
     """Return strategy constructed from output of gr1c.
 
-    @param x: a string or an instance of
+    The XML is parsed incrementally, and each node of the
+    strategy is discarded from the XML tree after it is loaded,
+    so large strategies need not fit in memory twice.
+
+    @param x: a string, a file-like object, or an instance of
         xml.etree.ElementTree.fromstring()
 
     @type spec0: L{GRSpec}
@@ -219,16 +229,71 @@ def load_aut_xml(x, namespace=DEFAULT_NAMESPACE):
         C{networkx.DiGraph}. Else, return (L{GRSpec}, C{None}), where
         the first element is the specification as read from the XML string.
     """
-    if isinstance(x, str):
-        elem = ET.fromstring(x)
+    streaming = isinstance(x, str) or hasattr(x, "read")
+    if streaming:
+        events = ET.iterparse(_as_file(x), events=("start", "end"))
     else:
-        elem = x
+        events = _element_events(x)
 
     if (namespace is None) or (len(namespace) == 0):
         ns_prefix = ""
     else:
         ns_prefix = "{"+namespace+"}"
 
+    elem = None
+    spec = None
+    A = None
+    aut = None
+    ids = set()  # to catch redundancy
+    for event, e in events:
+        if event == "start":
+            if elem is None:
+                elem = e
+                _check_tulipcon_root(elem, ns_prefix)
+            elif e.tag == ns_prefix+"aut" and e in list(elem):
+                aut = e
+            continue
+        if e.tag == ns_prefix+"spec" and spec is None:
+            # Extract discrete variables and LTL specification
+            (tag_name, env_vardict, env_vars) = _untagdict(elem.find(
+                ns_prefix+"env_vars"), get_order=True)
+            (tag_name, sys_vardict, sys_vars) = _untagdict(elem.find(
+                ns_prefix+"sys_vars"), get_order=True)
+            env_vars = _parse_vars(env_vars, env_vardict)
+            sys_vars = _parse_vars(sys_vars, sys_vardict)
+            spec = _untag_spec(e, env_vars, sys_vars, namespace)
+        elif e.tag == ns_prefix+"node" and aut is not None:
+            if A is None:
+                A = _new_aut_graph(spec, aut)
+            _load_aut_xml_node(A, e, ids, namespace)
+            # the nodes are in `A` now
+            if streaming:
+                del aut[:]
+        elif e is aut:
+            aut = None
+            if A is None and e.text is None:
+                mach = None
+                return (spec, mach)
+            if A is None:
+                A = _new_aut_graph(spec, e)
+    if spec is None:
+        raise ValueError("invalid specification in tulipcon XML string.")
+    if A is None:
+        mach = None
+        return (spec, mach)
+    return A
+
+
+def _element_events(elem):
+    """Yield C{iterparse} events of an already parsed C{elem}."""
+    yield ("start", elem)
+    for child in elem:
+        for event in _element_events(child):
+            yield event
+    yield ("end", elem)
+
+
+def _check_tulipcon_root(elem, ns_prefix):
     if elem.tag != ns_prefix+"tulipcon":
         raise TypeError("root tag should be tulipcon.")
     if ("version" not in elem.attrib.keys()):
@@ -237,16 +302,13 @@ def load_aut_xml(x, namespace=DEFAULT_NAMESPACE):
         raise ValueError("unsupported tulipcon XML version: "+
             str(elem.attrib["version"]))
 
-    # Extract discrete variables and LTL specification
-    (tag_name, env_vardict, env_vars) = _untagdict(elem.find(
-        ns_prefix+"env_vars"), get_order=True)
-    (tag_name, sys_vardict, sys_vars) = _untagdict(elem.find(
-        ns_prefix+"sys_vars"), get_order=True)
 
-    env_vars = _parse_vars(env_vars, env_vardict)
-    sys_vars = _parse_vars(sys_vars, sys_vardict)
-
-    s_elem = elem.find(ns_prefix+"spec")
+def _untag_spec(s_elem, env_vars, sys_vars, namespace):
+    """Return L{GRSpec} from C{spec} tag of tulipcon XML."""
+    if (namespace is None) or (len(namespace) == 0):
+        ns_prefix = ""
+    else:
+        ns_prefix = "{"+namespace+"}"
     spec = GRSpec(env_vars=env_vars, sys_vars=sys_vars)
     for spec_tag in ["env_init", "env_safety", "env_prog",
                      "sys_init", "sys_safety", "sys_prog"]:
@@ -258,58 +320,61 @@ def load_aut_xml(x, namespace=DEFAULT_NAMESPACE):
         li = [v.replace("&gt;", ">") for v in li]
         li = [v.replace("&amp;", "&") for v in li]
         setattr(spec, spec_tag, li)
+    return spec
 
-    aut_elem = elem.find(ns_prefix+"aut")
-    if aut_elem is None or (
-        (aut_elem.text is None) and len(aut_elem.getchildren()) == 0):
-        mach = None
-        return (spec, mach)
 
+def _new_aut_graph(spec, aut_elem):
+    if spec is None:
+        raise ValueError("invalid specification in tulipcon XML string.")
     # Assume version 1 of tulipcon XML
     if aut_elem.attrib["type"] != "basic":
         raise ValueError("Automaton class only recognizes type \"basic\".")
-    node_list = aut_elem.findall(ns_prefix+"node")
-    id_list = []  # For more convenient searching, and to catch redundancy
     A = nx.DiGraph()
-    A.env_vars = env_vars
-    A.sys_vars = sys_vars
-    for node in node_list:
-        this_id = int(node.find(ns_prefix+"id").text)
-        #this_name = node.find(ns_prefix+"anno").text  # Assume version 1
-        (tag_name, this_name_list) = _untaglist(node.find(ns_prefix+"anno"),
-                                                cast_f=int)
-        if len(this_name_list) == 2:
-            (mode, rgrad) = this_name_list
-        else:
-            (mode, rgrad) = (-1, -1)
-        (tag_name, this_child_list) = _untaglist(
-            node.find(ns_prefix+"child_list"),
-            cast_f=int
-        )
-        if tag_name != ns_prefix+"child_list":
-            # This really should never happen and may not even be
-            # worth checking.
-            raise ValueError("failure of consistency check " +
-                "while processing aut XML string.")
-        (tag_name, this_state) = _untagdict(node.find(ns_prefix+"state"),
-                                            cast_f_values=int,
-                                            namespace=namespace)
-
-        if tag_name != ns_prefix+"state":
-            raise ValueError("failure of consistency check " +
-                "while processing aut XML string.")
-        if this_id in id_list:
-            logger.warning("duplicate nodes found: "+str(this_id)+"; ignoring...")
-            continue
-        id_list.append(this_id)
+    A.env_vars = spec.env_vars
+    A.sys_vars = spec.sys_vars
+    return A
 
-        logger.info('loaded from gr1c result:\n\t' +str(this_state) )
 
-        A.add_node(this_id, state=copy.copy(this_state),
-                   mode=mode, rgrad=rgrad)
-        for next_node in this_child_list:
-            A.add_edge(this_id, next_node)
-    return A
+def _load_aut_xml_node(A, node, ids, namespace):
+    """Add C{node} of tulipcon XML, and its edges, to C{A}."""
+    if (namespace is None) or (len(namespace) == 0):
+        ns_prefix = ""
+    else:
+        ns_prefix = "{"+namespace+"}"
+    this_id = int(node.find(ns_prefix+"id").text)
+    #this_name = node.find(ns_prefix+"anno").text  # Assume version 1
+    (tag_name, this_name_list) = _untaglist(node.find(ns_prefix+"anno"),
+                                            cast_f=int)
+    if len(this_name_list) == 2:
+        (mode, rgrad) = this_name_list
+    else:
+        (mode, rgrad) = (-1, -1)
+    (tag_name, this_child_list) = _untaglist(
+        node.find(ns_prefix+"child_list"),
+        cast_f=int
+    )
+    if tag_name != ns_prefix+"child_list":
+        # This really should never happen and may not even be
+        # worth checking.
+        raise ValueError("failure of consistency check " +
+            "while processing aut XML string.")
+    (tag_name, this_state) = _untagdict(node.find(ns_prefix+"state"),
+                                        cast_f_values=int,
+                                        namespace=namespace)
+
+    if tag_name != ns_prefix+"state":
+        raise ValueError("failure of consistency check " +
+            "while processing aut XML string.")
+    if this_id in ids:
+        logger.warning("duplicate nodes found: "+str(this_id)+"; ignoring...")
+        return
+    ids.add(this_id)
+
+    logger.debug('loaded from gr1c result:\n\t%s', this_state)
+
+    A.add_node(this_id, state=this_state,
+               mode=mode, rgrad=rgrad)
+    A.add_edges_from((this_id, next_node) for next_node in this_child_list)
 
 def _parse_vars(variables, vardict):
     """Helper for parsing env, sys variables.
@@ -341,37 +406,176 @@ def _parse_vars(variables, vardict):
 def load_aut_json(x):
     """Return strategy constructed from output of gr1c
 
+    The JSON is parsed incrementally, one node at a time,
+    and each node is added to the graph as soon as it is parsed.
+
     @param x: string or file-like object
 
     @return: strategy as C{networkx.DiGraph}, like the return value of
         L{load_aut_xml}
     """
-    try:
-        autjs = json.loads(x)
-    except TypeError:
-        autjs = json.load(x)
-    if autjs['version'] != 1:
-        raise ValueError('Only gr1c JSON format version 1 is supported.')
-    # convert to nx
     A = nx.DiGraph()
-    symtab = autjs['ENV'] + autjs['SYS']
-    A.env_vars = dict([list(v.items())[0] for v in autjs['ENV']])
-    A.sys_vars = dict([list(v.items())[0] for v in autjs['SYS']])
     A.initial_nodes = set()
+    header = dict()
+    names = None
     omit = {'state', 'trans'}
-    for node_ID, d in autjs['nodes'].items():
+    for key, d in iter_json_items(_as_file(x)):
+        if not isinstance(key, tuple):
+            header[key] = d
+            if key == 'version' and d != 1:
+                raise ValueError(
+                    'Only gr1c JSON format version 1 is supported.')
+            continue
+        if names is None:
+            # the variables precede the nodes
+            symtab = header['ENV'] + header['SYS']
+            names = [list(v.keys())[0] for v in symtab]
+        _, node_ID = key
         node_label = {k: d[k] for k in d if k not in omit}
-        node_label['state'] = dict([(list(symtab[i].keys())[0],
-                                     autjs['nodes'][node_ID]['state'][i])
-                                    for i in range(len(symtab))])
+        node_label['state'] = dict(zip(names, d['state']))
         A.add_node(node_ID, **node_label)
         if node_label['initial']:
             A.initial_nodes.add(node_ID)
-    for node_ID, d in autjs['nodes'].items():
         for to_node in d['trans']:
             A.add_edge(node_ID, to_node)
+    if header.get('version') != 1:
+        raise ValueError('Only gr1c JSON format version 1 is supported.')
+    A.env_vars = dict([list(v.items())[0] for v in header['ENV']])
+    A.sys_vars = dict([list(v.items())[0] for v in header['SYS']])
     return A
 
+
+def iter_json_items(f, stream='nodes', chunk_size=2**16):
+    """Yield items of a JSON object, parsing it incrementally.
+
+    Each item of the top-level object is yielded as C{(key, value)},
+    except for the item C{stream}, which must be an object.
+    The items of C{stream} are yielded one at a time,
+    as C{((stream, key), value)}.
+    So only one item of C{stream} is held in memory at a time.
+
+    This is how the strategies written by gr1c, gr1py and slugs
+    are read, without reading the whole output in memory.
+
+    @param f: file-like object that contains a JSON object
+    @param stream: key of the item to stream
+    @param chunk_size: number of characters to read at a time
+    @raise ValueError: if C{f} does not contain a JSON object
+    """
+    reader = _JSONReader(f, chunk_size)
+    reader.expect('{')
+    for key in reader.keys():
+        if key != stream:
+            yield key, reader.value()
+            continue
+        reader.expect('{')
+        for subkey in reader.keys():
+            yield (key, subkey), reader.value()
+
+
+class _JSONReader(object):
+    """Incremental reader of JSON values from a file-like object."""
+
+    _decoder = json.JSONDecoder()
+    _whitespace = re.compile(r'\s*')
+    # characters that can continue a JSON number
+    _number_chars = frozenset('0123456789.eE+-')
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _read(self):
+        """Read another chunk, return C{False} at end of file."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self):
+        """Return next non-whitespace character, or C{''} at end."""
+        while True:
+            self.pos = self._whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._read():
+                return ''
+
+    def expect(self, c):
+        if self._peek() != c:
+            raise ValueError(
+                'expected "{c}" in JSON, found: {s!r}'.format(
+                    c=c, s=self.buf[self.pos:self.pos + 80]))
+        self.pos += 1
+
+    def value(self):
+        """Return next JSON value."""
+        self.pos = self._whitespace.match(self.buf, self.pos).end()
+        if self.pos == len(self.buf):
+            self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                value, end = None, None
+            # a number may continue in the next chunk
+            if end is not None and (self.eof or not self._may_continue(
+                    value, end)):
+                self.pos = end
+                return value
+            if not self._read():
+                if end is not None:
+                    self.pos = end
+                    return value
+                raise ValueError(
+                    'incomplete JSON value: {s!r}'.format(
+                        s=self.buf[self.pos:self.pos + 80]))
+
+    def _may_continue(self, value, end):
+        """Return C{True} if C{value} may be cut at the buffer end."""
+        if end == len(self.buf):
+            return True
+        is_number = (
+            isinstance(value, (int, float)) and
+            not isinstance(value, bool))
+        return is_number and self.buf[end] in self._number_chars
+
+    def keys(self):
+        """Yield keys of the current object.
+
+        After each key, the caller reads the value.
+        """
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            c = self._peek()
+            self.pos += 1
+            if c == '}':
+                return
+            if c != ',':
+                raise ValueError(
+                    'expected "," or "}}" in JSON, found: {c!r}'.format(c=c))
+
+
+def _as_file(x):
+    """Return file-like object that reads C{x}, if a string."""
+    if hasattr(x, 'read'):
+        return x
+    return io.StringIO(u'' + x)
+
+
 def check_syntax(spec_str):
     """Check whether given string has correct gr1c specification syntax.
 
@@ -447,21 +651,6 @@ def synthesize(spec):
     """
     _assert_gr1c()
     init_option = select_options(spec)
-    try:
-        p = subprocess.Popen(
-            [GR1C_BIN_PREFIX + "gr1c",
-             "-n", init_option,
-             "-t", "json"],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            universal_newlines=True
-        )
-    except OSError as e:
-        if e.errno == errno.ENOENT:
-            raise Exception('gr1c not found in path.')
-        else:
-            raise
-
     s = translate(spec, 'gr1c')
     logger.info('\n{hl}\n gr1c input:\n {s}\n{hl}'.format(s=s, hl=_hl))
 
@@ -475,20 +664,59 @@ def synthesize(spec):
     except:
         logger.error('failed to write auxiliary file: "{f}"'.format(f=fname))
 
-    (stdoutdata, stderrdata) = p.communicate(s)
+    fin = tempfile.TemporaryFile()
+    try:
+        fin.write(bytes(s, 'utf-8'))
+    except TypeError:  # Try to be compatible with Python 2.7
+        fin.write(bytes(s))
+    fin.seek(0)
+    ferr = tempfile.TemporaryFile(mode='w+')
+    try:
+        p = subprocess.Popen(
+            [GR1C_BIN_PREFIX + "gr1c",
+             "-n", init_option,
+             "-t", "json"],
+            stdin=fin,
+            stdout=subprocess.PIPE, stderr=ferr,
+            universal_newlines=True
+        )
+    except OSError as e:
+        fin.close()
+        ferr.close()
+        if e.errno == errno.ENOENT:
+            raise Exception('gr1c not found in path.')
+        else:
+            raise
+    # the strategy is loaded while gr1c writes it
+    try:
+        strategy = load_aut_json(p.stdout)
+        error = None
+    except (ValueError, KeyError) as e:
+        strategy = None
+        error = e
+    p.stdout.close()
+    p.wait()
+    fin.close()
+    ferr.seek(0)
+    stderrdata = ferr.read()
+    ferr.close()
 
     msg = (
         ('{spaces} gr1c return code: {c}\n\n'
-         '{spaces} gr1c stdout, stderr:\n {out}\n\n').format(
-             c=p.returncode, out=stdoutdata, spaces=30 * ' '
+         '{spaces} gr1c stderr:\n {err}\n\n').format(
+             c=p.returncode, err=stderrdata, spaces=30 * ' '
         )
     )
 
     if p.returncode == 0:
         logger.debug(msg)
-        strategy = load_aut_json(stdoutdata)
+        if error is not None:
+            raise error
         return strategy
     else:
+        if error is not None:
+            msg += '{spaces} gr1c stdout: {e}\n'.format(
+                e=error, spaces=30 * ' ')
         print(msg)
         return None
 
@@ -541,19 +769,20 @@ def load_mealy(filename, fformat='tulipxml'):
     @return: loaded strategy as an annotated graph.
     @rtype: C{networkx.Digraph}
     """
-    s = open(filename, 'r').read()
-    if fformat.lower() == 'tulipxml':
-        strategy = load_aut_xml(s)
-    elif fformat.lower() == 'json':
-        strategy = load_aut_json(s)
-    else:
-        ValueError('gr1c.load_mealy() : Unrecognized file format, "'
-                   +str(fformat)+'"')
+    with open(filename, 'r') as f:
+        if fformat.lower() == 'tulipxml':
+            strategy = load_aut_xml(f)
+        elif fformat.lower() == 'json':
+            strategy = load_aut_json(f)
+        else:
+            ValueError('gr1c.load_mealy() : Unrecognized file format, "'
+                       +str(fformat)+'"')
 
-    logger.debug(
-        'Loaded strategy with nodes: \n' + str(strategy.nodes()) +
-        '\nand edges: \n' + str(strategy.edges())
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            'Loaded strategy with nodes: \n' + str(strategy.nodes()) +
+            '\nand edges: \n' + str(strategy.edges())
+        )
     return strategy
 
 class GR1CSession(object):
@@ -727,6 +956,95 @@ class GR1CSession(object):
             line = self.p.stdout.readline()
         return sys_moves
 
+    def iswinning_batch(self, states):
+        """Return list of results of L{iswinning}, one for each state.
+
+        All queries are written to gr1c at once,
+        instead of waiting for each answer before the next query.
+        """
+        commands = [self._command("winning", state) for state in states]
+        return self._batch(commands, self._read_winning)
+
+    def env_next_batch(self, states):
+        """Return list of results of L{env_next}, one for each state."""
+        commands = [self._command("envnext", state) for state in states]
+        return self._batch(commands, self._read_env_moves)
+
+    def sys_nextfeas_batch(self, queries):
+        """Return list of results of L{sys_nextfeas}, one for each query.
+
+        @param queries: C{(state, env_move, goal_mode)} triples
+        @type queries: iterable of C{tuple}
+        """
+        queries = list(queries)
+        self._check_goal_modes(goal_mode for _, _, goal_mode in queries)
+        commands = [
+            self._command("sysnext", state, env_move, goal_mode)
+            for state, env_move, goal_mode in queries]
+        return self._batch(commands, self._read_sys_moves)
+
+    def _check_goal_modes(self, goal_modes):
+        goal_modes = set(goal_modes)
+        if goal_modes:
+            _check_goal_modes(goal_modes, self.numgoals())
+
+    def _command(self, name, state, env_move=None, goal_mode=None):
+        """Return line of command C{name} for given state."""
+        vector = [state[k] for k in self.env_vars]
+        vector.extend(state[k] for k in self.sys_vars)
+        if env_move is not None:
+            vector.extend(env_move[k] for k in self.env_vars)
+        if goal_mode is not None:
+            vector.append(goal_mode)
+        return name+" "+" ".join([str(i) for i in vector])+"\n"
+
+    def _batch(self, commands, read):
+        """Write all C{commands}, and return answers parsed by C{read}."""
+        writer = self._write_async(commands)
+        answers = [read() for _ in commands]
+        writer.join()
+        return answers
+
+    def _write_async(self, commands):
+        """Write C{commands} to gr1c from another thread.
+
+        Writing from a thread avoids a deadlock when gr1c
+        blocks on a full stdout pipe, before reading all commands.
+
+        @rtype: C{threading.Thread}
+        """
+        writer = threading.Thread(
+            target=self.p.stdin.write, args=("".join(commands),))
+        writer.daemon = True
+        writer.start()
+        return writer
+
+    def _readline(self):
+        line = self.p.stdout.readline()
+        if len(self.prompt) > 0:
+            loc = line.find(self.prompt)
+            if loc >= 0:
+                line = line[len(self.prompt):]
+        return line
+
+    def _read_winning(self):
+        return "True\n" in self._readline()
+
+    def _read_moves(self, names):
+        moves = []
+        line = self._readline()
+        while "---\n" not in line:
+            moves.append(dict([
+                (k, int(s)) for (k, s) in zip(names, line.split())]))
+            line = self._readline()
+        return moves
+
+    def _read_env_moves(self):
+        return self._read_moves(self.env_vars)
+
+    def _read_sys_moves(self):
+        return self._read_moves(self.sys_vars)
+
     def getvars(self):
         """Return string of environment and system variable names in order.
 
@@ -787,3 +1105,140 @@ class GR1CSession(object):
             return False
         else:
             return True
+
+
+class GR1CSessionPool(object):
+    """Pool of interactive gr1c sessions for the same spec.
+
+    Batched queries are split among the idle sessions,
+    and each session answers its share in one round trip,
+    so the gr1c processes work in parallel.
+
+    The methods with suffix C{_async} wrap the blocking methods
+    in C{run_in_executor}, so they run in a thread and return
+    C{asyncio} futures, which can be awaited from a coroutine.
+    These methods require Python 3.
+    Each batch uses the sessions that are idle when it starts.
+
+    Example::
+
+        pool = GR1CSessionPool("spec.spc", sys_vars=["y"],
+                               env_vars=["x"], size=4)
+        winning = pool.iswinning(states)
+        pool.close()
+
+    Other arguments are as for L{GR1CSession}.
+    """
+    def __init__(self, spec_filename, sys_vars, env_vars=[], prompt=">>> ",
+                 size=2):
+        if size < 1:
+            raise ValueError("pool size must be positive, got: "+str(size))
+        self.sessions = [
+            GR1CSession(spec_filename, sys_vars, env_vars, prompt)
+            for _ in range(size)]
+        self._idle = queue.Queue()
+        for session in self.sessions:
+            self._idle.put(session)
+        # all sessions load the same spec
+        self._numgoals = self.sessions[0].numgoals()
+
+    def iswinning(self, states):
+        """Return list of results of L{GR1CSession.iswinning}."""
+        return self._map(
+            states,
+            lambda gs, x: gs._command("winning", x),
+            GR1CSession._read_winning)
+
+    def env_next(self, states):
+        """Return list of results of L{GR1CSession.env_next}."""
+        return self._map(
+            states,
+            lambda gs, x: gs._command("envnext", x),
+            GR1CSession._read_env_moves)
+
+    def sys_nextfeas(self, queries):
+        """Return list of results of L{GR1CSession.sys_nextfeas}.
+
+        @param queries: C{(state, env_move, goal_mode)} triples
+        @type queries: iterable of C{tuple}
+        """
+        queries = list(queries)
+        _check_goal_modes(
+            (goal_mode for _, _, goal_mode in queries), self._numgoals)
+        return self._map(
+            queries,
+            lambda gs, x: gs._command("sysnext", *x),
+            GR1CSession._read_sys_moves)
+
+    def iswinning_async(self, states, loop=None):
+        """Run L{iswinning} in C{run_in_executor}, return the future."""
+        return _run_in_executor(loop, self.iswinning, list(states))
+
+    def env_next_async(self, states, loop=None):
+        """Run L{env_next} in C{run_in_executor}, return the future."""
+        return _run_in_executor(loop, self.env_next, list(states))
+
+    def sys_nextfeas_async(self, queries, loop=None):
+        """Run L{sys_nextfeas} in C{run_in_executor}, return the future."""
+        return _run_in_executor(loop, self.sys_nextfeas, list(queries))
+
+    def close(self):
+        """End all sessions.
+
+        Return C{True} if all gr1c processes exited normally.
+        """
+        return all([gs.close() for gs in self.sessions])
+
+    def _map(self, items, command, read):
+        """Return answers to queries C{items}, in order.
+
+        @param command: maps a session and an item to a command line
+        @param read: reads an answer from a session
+        """
+        items = list(items)
+        if not items:
+            return []
+        sessions = self._acquire(len(items))
+        try:
+            n = len(sessions)
+            k, r = divmod(len(items), n)
+            bounds = [i * k + min(i, r) for i in range(n + 1)]
+            chunks = [items[i:j] for i, j in zip(bounds, bounds[1:])]
+            writers = [
+                gs._write_async([command(gs, x) for x in chunk])
+                for gs, chunk in zip(sessions, chunks)]
+            answers = list()
+            for gs, chunk in zip(sessions, chunks):
+                answers.extend(read(gs) for _ in chunk)
+            for writer in writers:
+                writer.join()
+        finally:
+            for gs in sessions:
+                self._idle.put(gs)
+        return answers
+
+    def _acquire(self, n):
+        """Return at least one, and at most C{n}, idle sessions."""
+        sessions = [self._idle.get()]
+        while len(sessions) < n:
+            try:
+                sessions.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        return sessions
+
+
+def _check_goal_modes(goal_modes, numgoals):
+    """Raise C{ValueError} unless each goal mode is in C{range(numgoals)}."""
+    for goal_mode in set(goal_modes):
+        if goal_mode < 0 or goal_mode > numgoals-1:
+            raise ValueError(
+                "Invalid goal mode requested: "+str(goal_mode))
+
+
+def _run_in_executor(loop, f, *args):
+    """Return C{asyncio} future of calling C{f} in a thread."""
+    import asyncio
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    return loop.run_in_executor(None, f, *args)
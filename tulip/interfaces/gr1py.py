@@ -36,12 +36,14 @@ U{https://github.com/slivingston/gr1py}
 """
 from __future__ import absolute_import
 import logging
+import pprint
+import networkx as nx
 from tulip.spec import translate
-from tulip.interfaces.gr1c import load_aut_json
 from tulip.interfaces.gr1c import select_options
 try:
     import gr1py
-    import gr1py.cli
+    import gr1py.solve
+    import gr1py.tstruct
 except ImportError:
     gr1py = None
 
@@ -73,15 +75,49 @@ def synthesize(spec):
         tsys, exprtab, init_flags=init_option)
     if strategy is None:
         return None
-    s = gr1py.output.dumps_json(tsys.symtab, strategy)
-    return load_aut_json(s)
+    return _strategy_to_graph(tsys.symtab, strategy)
 
 
 def _spec_to_gr1py(spec):
+    """Return transition system and expression table of gr1py.
+
+    The spec is translated directly to the tables of gr1py,
+    without writing and parsing gr1c syntax.
+    """
     if gr1py is None:
         raise ValueError('Import of gr1py interface failed.\n'
                          'Please verify installation of "gr1py".')
-    s = translate(spec, 'gr1c')
-    logger.info('\n{hl}\n gr1py input:\n {s}\n{hl}'.format(s=s, hl=_hl))
-    tsys, exprtab = gr1py.cli.loads(s)
+    symtab, exprtab = translate(spec, 'gr1py')
+    logger.info('\n{hl}\n gr1py input:\n {s}\n{hl}'.format(
+        s=pprint.pformat(exprtab), hl=_hl))
+    tsys = gr1py.tstruct.ts_from_expr(symtab, exprtab)
     return tsys, exprtab
+
+
+def _strategy_to_graph(symtab, strategy):
+    """Return strategy of gr1py as annotated graph.
+
+    The graph is like the return value of
+    L{gr1c.load_aut_json}, which parses the JSON output of gr1py.
+
+    @param symtab: symbol table of gr1py
+    @type strategy: C{networkx.DiGraph} from C{gr1py.solve.synthesize}
+    @rtype: C{networkx.DiGraph}
+    """
+    def domain(v):
+        if v['type'] == 'int':
+            return tuple(v['domain'])
+        return v['type']
+    names = [v['name'] for v in symtab]
+    A = nx.DiGraph()
+    A.env_vars = {v['name']: domain(v) for v in symtab if v['uncontrolled']}
+    A.sys_vars = {
+        v['name']: domain(v) for v in symtab if not v['uncontrolled']}
+    A.initial_nodes = set()
+    for u, d in strategy.nodes(data=True):
+        A.add_node(u, state=dict(zip(names, d['state'])),
+                   mode=d['mode'], initial=d['initial'])
+        if d['initial']:
+            A.initial_nodes.add(u)
+    A.add_edges_from(strategy.edges())
+    return A
@@ -6,7 +6,9 @@
 `omega` constructs symbolic transducers,
 represented as binary decision diagrams.
 This module applies enumeration,
-to return enumerated transducers.
+to return enumerated transducers,
+or wraps the symbolic transducer in a
+L{SymbolicController} that is queried directly.
 
 U{https://pypi.python.org/pypi/omega}
 """
@@ -73,6 +75,162 @@ def synthesize_enumerated_streett(spec):
     return h
 
 
+def synthesize_symbolic_streett(spec):
+    """Return transducer represented by its BDD.
+
+    The strategy is not enumerated.
+    Call L{SymbolicController.enumerate}
+    to enumerate it, if needed.
+
+    @type spec: `tulip.spec.form.GRSpec`
+    @rtype: L{SymbolicController} or `None`
+    """
+    aut = _grspec_to_automaton(spec)
+    assert aut.action['sys'] != aut.false
+    t0 = time.time()
+    z, yij, xijk = gr1.solve_streett_game(aut)
+    t1 = time.time()
+    if not gr1.is_realizable(z, aut):
+        print('WARNING: unrealizable')
+        return None
+    gr1.make_streett_transducer(z, yij, xijk, aut)
+    del z, yij, xijk
+    t2 = time.time()
+    log.info((
+        'Winning set computed in {win} sec.\n'
+        'Symbolic strategy computed in {sym} sec.').format(
+            win=t1 - t0,
+            sym=t2 - t1))
+    return SymbolicController(aut, spec)
+
+
+class SymbolicController(object):
+    """Mealy controller that reacts by evaluating a BDD.
+
+    The controller keeps the transducer computed by
+    C{omega.games.gr1.make_streett_transducer},
+    so the strategy is never enumerated,
+    unless L{enumerate} is called.
+
+    A state of the controller is a C{dict} that
+    assigns values to the environment and system
+    variables, and to the controller's memory variables.
+    As in L{MealyMachine}s returned by L{synth.synthesize},
+    the first reaction is from the state C{'Sinit'}.
+
+    Values of variables with a finite set of strings as
+    domain are strings in the inputs and outputs,
+    and integers in the states.
+
+    Example::
+
+        ctrl = synth.synthesize(spec, symbolic=True)
+        state, outputs = ctrl.reaction('Sinit', dict(x=0))
+        state, outputs = ctrl.reaction(state, dict(x=1))
+    """
+
+    def __init__(self, aut, spec):
+        """Wrap the transducer C{aut.action['impl']}.
+
+        @type aut: `omega.symbolic.temporal.Automaton`
+        @type spec: `tulip.spec.form.GRSpec`
+        """
+        self.aut = aut
+        self.inputs = dict(spec.env_vars)
+        self.outputs = dict(spec.sys_vars)
+        self.initial_state = 'Sinit'
+        self._str_vars = {
+            k: v for k, v in self.inputs.items()
+            if isinstance(v, list)}
+        self._str_vars.update(
+            (k, v) for k, v in self.outputs.items()
+            if isinstance(v, list))
+        # enumeration rebinds the `aut` tables,
+        # so keep the BDDs and variables here
+        self._env_vars = list(aut.varlist['env'])
+        self._impl_vars = list(aut.varlist['impl'])
+        self._env_action = aut.action['env']
+        self._impl = aut.action['impl']
+        self._init = aut.init['env'] & aut.init['sys'] & aut.init['impl']
+
+    def reaction(self, from_state, inputs):
+        """Return next state and outputs, given inputs.
+
+        @param from_state: C{'Sinit'} or a state
+            returned by an earlier reaction
+        @type from_state: C{dict} or C{'Sinit'}
+
+        @param inputs: assigns a value to each input
+        @type inputs: C{dict}
+
+        @return: next state and outputs
+        @rtype: C{(dict, dict)}
+        """
+        aut = self.aut
+        missing = set(self.inputs).difference(inputs)
+        if missing:
+            raise ValueError(
+                'missing values for inputs: {m}'.format(m=missing))
+        env = {k: self._to_int(k, inputs[k]) for k in self.inputs}
+        if from_state == self.initial_state:
+            u = aut.let(env, self._init)
+            care_vars = self._impl_vars
+            unprime = None
+        else:
+            values = dict(from_state)
+            values.update((_prime(k), v) for k, v in env.items())
+            if aut.let(values, self._env_action) == aut.false:
+                raise ValueError((
+                    'inputs {i} violate the environment '
+                    'assumption at state {s}').format(
+                        i=inputs, s=from_state))
+            u = aut.let(values, self._impl)
+            care_vars = [_prime(k) for k in self._impl_vars]
+            unprime = {_prime(k): k for k in self._impl_vars}
+        if u == aut.false:
+            raise ValueError((
+                'no reaction to inputs {i} '
+                'at state {s}').format(i=inputs, s=from_state))
+        d = aut.pick(u, care_vars=care_vars)
+        if unprime is not None:
+            d = {unprime[k]: v for k, v in d.items() if k in unprime}
+        next_state = dict(env)
+        next_state.update((k, d[k]) for k in self._impl_vars)
+        outputs = {
+            k: self._to_str(k, next_state[k])
+            for k in self.outputs}
+        return next_state, outputs
+
+    def enumerate(self):
+        """Return the strategy enumerated as a graph.
+
+        The result can be passed to L{synth.strategy2mealy}.
+
+        @rtype: `networkx.DiGraph`
+        """
+        t0 = time.time()
+        g = enum.action_to_steps(
+            self.aut, 'env', 'impl', qinit=self.aut.qinit)
+        h = _strategy_to_state_annotated(g, self.aut)
+        t1 = time.time()
+        log.info('Strategy enumerated in {t} sec.'.format(t=t1 - t0))
+        return h
+
+    def _to_int(self, var, value):
+        if var in self._str_vars:
+            return self._str_vars[var].index(value)
+        return value
+
+    def _to_str(self, var, value):
+        if var in self._str_vars:
+            return self._str_vars[var][value]
+        return value
+
+
+def _prime(var):
+    return "{var}'".format(var=var)
+
+
 def is_circular(spec):
     """Return `True` if trivial winning set non-empty.
 
@@ -36,13 +36,18 @@ Relevant links:
 """
 from __future__ import absolute_import
 import errno
+import io
 import logging
-import json
 import os
 import subprocess
 import tempfile
 import networkx as nx
 from tulip.spec import GRSpec, translate
+from tulip.interfaces.gr1c import iter_json_items
+try:
+    from dd import dddmp
+except ImportError:
+    dddmp = None
 
 
 # If this path begins with '/', then it is considered to be absolute.
@@ -80,8 +85,15 @@ def synthesize(spec, symbolic=False):
     """Return strategy satisfying the specification C{spec}.
 
     @type spec: L{GRSpec} or C{str} in structured slugs syntax.
+
+    @param symbolic: if C{True}, then call C{slugs --symbolicStrategy}
+        and return a L{SymbolicController} that keeps the strategy BDD,
+        instead of enumerating the strategy.
+        Requires a L{GRSpec}, to map bits to variables.
+    @type symbolic: C{bool}
+
     @return: If realizable return synthesized strategy, otherwise C{None}.
-    @rtype: C{networkx.DiGraph}
+    @rtype: C{networkx.DiGraph}, or L{SymbolicController} if C{symbolic}
     """
     if isinstance(spec, GRSpec):
         assert not spec.moore
@@ -89,42 +101,280 @@ def synthesize(spec, symbolic=False):
         struct = translate(spec, 'slugs')
     else:
         struct = spec
+    if symbolic:
+        return _synthesize_symbolic(spec, struct)
     with tempfile.NamedTemporaryFile(delete=False) as fin:
         try:
             fin.write(bytes(struct, 'utf-8'))
         except TypeError:  # Try to be compatible with Python 2.7
             fin.write(bytes(struct))
-    realizable, out = _call_slugs(fin.name, synth=True, symbolic=symbolic)
+    realizable, strategy = _call_slugs(
+        fin.name, synth=True, symbolic=False,
+        load=lambda f: _strategy_from_json(f, spec))
     if not realizable:
         return None
     os.unlink(fin.name)
+    return strategy
+
+
+def _synthesize_symbolic(spec, struct):
+    """Return L{SymbolicController} loaded from C{slugs} BDD dump."""
+    if not isinstance(spec, GRSpec):
+        raise TypeError(
+            'symbolic strategies need a `GRSpec`, '
+            'got: {t}'.format(t=type(spec)))
+    if dddmp is None:
+        raise ImportError(
+            'Failed to import `dd.dddmp`, '
+            'which loads symbolic strategies.')
+    with tempfile.NamedTemporaryFile(delete=False) as fin:
+        try:
+            fin.write(bytes(struct, 'utf-8'))
+        except TypeError:  # Try to be compatible with Python 2.7
+            fin.write(bytes(struct))
+    with tempfile.NamedTemporaryFile(delete=False) as fbdd:
+        pass
+    try:
+        realizable, _ = _call_slugs(
+            fin.name, synth=True, symbolic=True,
+            bdd_file=fbdd.name)
+        if not realizable:
+            return None
+        bdd = dddmp.load(fbdd.name)
+    finally:
+        os.unlink(fin.name)
+        os.unlink(fbdd.name)
+    (u, ) = bdd.roots
+    return SymbolicController(bdd, u, spec)
+
+
+def _strategy_from_json(out, spec):
+    """Return strategy graph from C{slugs --jsonOutput}.
+
+    The JSON is parsed incrementally, and each node is
+    added to the graph, with its bits decoded to integers,
+    as soon as it is parsed.
+
+    @type out: C{str} or file-like object
+    @rtype: C{networkx.DiGraph}
+    """
     # collect int vars
     vrs = dict(spec.sys_vars)
     vrs.update(spec.env_vars)
-    dout = json.loads(out)
-    g = nx.DiGraph()
-    dvars = dout['variables']
-    for stru, d in dout['nodes'].items():
-        u = int(stru)
-        state = dict(zip(dvars, d['state']))
-        g.add_node(u, state=state)
-        for v in d['trans']:
-            g.add_edge(u, v)
+    if not hasattr(out, 'read'):
+        out = io.StringIO(u'' + out)
     h = nx.DiGraph()
-    for u, d in g.nodes(data=True):
-        bit_state = d['state']
-        int_state = _bitfields_to_ints(bit_state, vrs)
-        h.add_node(u, state=int_state)
-    for u, v in g.edges():
-        h.add_edge(u, v)
-    logger.debug(
-        ('loaded strategy with vertices:\n  {v}\n'
-         'and edges:\n {e}\n').format(
-            v='\n  '.join(str(x) for x in h.nodes(data=True)),
-            e=h.edges()))
+    decode = None
+    for key, d in iter_json_items(out):
+        if key == 'variables':
+            decode = _bitfield_decoder(d, vrs)
+        if not isinstance(key, tuple):
+            continue
+        u = int(key[1])
+        h.add_node(u, state=decode(d['state']))
+        h.add_edges_from((u, v) for v in d['trans'])
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            ('loaded strategy with vertices:\n  {v}\n'
+             'and edges:\n {e}\n').format(
+                v='\n  '.join(str(x) for x in h.nodes(data=True)),
+                e=h.edges()))
     return h
 
 
+def _bitfield_decoder(bitnames, vrs):
+    """Return function that maps bit vectors to integer states.
+
+    The positions and weights of the bits of each variable
+    are computed once, from the order C{bitnames} of the bits.
+
+    @param bitnames: names of bits, as in the
+        C{"variables"} of C{slugs --jsonOutput}
+    @type bitnames: C{list} of C{str}
+    @type vrs: C{dict}
+    @rtype: callable that takes a C{list} of bits
+    """
+    index = {b: i for i, b in enumerate(bitnames)}
+    bools = list()
+    ints = list()
+    for var, dom in vrs.items():
+        if dom == 'boolean':
+            bools.append((var, index[var]))
+            continue
+        # little-endian
+        masks = [(index[b], 1 << i)
+                 for i, b in enumerate(_int_bit_names(var, dom))]
+        ints.append((var, masks))
+
+    def decode(bits):
+        state = {var: bits[i] for var, i in bools}
+        for var, masks in ints:
+            state[var] = sum(w for i, w in masks if bits[i])
+        return state
+    return decode
+
+
+class SymbolicController(object):
+    """Mealy controller that reacts by evaluating the BDD from C{slugs}.
+
+    The BDD dumped by C{slugs --symbolicStrategy} is a relation
+    over bits of the current state, primed bits of the next state,
+    and bits that encode the memory of the strategy
+    (for example, the current recurrence goal).
+    Each reaction substitutes the current state and next inputs
+    in this relation, and picks a next state.
+
+    A state is a C{dict} that assigns values to the environment
+    and system variables, and to the memory bits of the strategy.
+    Memory bits missing from a state are taken C{False},
+    which selects the first recurrence goal.
+    The BDD does not represent initial conditions,
+    so the first reaction is from a given state of the game,
+    not from C{'Sinit'}.
+
+    Call L{enumerate} to obtain the strategy as a graph.
+    """
+
+    def __init__(self, bdd, u, spec):
+        """Wrap strategy C{u} in C{bdd}.
+
+        @type bdd: C{dd.bdd.BDD}
+        @param u: node of the strategy relation in C{bdd}
+        @type spec: L{GRSpec}
+        """
+        self.bdd = bdd
+        self.strategy = u
+        self.inputs = dict(spec.env_vars)
+        self.outputs = dict(spec.sys_vars)
+        self._spec = spec
+        self._vars = dict(self.inputs)
+        self._vars.update(self.outputs)
+        input_bits = set(_bit_names(self.inputs))
+        output_bits = set(_bit_names(self.outputs))
+        game_bits = input_bits | output_bits
+        self._memory_bits = [
+            b for b in bdd.vars
+            if not b.endswith("'") and b not in game_bits]
+        self._next_bits = sorted(output_bits) + self._memory_bits
+
+    def reaction(self, from_state, inputs):
+        """Return next state and outputs, given inputs.
+
+        @param from_state: assigns values to the environment
+            and system variables, and optionally
+            to the memory bits of the strategy
+        @type from_state: C{dict}
+
+        @param inputs: assigns a value to each input
+        @type inputs: C{dict}
+
+        @return: next state and outputs
+        @rtype: C{(dict, dict)}
+        """
+        if from_state == 'Sinit':
+            raise ValueError(
+                'The strategy BDD from `slugs` has no initial '
+                'conditions, give an initial state of the game.')
+        missing = set(self._vars).difference(from_state)
+        missing.update(set(self.inputs).difference(inputs))
+        if missing:
+            raise ValueError(
+                'missing values for variables: {m}'.format(m=missing))
+        bdd = self.bdd
+        values = {
+            b: False for b in self._memory_bits
+            if b not in from_state}
+        values.update(
+            (b, bool(from_state[b])) for b in self._memory_bits
+            if b in from_state)
+        values.update(_ints_to_bitfields(
+            {k: from_state[k] for k in self._vars}, self._vars))
+        values.update(
+            (_prime(b), v) for b, v in _ints_to_bitfields(
+                inputs, self.inputs).items())
+        values = {b: v for b, v in values.items() if b in bdd.vars}
+        u = bdd.let(values, self.strategy)
+        care_vars = [
+            _prime(b) for b in self._next_bits
+            if _prime(b) in bdd.vars]
+        d = next(bdd.pick_iter(u, care_vars=care_vars), None)
+        if d is None:
+            raise ValueError((
+                'no reaction to inputs {i} '
+                'at state {s}').format(i=inputs, s=from_state))
+        bits = {
+            b: int(d.get(_prime(b), False))
+            for b in self._next_bits}
+        outputs = _bitfields_to_ints(bits, self.outputs)
+        outputs = {
+            k: bool(v) if self.outputs[k] == 'boolean' else v
+            for k, v in outputs.items()}
+        next_state = dict(inputs)
+        next_state.update(outputs)
+        next_state.update(
+            (b, bool(bits[b])) for b in self._memory_bits
+            if b in bits)
+        return next_state, outputs
+
+    def enumerate(self):
+        """Return the strategy enumerated as a graph.
+
+        Calls C{slugs --explicitStrategy}.
+        The result can be passed to L{synth.strategy2mealy}.
+
+        @rtype: C{networkx.DiGraph}
+        """
+        return synthesize(self._spec, symbolic=False)
+
+
+def _bit_names(vrs):
+    """Return names that C{slugs} gives to bits of variables.
+
+    @type vrs: C{dict}
+    @rtype: C{list} of C{str}
+    """
+    names = list()
+    for var, dom in vrs.items():
+        if dom == 'boolean':
+            names.append(var)
+            continue
+        names.extend(_int_bit_names(var, dom))
+    return names
+
+
+def _int_bit_names(var, dom):
+    bitnames = ['{var}@{i}'.format(var=var, i=i)
+                for i in range(dom[1].bit_length())]
+    bitnames[0] = '{var}@0.{min}.{max}'.format(
+        var=var, min=dom[0], max=dom[1])
+    return bitnames
+
+
+def _ints_to_bitfields(int_state, vrs):
+    """Convert integers to bitfield representation.
+
+    Inverse of L{_bitfields_to_ints}.
+
+    @type int_state: C{dict}
+    @type vrs: C{dict}
+    @rtype: C{dict} that maps bit names to C{bool}
+    """
+    bit_state = dict()
+    for var, value in int_state.items():
+        dom = vrs[var]
+        if dom == 'boolean':
+            bit_state[var] = bool(value)
+            continue
+        for i, b in enumerate(_int_bit_names(var, dom)):
+            # little-endian
+            bit_state[b] = bool((value >> i) & 1)
+    return bit_state
+
+
+def _prime(bit):
+    return "{bit}'".format(bit=bit)
+
+
 def _bitfields_to_ints(bit_state, vrs):
     """Convert bitfield representation to integers.
 
@@ -136,20 +386,26 @@ def _bitfields_to_ints(bit_state, vrs):
         if dom == 'boolean':
             int_state[var] = bit_state[var]
             continue
-        bitnames = ['{var}@{i}'.format(var=var, i=i)
-                    for i in range(dom[1].bit_length())]
-        bitnames[0] = '{var}@0.{min}.{max}'.format(
-            var=var, min=dom[0], max=dom[1])
-        bitvalues = [bit_state[b] for b in bitnames]
+        bitnames = _int_bit_names(var, dom)
         # little-endian
-        val = int(''.join(str(b) for b in reversed(bitvalues)), 2)
-        int_state[var] = val
+        int_state[var] = sum(
+            1 << i for i, b in enumerate(bitnames)
+            if int(bit_state[b]))
     return int_state
 
 
-def _call_slugs(filename, synth=True, symbolic=True, slugs_compiler_path=None):
+def _call_slugs(filename, synth=True, symbolic=True, slugs_compiler_path=None,
+                bdd_file=None, load=None):
     """Call `slugs` and return results.
 
+    bdd_file is where `slugs --symbolicStrategy` dumps the strategy.
+    If None (default), then use the module-level identifier BDD_FILE.
+
+    If load is None (default), then return the stdout of `slugs`
+    as a string.  Otherwise, call load with the stdout pipe of
+    `slugs` while it runs, and return the result, or None if
+    not realizable.  This avoids holding the output in memory.
+
     slugs_compiler_path is the path to the slugsin converter format.
     If None (default), then use the path as in the module-level
     identifier SLUGS_COMPILER_PATH.  If this path begins with '/',
@@ -185,7 +441,9 @@ def _call_slugs(filename, synth=True, symbolic=True, slugs_compiler_path=None):
     options = [slugs_path, slugs_infile.name]
     if synth:
         if symbolic:
-            options.extend(['--symbolicStrategy', BDD_FILE])
+            if bdd_file is None:
+                bdd_file = BDD_FILE
+            options.extend(['--symbolicStrategy', bdd_file])
         else:
             options.append('--explicitStrategy')
             options.append('--jsonOutput')
@@ -198,6 +456,8 @@ def _call_slugs(filename, synth=True, symbolic=True, slugs_compiler_path=None):
         # `slugs`: "Error: Parameter '--onlyRealizability' is unknown."
         pass
     logger.debug('Calling: ' + ' '.join(options))
+    if load is not None:
+        return _call_slugs_and_load(options, load)
     try:
         p = subprocess.Popen(
             options,
@@ -219,8 +479,54 @@ def _call_slugs(filename, synth=True, symbolic=True, slugs_compiler_path=None):
     # error ?
     if p.returncode != 0:
         raise Exception(msg)
+    realizable = _is_realizable(err)
+    return realizable, out
+
+
+def _call_slugs_and_load(options, load):
+    """Run C{slugs} with C{options}, and C{load} its stdout."""
+    with tempfile.TemporaryFile(mode='w+') as ferr:
+        try:
+            p = subprocess.Popen(
+                options,
+                stdout=subprocess.PIPE,
+                stderr=ferr,
+                universal_newlines=True)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                raise Exception('slugs not found in path.')
+            else:
+                raise
+        # nothing to load if unrealizable
+        try:
+            result = load(p.stdout)
+            error = None
+        except ValueError as e:
+            result = None
+            error = e
+        p.stdout.close()
+        p.wait()
+        ferr.seek(0)
+        err = ferr.read()
+    msg = (
+        '\n slugs return code: {c}\n\n'.format(c=p.returncode) +
+        '\n slugs stderr: {c}\n\n'.format(c=err))
+    logger.debug(msg)
+    # error ?
+    if p.returncode != 0:
+        raise Exception(msg)
+    realizable = _is_realizable(err)
+    if not realizable:
+        return realizable, None
+    if error is not None:
+        raise error
+    return realizable, result
+
+
+def _is_realizable(err):
+    """Return C{True} if C{slugs} stderr reports realizable."""
     realizable = 'Specification is realizable' in err
     # check sanity
     if not realizable:
         assert 'Specification is unrealizable' in err
-    return realizable, out
+    return realizable
@@ -38,6 +38,7 @@
   - SPIN: http://spinroot.com/spin/Man/ltl.html
           http://spinroot.com/spin/Man/operators.html
   - python (Boolean formulas only)
+  - gr1py: python expressions, as used internally by gr1py
   - WRING: http://vlsi.colorado.edu/~rbloem/wring.html
         (see top of file: LTL.pm)
 """
@@ -189,6 +190,49 @@ def make_python_nodes():
     return nodes
 
 
+def make_gr1py_nodes():
+    """Python expressions, with primed variables named as in gr1py.
+
+    The variable C{x} after the next operator is named C{x_next},
+    as in the output of C{gr1py.form.util.gen_expr}.
+    """
+    opmap = {'True': 'True', 'False': 'False',
+             '!': 'not', '&': 'and', '|': 'or',
+             '^': '^', '=': '==', '!=': '!=',
+             '<': '<', '>=': '>=', '<=': '<=', '>': '>',
+             '+': '+', '-': '-'}
+    nodes = ast.make_fol_nodes(opmap)
+
+    class Var(nodes.Var):
+        def flatten(self, prime=None, **kw):
+            return '{v}{suffix}'.format(
+                v=self.value, suffix='_next' if prime else '')
+
+    class Unary(nodes.Unary):
+        def flatten(self, *arg, **kw):
+            if self.operator == 'X':
+                kw.update(prime=True)
+                return self.operands[0].flatten(*arg, **kw)
+            return super(Unary, self).flatten(*arg, **kw)
+
+    class Binary(nodes.Binary):
+        def flatten(self, *arg, **kw):
+            if self.operator == '->':
+                s = '( ( not {l} ) or {r} )'
+            elif self.operator == '<->':
+                s = '( {l} == {r} )'
+            else:
+                return super(Binary, self).flatten(*arg, **kw)
+            return s.format(
+                l=self.operands[0].flatten(*arg, **kw),
+                r=self.operands[1].flatten(*arg, **kw))
+
+    nodes.Var = Var
+    nodes.Unary = Unary
+    nodes.Binary = Binary
+    return nodes
+
+
 lang2nodes = {
     'jtlv': make_jtlv_nodes(),
     'gr1c': make_gr1c_nodes(),
@@ -196,6 +240,7 @@ lang2nodes = {
     'promela': make_promela_nodes(),
     'smv': make_smv_nodes(),
     'python': make_python_nodes(),
+    'gr1py': make_gr1py_nodes(),
     'wring': make_wring_nodes()}
 
 
@@ -334,6 +379,43 @@ def _gr1c_str(s, name='SYSGOAL', prefix='[]<>'):
     return '{name}: {f};\n'.format(name=name, f=f)
 
 
+def _to_gr1py(d):
+    """Return symbol and expression tables of gr1py.
+
+    The tables are as returned by C{gr1py.form.util.gen_expr},
+    followed by C{gr1py.form.util.fill_empty}.
+    Cf. L{interfaces.gr1py}.
+
+    @rtype: C{(list, dict)}
+    """
+    logger.info('translate to gr1py...')
+    symtab = list()
+    for vrs, uncontrolled in ((d['env_vars'], True),
+                              (d['sys_vars'], False)):
+        for var, dom in vrs.items():
+            dom = convert_domain(dom)
+            if dom == 'boolean':
+                r = dict(type='boolean', domain=None)
+            elif isinstance(dom, tuple) and len(dom) == 2:
+                r = dict(type='int', domain=dom)
+            else:
+                raise ValueError(
+                    'Domain "{dom}" not supported by gr1py.'.format(dom=dom))
+            r.update(name=var, uncontrolled=uncontrolled)
+            symtab.append(r)
+    # empty means True
+    exprtab = dict()
+    for part, name in (('env_init', 'ENVINIT'), ('sys_init', 'SYSINIT')):
+        s = ' and '.join('( {f} )'.format(f=f) for f in d[part])
+        exprtab[name] = s if s else 'True'
+    for part, name in (('env_safety', 'ENVTRANS'),
+                       ('sys_safety', 'SYSTRANS'),
+                       ('env_prog', 'ENVGOAL'),
+                       ('sys_prog', 'SYSGOAL')):
+        exprtab[name] = list(d[part]) if d[part] else ['True']
+    return symtab, exprtab
+
+
 def _to_slugs(d):
     """Return structured slugs spec.
     """
@@ -375,7 +457,7 @@ def _format_slugs_vars(vardict, name):
 
 
 to_lang = {'jtlv': _to_jtlv, 'gr1c': _to_gr1c, 'slugs': _to_slugs,
-           'wring': _to_wring}
+           'gr1py': _to_gr1py, 'wring': _to_wring}
 
 
 def translate(spec, lang):
@@ -385,12 +467,13 @@ def translate(spec, lang):
     concerning formats and links to further reading.
 
     @type spec: L{GRSpec}
-    @type lang: 'gr1c', 'slugs', 'jtlv', or 'wring'
+    @type lang: 'gr1c', 'slugs', 'gr1py', 'jtlv', or 'wring'
 
     @return: spec formatted for input to tool; the type of the return
     value depends on the tool:
 
         - C{str} if gr1c or slugs
+        - (symtab, exprtab) if gr1py, see L{_to_gr1py}
         - (assumption, guarantee), where each element of the tuple is C{str}
     """
     if not isinstance(spec, tulip.spec.form.GRSpec):
@@ -411,7 +494,7 @@ def translate_ast(tree, lang):
     """Return AST of formula C{tree}.
 
     @type tree: L{Nodes.Node}
-    @type lang: 'gr1c' or 'slugs' or 'jtlv' or
+    @type lang: 'gr1c' or 'slugs' or 'gr1py' or 'jtlv' or
       'promela' or 'smv' or 'python' or 'wring'
 
     @return: tree using AST nodes of C{lang}
@@ -1011,7 +1011,8 @@ def synthesize(
         ignore_env_init=False,
         ignore_sys_init=False,
         rm_deadends=True,
-        solver='omega'):
+        solver='omega',
+        symbolic=False):
     """Function to call the appropriate synthesis tool on the specification.
 
     There are three attributes of C{specs} that define what
@@ -1099,25 +1100,41 @@ def synthesize(
           - C{"slugs"}: use slugs via L{interfaces.slugs}.
             C++ using CUDD, symbolic
 
+    @param symbolic: if C{True}, then return a controller that
+        keeps the strategy as a BDD, and computes each reaction
+        by evaluating the BDD, instead of enumerating the strategy.
+        Supported by the solvers C{"omega"} and C{"slugs"}.
+        The strategy can be enumerated later, by calling
+        the method C{enumerate} of the controller.
+        C{rm_deadends} is ignored.
+    @type symbolic: bool
+
     @return: If spec is realizable,
-        then return a Mealy machine implementing the strategy.
+        then return a Mealy machine implementing the strategy,
+        or a symbolic controller if C{symbolic}.
         Otherwise return None.
-    @rtype: L{MealyMachine} or None
+    @rtype: L{MealyMachine},
+        L{interfaces.omega.SymbolicController},
+        L{interfaces.slugs.SymbolicController}, or None
     """
     specs = _spec_plus_sys(
         specs, env, sys,
         ignore_env_init,
         ignore_sys_init)
-    return _synthesize(specs, solver, rm_deadends)
+    return _synthesize(specs, solver, rm_deadends, symbolic)
 
 
-def _synthesize(specs, solver, rm_deadends):
+def _synthesize(specs, solver, rm_deadends, symbolic=False):
     """Return `MealyMachine` or `None` that implements `specs`.
 
     @type specs: L{spec.GRSpec}
     @type rm_deadends: C{bool}
+    @param symbolic: return a symbolic controller,
+        see L{synthesize}
     @rtype: L{MealyMachine} or C{None}
     """
+    if symbolic:
+        return _synthesize_symbolic(specs, solver)
     if solver == 'gr1c':
         strategy = gr1c.synthesize(specs)
     elif solver == 'slugs':
@@ -1139,6 +1156,26 @@ def _synthesize(specs, solver, rm_deadends):
     return _trim_strategy(strategy, specs, rm_deadends=rm_deadends)
 
 
+def _synthesize_symbolic(specs, solver):
+    """Return symbolic controller or C{None} that implements C{specs}.
+
+    @type specs: L{spec.GRSpec}
+    """
+    if solver == 'omega':
+        return omega_int.synthesize_symbolic_streett(specs)
+    elif solver == 'slugs':
+        if slugs is None:
+            raise ValueError(
+                'Import of slugs interface failed. '
+                'Please verify installation of "slugs".')
+        return slugs.synthesize(specs, symbolic=True)
+    options = {'omega', 'slugs'}
+    raise ValueError((
+        'Solver "{solver}" does not return symbolic controllers. '
+        'Available options are: {options}').format(
+            solver=solver, options=options))
+
+
 def _trim_strategy(strategy, specs, rm_deadends):
     """Return C{MealyMachine} without deadends, or C{None}.
 
@@ -1275,21 +1312,19 @@ def strategy2mealy(A, spec):
     str_vars.update({
         k: v for k, v in sys_vars.items()
         if isinstance(v, list)})
-    mach.states.add_from(A)
+    mach._add_new_nodes(A)
     all_vars = dict(env_vars)
     all_vars.update(sys_vars)
     u = next(iter(A))
     strategy_vars = A.nodes[u]['state'].keys()
     assert set(all_vars).issubset(strategy_vars)
-    # transitions labeled with I/O
-    for u in A:
-        for v in A.successors(u):
-            d = A.nodes[v]['state']
-            d = {k: v for k, v in d.items() if k in all_vars}
-            d = _int2str(d, str_vars)
-            mach.transitions.add(u, v, attr_dict=None, check=False, **d)
-
-            logger.info('node: {v}, state: {d}'.format(v=v, d=d))
+    # transitions labeled with I/O,
+    # the label of each edge is the state of its target
+    labels = dict()
+    for v, d in A.nodes(data=True):
+        d = {k: x for k, x in d['state'].items() if k in all_vars}
+        labels[v] = _int2str(d, str_vars)
+    mach._add_new_edges((u, v, labels[v]) for u, v in A.edges())
     # special initial state, for first reaction
     initial_state = 'Sinit'
     mach.states.add(initial_state)
@@ -1323,6 +1358,7 @@ def _init_edges_using_initial_nodes(
         A, mach, keys, all_vars, str_vars, initial_state):
     assert A.initial_nodes
     init_valuations = set()
+    edges = list()
     for u in A.initial_nodes:
         d = A.nodes[u]['state']
         vals = tuple(d[k] for k in keys)
@@ -1332,29 +1368,34 @@ def _init_edges_using_initial_nodes(
         init_valuations.add(vals)
         d = {k: v for k, v in d.items() if k in all_vars}
         d = _int2str(d, str_vars)
-        mach.transitions.add(initial_state, u, attr_dict=None, **d)
+        edges.append((initial_state, u, d))
+    mach._add_new_edges(edges)
 
 
 def _init_edges_using_compile_init(
         spec, A, mach, keys, all_vars, str_vars, initial_state):
-    init_valuations = set()
-    # to store tuples of dict values for fast search
     isinit = spec.compile_init(no_str=True)
     # Mealy reaction to initial env input
+    # to store tuples of dict values for fast search
     init_valuations = set()
+    # the initial condition is evaluated once for each valuation
+    non_init_valuations = set()
+    edges = list()
     tmp = dict()
     for u, d in A.nodes(data=True):
         var_values = d['state']
         vals = tuple(var_values[k] for k in keys)
         # already an initial valuation ?
-        if vals in init_valuations:
+        if vals in init_valuations or vals in non_init_valuations:
             continue
         # add edge: Sinit -> u ?
         tmp.update(var_values)
-        if eval(isinit, tmp):
+        if not eval(isinit, tmp):
+            non_init_valuations.add(vals)
+        else:
             var_values = {k: v for k, v in var_values.items() if k in all_vars}
             label = _int2str(var_values, str_vars)
-            mach.transitions.add(initial_state, u, attr_dict=None, check=False, **label)
+            edges.append((initial_state, u, label))
             # remember variable values to avoid
             # spurious non-determinism wrt the machine's memory
             #
@@ -1367,8 +1408,7 @@ def _init_edges_using_compile_init(
             # multiple choices for initializing the hidden memory.
             init_valuations.add(vals)
             logger.debug('found initial state: {u}'.format(u=u))
-        logger.debug('machine vertex: {u}, has var values: {v}'.format(
-                     u=u, v=var_values))
+    mach._add_new_edges(edges)
 
 
 def _int2str(label, str_vars):
@@ -37,7 +37,7 @@ Suggested abbreviation:
 """
 from __future__ import absolute_import
 from .mathset import MathSet, SubSet, PowerSet, TypedDict
-from .labeled_graphs import prepend_with
+from .labeled_graphs import prepend_with, backward_prune
 from .transys import (
     KripkeStructure, FiniteTransitionSystem, FTS,
     LabeledGameGraph,
@@ -43,12 +43,18 @@ import networkx as nx
 from tulip.transys.mathset import SubSet, TypedDict
 # inline imports:
 #
+# import scipy.sparse
 # from tulip.transys.export import graph2dot
 # from tulip.transys.export import save_d3
 # from tulip.transys.export import graph2dot
 
 
 logger = logging.getLogger(__name__)
+# label values that need not be copied for each node or edge
+_IMMUTABLE = (bool, int, float, complex, str, bytes, frozenset, type(None))
+# keys of label indexes, for unhashable values and unlabeled edges
+_UNHASHABLE = object()
+_UNLABELED = object()
 
 
 def label_is_desired(attr_dict, desired_dict):
@@ -59,17 +65,27 @@ def label_is_desired(attr_dict, desired_dict):
     if not isinstance(attr_dict, TypedDict):
         raise Exception('attr_dict must be TypedDict' +
                         ', instead: ' + str(type(attr_dict)))
+    return _label_matches(attr_dict, desired_dict, attr_dict.allowed_values)
+
+
+def _label_matches(attr_dict, desired_dict, label_def):
+    """Return True if all labels match.
+
+    Same as L{label_is_desired}, for a C{dict} C{attr_dict}
+    with label types C{label_def}.
+    """
     if attr_dict == desired_dict:
         return True
     # different keys ?
+    if len(attr_dict) != len(desired_dict):
+        return False
     mismatched_keys = set(attr_dict).symmetric_difference(desired_dict)
     if mismatched_keys:
         return False
     # any labels have symbolic semantics ?
-    label_def = attr_dict.allowed_values
     for type_name, value in attr_dict.items():
         logger.debug('Checking label type:\n\t' + str(type_name))
-        type_def = label_def[type_name]
+        type_def = label_def.get(type_name)
         desired_value = desired_dict[type_name]
         if hasattr(type_def, '__call__'):
             logger.debug('Found label semantics:\n\t' + str(type_def))
@@ -101,6 +117,141 @@ def test_common_bug(value, desired_value):
         raise Exception(msg)
 
 
+class _LabelChecker(object):
+    """Validate labels against label types.
+
+    Created once for the nodes and once for the edges of a graph,
+    so that adding a node or an edge needs no L{TypedDict}.
+    Invalid values raise the same C{ValueError} as L{TypedDict}.
+
+    @param types: C{dict} that maps each label name to
+        the values it can take, or to C{None} for any value.
+        Stored by reference, so label types added later apply.
+    @param defaults: C{dict} that maps label names to default values
+    """
+
+    def __init__(self, types, defaults):
+        self.types = types
+        # immutable defaults are shared by all labels
+        self.shared = dict()
+        self.copied = dict()
+        for k, v in defaults.items():
+            if isinstance(v, _IMMUTABLE):
+                self.shared[k] = v
+            else:
+                self.copied[k] = v
+
+    def new_label(self, attr_dict):
+        """Return new C{dict} with defaults, updated by C{attr_dict}."""
+        label = dict(self.shared)
+        for k, v in self.copied.items():
+            if k not in attr_dict:
+                label[k] = copy.deepcopy(v)
+        label.update(attr_dict)
+        return label
+
+    def check_value(self, key, value):
+        """Raise C{ValueError} if C{value} not allowed for C{key}."""
+        values = self.types.get(key)
+        if values is None:
+            return
+        try:
+            ok = value in values
+        except Exception:
+            ok = False
+        if not ok:
+            msg = (
+                'key: ' + str(key) + ', cannot be'
+                ' assigned value: ' + str(value) + '\n'
+                'Admissible values are:\n\t'
+                + str(values))
+            raise ValueError(msg)
+
+    def check(self, label):
+        """Raise C{ValueError} if C{label} has an invalid value."""
+        for k, v in label.items():
+            self.check_value(k, v)
+
+    def check_bulk(self, labels):
+        """Check many labels, each hashable value only once.
+
+        Values of type C{set} are hashed as C{frozenset}.
+
+        @param labels: iterable of C{dict}
+        """
+        seen = set()
+        for label in labels:
+            for k, v in label.items():
+                if type(v) is set:
+                    pair = (k, set, frozenset(v))
+                else:
+                    pair = (k, v)
+                try:
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                except TypeError:
+                    # unhashable
+                    pass
+                self.check_value(k, v)
+
+    def untyped_keys(self, label):
+        """Return C{list} of keys in C{label} without label type."""
+        types = self.types
+        return [k for k in label if k not in types]
+
+    def is_valid(self, label):
+        """Return C{True} if each value in C{label} is allowed."""
+        try:
+            self.check(label)
+        except ValueError:
+            return False
+        return True
+
+
+def _index_key(value):
+    """Return hashable key of label C{value} in label indexes.
+
+    Raise C{TypeError} if C{value} is unhashable.
+    """
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    hash(value)
+    return value
+
+
+def _index_items(label):
+    """Yield keys under which C{label} is indexed."""
+    if not label:
+        yield _UNLABELED
+        return
+    for k, v in label.items():
+        try:
+            yield (k, _index_key(v))
+        except TypeError:
+            yield (k, _UNHASHABLE)
+
+
+def _query_items(desired, label_def):
+    """Return keys to look up in label indexes, or C{None}.
+
+    C{None} means that the labels must be scanned,
+    because a desired value is unhashable,
+    or a label type has symbolic semantics.
+    """
+    if not desired:
+        return None
+    items = list()
+    for k, v in desired.items():
+        if hasattr(label_def.get(k), '__call__'):
+            return None
+        try:
+            items.append(((k, _index_key(v)), (k, _UNHASHABLE)))
+        except TypeError:
+            return None
+    return items
+
+
 class States(object):
     """Methods to manage states and initial states."""
 
@@ -325,6 +476,11 @@ class States(object):
             where:
                 - C{state} \\in C{states}
                 - C{label}: dict
+
+        If C{states} is given, then only those states are examined.
+        Otherwise, if the graph has label indexes
+        (L{LabeledDiGraph.index_labels}), then these are used
+        to find the states with the desired label.
         """
         if with_attr_dict is None:
             with_attr_dict = with_attr
@@ -345,34 +501,25 @@ class States(object):
                 msg += 'Replaced given states = ' + str(state)
                 msg += ' with states = ' + str(states)
                 logger.debug(msg)
+        graph = self.graph
+        labels = graph._node
+        if states is not None:
+            # examine only the given states
+            candidates = dict.fromkeys(s for s in states if s in labels)
+        else:
+            candidates = graph._find_nodes(with_attr_dict)
+            if candidates is None:
+                candidates = labels
+        label_def = graph._node_label_types
         found_state_label_pairs = []
-        for state, attr_dict in self.graph.nodes(data=True):
-            logger.debug('Checking state_id = ' + str(state) +
-                         ', with attr_dict = ' + str(attr_dict))
-            if states is not None:
-                if state not in states:
-                    logger.debug('state_id = ' + str(state) + ', not desired.')
-                    continue
-            msg = (
-                'Checking state label:\n\t attr_dict = ' +
-                str(attr_dict) +
-                '\n vs:\n\t desired_label = ' + str(with_attr_dict))
-            logger.debug(msg)
-            if not with_attr_dict:
-                logger.debug('Any label acceptable.')
-                ok = True
-            else:
-                typed_attr = TypedDict()
-                typed_attr.set_types(self.graph._node_label_types)
-                typed_attr.update(attr_dict)
-                ok = label_is_desired(typed_attr, with_attr_dict)
-            if ok:
-                logger.debug('Label Matched:\n\t' + str(attr_dict) +
-                             ' == ' + str(with_attr_dict))
-                state_label_pair = (state, dict(attr_dict))
-                found_state_label_pairs.append(state_label_pair)
-            else:
-                logger.debug('No match for label---> state discarded.')
+        for state in candidates:
+            attr_dict = labels[state]
+            if with_attr_dict and not _label_matches(
+                    attr_dict, with_attr_dict, label_def):
+                continue
+            state_label_pair = (state, dict(attr_dict))
+            found_state_label_pairs.append(state_label_pair)
+        logger.debug('found states: %s', found_state_label_pairs)
         return found_state_label_pairs
 
     def is_terminal(self, state):
@@ -493,8 +640,12 @@ class Transitions(object):
         The label can be empty.
         For more details see L{add}.
 
+        The label is checked once, and the transitions are
+        read directly from the indices of the nonzero entries.
+
         @param adj: new transitions represented by adjacency matrix.
-        @type adj: scipy.sparse.lil (list of lists)
+        @type adj: C{scipy.sparse} matrix (any format),
+            or C{numpy} array
 
         @param adj2states: map from adjacency matrix indices to states.
             If value not a state, raise Exception.
@@ -515,23 +666,27 @@ class Transitions(object):
               existing, or
             - C{list} of existing states
         """
+        import scipy.sparse
         # square ?
         if adj.shape[0] != adj.shape[1]:
             raise Exception('Adjacency matrix must be square.')
         # check states exist, before adding any transitions
-        for state in adj2states:
+        if isinstance(adj2states, dict):
+            states = adj2states.values()
+        else:
+            states = adj2states
+        for state in states:
             if state not in self.graph:
                 raise Exception(
                     'State: ' + str(state) + ' not found.'
                     ' Consider adding it with sys.states.add')
-        # convert to format friendly for edge iteration
-        nx_adj = nx.from_scipy_sparse_matrix(
-            adj, create_using=nx.DiGraph())
-        # add each edge using existing checks
-        for i, j in nx_adj.edges():
-            si = adj2states[i]
-            sj = adj2states[j]
-            self.add(si, sj, attr_dict, check, **attr)
+        # sums duplicate entries, and sorts indices
+        adj = scipy.sparse.csr_matrix(adj).tocoo()
+        edges = (
+            (adj2states[i], adj2states[j])
+            for i, j in zip(adj.row.tolist(), adj.col.tolist()))
+        attr_dict = self.graph._update_attr_dict_with_attr(attr_dict, attr)
+        self.graph._add_edges_with_label(edges, attr_dict, check)
 
     def find(self, from_states=None, to_states=None,
              with_attr_dict=None, typed_only=False, **with_attr):
@@ -587,6 +742,9 @@ class Transitions(object):
           - C{from_state} in C{from_states}
           - C{to_state} in C{to_states}
           - C{label}: dict
+
+        If the graph has label indexes (L{LabeledDiGraph.index_labels}),
+        then these are used to find the edges with the desired label.
         """
         if with_attr_dict is None:
             with_attr_dict = with_attr
@@ -594,28 +752,29 @@ class Transitions(object):
             with_attr_dict.update(with_attr)
         except:
             raise TypeError('with_attr_dict must be a dict')
-        found_transitions = []
-        u_v_edges = self.graph.edges(nbunch=from_states, data=True)
+        graph = self.graph
+        if from_states is not None:
+            from_states = list(graph.nbunch_iter(from_states))
         if to_states is not None:
-            u_v_edges = [(u, v, d)
-                         for u, v, d in u_v_edges
-                         if v in to_states]
+            try:
+                to_states = set(to_states)
+            except TypeError:
+                pass
+        u_v_edges = graph._find_edges(with_attr_dict, from_states)
+        if u_v_edges is None:
+            u_v_edges = graph.edges(nbunch=from_states, data=True)
+        label_def = graph._edge_label_types
+        found_transitions = []
         for u, v, attr_dict in u_v_edges:
-            ok = True
-            if not with_attr_dict:
-                logger.debug('Any label is allowed.')
-            elif not attr_dict:
-                logger.debug('No labels defined.')
-            else:
-                logger.debug('Checking guard.')
-                typed_attr = TypedDict()
-                typed_attr.set_types(self.graph._edge_label_types)
-                typed_attr.update(attr_dict)
-                ok = label_is_desired(typed_attr, with_attr_dict)
-            if ok:
-                logger.debug('Transition label matched desired label.')
-                transition = (u, v, dict(attr_dict))
-                found_transitions.append(transition)
+            if to_states is not None and v not in to_states:
+                continue
+            # unlabeled edges match any label
+            if with_attr_dict and attr_dict and not _label_matches(
+                    attr_dict, with_attr_dict, label_def):
+                continue
+            transition = (u, v, dict(attr_dict))
+            found_transitions.append(transition)
+        logger.debug('found transitions: %s', found_transitions)
         return found_transitions
 
 
@@ -672,10 +831,10 @@ class LabeledDiGraph(nx.MultiDiGraph):
       {'drink': 'tea'}
 
     The main difference with vanilla C{networkx} is
-    that the dict above includes type checking:
+    that labels are type checked when added:
 
-      >>> type(g.nodes[2])
-      tulip.transys.mathset.TypedDict
+      >>> g.add_node(3, drink='juice')
+      ValueError: ...
 
     The C{'setter'} key with value C{True}
     creates also a field C{g.drink}.
@@ -746,6 +905,41 @@ class LabeledDiGraph(nx.MultiDiGraph):
 
     @param deterministic: if True, then edge-label-deterministic
 
+    @param compact_labels: if C{True}, then check the labels passed to
+        L{add_nodes_from} and L{add_edges_from} in bulk,
+        as described below.
+    @type compact_labels: bool
+
+
+    Compact labels
+    ==============
+
+    Labels are stored as plain C{dict}, and are checked by
+    validators created once for each graph from the label types.
+    Default values that are immutable are shared among labels,
+    whereas mutable ones (e.g., C{set}) are copied for each
+    node and edge.
+
+    By default each node and each edge is checked as it is added.
+    For large graphs set C{compact_labels=True} (or the attribute
+    of the same name), so that L{add_nodes_from} and
+    L{add_edges_from} check each distinct label value once
+    for all the nodes (edges) passed, before adding any of them.
+    The errors raised for invalid values and untyped keys
+    are the same in both cases.
+
+
+    Label indexes
+    =============
+
+    Calling L{index_labels} creates indexes from label values
+    to nodes and to edges, which L{States.find} and
+    L{Transitions.find} use to answer queries by label, instead of
+    scanning the graph. The indexes are updated when nodes and
+    edges are added or removed. Labels changed in place, as in
+    C{g.nodes[1]['drink'] = 'coffee'}, are not tracked,
+    so after such changes call L{index_labels} again.
+
 
     Deprecated dot export
     =====================
@@ -778,7 +972,8 @@ class LabeledDiGraph(nx.MultiDiGraph):
             self,
             node_label_types=None,
             edge_label_types=None,
-            deterministic=False):
+            deterministic=False,
+            compact_labels=False):
         node_labeling, node_defaults = self._init_labeling(node_label_types)
         edge_labeling, edge_defaults = self._init_labeling(edge_label_types)
 
@@ -791,6 +986,12 @@ class LabeledDiGraph(nx.MultiDiGraph):
         # temporary hack until rename
         self._node_label_types = self._state_label_def
         self._edge_label_types = self._transition_label_def
+        self._node_checker = _LabelChecker(node_labeling, node_defaults)
+        self._edge_checker = _LabelChecker(edge_labeling, edge_defaults)
+        self.compact_labels = compact_labels
+        # label indexes, see `index_labels`
+        self._node_index = None
+        self._edge_index = None
 
         nx.MultiDiGraph.__init__(self)
 
@@ -835,12 +1036,13 @@ class LabeledDiGraph(nx.MultiDiGraph):
 
     def _check_for_untyped_keys(self, typed_attr, type_defs, check):
         untyped_keys = set(typed_attr).difference(type_defs)
-        msg = (
-            'checking for untyped keys...\n' +
-            'attribute dict: ' + str(typed_attr) + '\n' +
-            'type definitions: ' + str(type_defs) + '\n' +
-            'untyped_keys: ' + str(untyped_keys))
-        logger.debug(msg)
+        if logger.isEnabledFor(logging.DEBUG):
+            msg = (
+                'checking for untyped keys...\n' +
+                'attribute dict: ' + str(typed_attr) + '\n' +
+                'type definitions: ' + str(type_defs) + '\n' +
+                'untyped_keys: ' + str(untyped_keys))
+            logger.debug(msg)
         if untyped_keys:
             msg = (
                 'The following edge attributes:\n' +
@@ -866,11 +1068,13 @@ class LabeledDiGraph(nx.MultiDiGraph):
 
         @rtype: bool
         """
+        node_checker = self._node_checker
         for node, attr_dict in self.nodes(data=True):
-            if not attr_dict.is_consistent():
+            if not node_checker.is_valid(attr_dict):
                 return False
+        edge_checker = self._edge_checker
         for node_i, node_j, attr_dict in self.edges(data=True):
-            if not attr_dict.is_consistent():
+            if not edge_checker.is_valid(attr_dict):
                 return False
         return True
 
@@ -886,7 +1090,7 @@ class LabeledDiGraph(nx.MultiDiGraph):
         return attr_dict
 
     def add_node(self, n, attr_dict=None, check=True, **attr):
-        """Use a L{TypedDict} as attribute dict.
+        """Check the node label against the label types.
 
         Overrides C{networkx.MultiDiGraph.add_node},
         see that for details.
@@ -898,23 +1102,23 @@ class LabeledDiGraph(nx.MultiDiGraph):
             then raise C{AttributeError}.
         """
         attr_dict = self._update_attr_dict_with_attr(attr_dict, attr)
-        # define typed dict
-        typed_attr = TypedDict()
-        typed_attr.set_types(self._node_label_types)
-        typed_attr.update(copy.deepcopy(self._node_label_defaults))
+        checker = self._node_checker
+        label = checker.new_label(attr_dict)
         # type checking happens here
-        typed_attr.update(attr_dict)
-        self._check_for_untyped_keys(typed_attr,
-                                     self._node_label_types,
-                                     check)
-        nx.MultiDiGraph.add_node(self, n, **typed_attr)
+        checker.check(label)
+        self._check_untyped(checker, label, check)
+        self._add_labeled_node(n, label)
 
     def add_nodes_from(self, nodes, check=True, **attr):
         """Create or label multiple nodes.
 
         Overrides C{networkx.MultiDiGraph.add_nodes_from},
         for details see that and L{LabeledDiGraph.add_node}.
+
+        If C{self.compact_labels}, then the labels are checked
+        in bulk, before adding any node.
         """
+        pairs = list()
         for n in nodes:
             try:
                 n not in self._succ
@@ -924,10 +1128,53 @@ class LabeledDiGraph(nx.MultiDiGraph):
                 node, ndict = n
                 attr_dict = attr.copy()
                 attr_dict.update(ndict)
-            self.add_node(node, attr_dict=attr_dict, check=check)
+            pairs.append((node, attr_dict))
+        if not self.compact_labels:
+            for node, attr_dict in pairs:
+                self.add_node(node, attr_dict=attr_dict, check=check)
+            return
+        checker = self._node_checker
+        labeled = [(node, checker.new_label(attr_dict))
+                   for node, attr_dict in pairs]
+        checker.check_bulk(label for _, label in labeled)
+        for _, label in labeled:
+            self._check_untyped(checker, label, check)
+        for node, label in labeled:
+            self._add_labeled_node(node, label)
+
+    def _add_labeled_node(self, n, label):
+        """Add node C{n} with C{label}, or update its label.
+
+        The label is neither copied nor checked.
+        """
+        # adapted from `networkx.DiGraph.add_node`
+        if n in self._succ:
+            old = self._node[n]
+            if self._node_index is not None:
+                self._unindex_node(n, old)
+                old.update(label)
+                self._index_node(n, old)
+            else:
+                old.update(label)
+            return
+        if n is None:
+            raise ValueError('None cannot be a node')
+        self._succ[n] = self.adjlist_inner_dict_factory()
+        self._pred[n] = self.adjlist_inner_dict_factory()
+        self._node[n] = label
+        if self._node_index is not None:
+            self._index_node(n, label)
+
+    def _check_untyped(self, checker, label, check):
+        """Raise C{AttributeError} for untyped keys, if C{check}.
+
+        Otherwise log a warning.
+        """
+        if checker.untyped_keys(label):
+            self._check_for_untyped_keys(label, checker.types, check)
 
     def add_edge(self, u, v, key=None, attr_dict=None, check=True, **attr):
-        """Use a L{TypedDict} as attribute dict.
+        """Check the edge label against the label types.
 
         Overrides C{networkx.MultiDiGraph.add_edge},
         see that for details.
@@ -966,13 +1213,23 @@ class LabeledDiGraph(nx.MultiDiGraph):
         if v not in self._succ:
             raise ValueError('Graph does not have node v: ' + str(v))
         attr_dict = self._update_attr_dict_with_attr(attr_dict, attr)
-        # define typed dict
-        typed_attr = TypedDict()
-        typed_attr.set_types(self._edge_label_types)
-        typed_attr.update(copy.deepcopy(self._edge_label_defaults))
+        checker = self._edge_checker
+        label = checker.new_label(attr_dict)
         # type checking happens here
-        typed_attr.update(attr_dict)
-        existing_u_v = self.get_edge_data(u, v, default={})
+        checker.check(label)
+        if self._is_new_edge(u, v, attr_dict, label):
+            self._check_untyped(checker, label, check)
+            self._add_labeled_edge(u, v, key, label)
+
+    def _is_new_edge(self, u, v, attr_dict, label):
+        """Return C{False} if edge C{(u, v, attr_dict)} exists.
+
+        Raise C{Exception} if an unlabeled edge
+        from C{u} to C{v} exists.
+        """
+        existing_u_v = self._succ[u].get(v)
+        if not existing_u_v:
+            return True
         if dict() in existing_u_v.values():
             msg = (
                 'Unlabeled transition: '
@@ -988,25 +1245,38 @@ class LabeledDiGraph(nx.MultiDiGraph):
                 'already exists, where:\n'
                 '\t from_state = ' + str(u) + '\n'
                 '\t to_state = ' + str(v) + '\n'
-                '\t label = ' + str(typed_attr) + '\n')
+                '\t label = ' + str(label) + '\n')
             logger.warning(msg)
-            return
-        # self._breaks_determinism(from_state, labels)
-        self._check_for_untyped_keys(typed_attr,
-                                     self._edge_label_types,
-                                     check)
-        # the only change from nx in this clause is using TypedDict
-        logger.debug('adding edge: ' + str(u) + ' ---> ' + str(v))
+            return False
+        return True
+
+    def _add_labeled_edge(self, u, v, key, label):
+        """Add edge from C{u} to C{v} with C{label}.
+
+        If an edge with C{key} exists, then update its label.
+        The label is neither copied nor checked.
+        """
+        logger.debug('adding edge: %s ---> %s', u, v)
+        # adapted from `networkx.MultiDiGraph.add_edge`
         if key is None:
             key = self.new_edge_key(u, v)
-        if v in self._succ[u]:
-            keydict = self._adj[u][v]
-            datadict = keydict.get(key, typed_attr)
-            datadict.update(typed_attr)
-            nx.MultiDiGraph.add_edge(self, u, v, key, **datadict)
-        else:
+        keydict = self._succ[u].get(v)
+        if keydict is None:
             # selfloops work this way without special treatment
-            nx.MultiDiGraph.add_edge(self, u, v, **typed_attr)
+            keydict = self.edge_key_dict_factory()
+            self._succ[u][v] = keydict
+            self._pred[v][u] = keydict
+        indexed = self._edge_index is not None
+        if key in keydict:
+            old = keydict[key]
+            if indexed:
+                self._unindex_edge(u, v, key, old)
+            old.update(label)
+            label = old
+        else:
+            keydict[key] = label
+        if indexed:
+            self._index_edge(u, v, key, label)
 
     def add_edges_from(self, labeled_ebunch, attr_dict=None,
                        check=True, **attr):
@@ -1024,8 +1294,14 @@ class LabeledDiGraph(nx.MultiDiGraph):
             - 3-tuples: (u, v, label)
 
           See also L{remove_labeled_edges_from}.
+
+        If C{self.compact_labels}, then the labels are checked
+        in bulk, before adding any edge.
         """
         attr_dict = self._update_attr_dict_with_attr(attr_dict, attr)
+        if self.compact_labels:
+            self._add_edges_compact(labeled_ebunch, attr_dict, check)
+            return
         # process ebunch
         for e in labeled_ebunch:
             datadict = dict(attr_dict)
@@ -1046,6 +1322,305 @@ class LabeledDiGraph(nx.MultiDiGraph):
             datadict.update(dd)
             self.add_edge(u, v, key=key, attr_dict=datadict, check=check)
 
+    def _add_edges_compact(self, labeled_ebunch, attr_dict, check):
+        """Check labels in bulk, then add the edges.
+
+        For C{labeled_ebunch}, C{check} see L{add_edges_from}.
+        """
+        checker = self._edge_checker
+        edges = list()
+        for e in labeled_ebunch:
+            datadict = dict(attr_dict)
+            ne = len(e)
+            if ne == 4:
+                u, v, key, dd = e
+            elif ne == 3:
+                u, v, dd = e
+                key = None
+            elif ne == 2:
+                u, v = e
+                dd = {}
+                key = None
+            else:
+                raise ValueError(
+                    'Edge tuple %s must be a 2-, 3-, or 4-tuple .' % (e,))
+            if u not in self._succ:
+                raise ValueError('Graph does not have node u: ' + str(u))
+            if v not in self._succ:
+                raise ValueError('Graph does not have node v: ' + str(v))
+            datadict.update(dd)
+            edges.append((u, v, key, datadict, checker.new_label(datadict)))
+        checker.check_bulk(e[4] for e in edges)
+        for u, v, key, datadict, label in edges:
+            if self._is_new_edge(u, v, datadict, label):
+                self._check_untyped(checker, label, check)
+                self._add_labeled_edge(u, v, key, label)
+
+    def _add_new_nodes(self, nodes):
+        """Add many nodes, labeled with the default values.
+
+        Faster than L{add_nodes_from}, because each node
+        is added without checking labels.
+
+        @param nodes: iterable of nodes not in the graph
+        """
+        checker = self._node_checker
+        indexed = self._node_index is not None
+        # adapted from `networkx.DiGraph.add_node`
+        for n in nodes:
+            self._succ[n] = self.adjlist_inner_dict_factory()
+            self._pred[n] = self.adjlist_inner_dict_factory()
+            label = checker.new_label(dict())
+            self._node[n] = label
+            if indexed:
+                self._index_node(n, label)
+
+    def _add_edges_with_label(self, edges, attr_dict, check=True):
+        """Add edges that are all labeled with C{attr_dict}.
+
+        Same as calling L{add_edge} for each edge,
+        but the label is checked only once.
+
+        @param edges: iterable of 2-tuples C{(u, v)} of existing nodes
+        @param attr_dict: label of each new edge
+        @type attr_dict: C{dict}
+        @param check: see L{add_edge}
+        """
+        checker = self._edge_checker
+        template = checker.new_label(attr_dict)
+        checker.check(template)
+        self._check_untyped(checker, template, check)
+        # no defaults to copy ?
+        shallow = all(k in attr_dict for k in checker.copied)
+        indexed = self._edge_index is not None
+        succ = self._succ
+        pred = self._pred
+        for u, v in edges:
+            if shallow:
+                label = dict(template)
+            else:
+                label = checker.new_label(attr_dict)
+            keydict = succ[u].get(v)
+            if keydict:
+                if self._is_new_edge(u, v, attr_dict, label):
+                    self._add_labeled_edge(u, v, None, label)
+                continue
+            # first edge from `u` to `v`
+            keydict = self.edge_key_dict_factory()
+            keydict[0] = label
+            succ[u][v] = keydict
+            pred[v][u] = keydict
+            if indexed:
+                self._index_edge(u, v, 0, label)
+
+    def _add_new_edges(self, labeled_ebunch):
+        """Add many labeled edges, checking each label value once.
+
+        Unlike L{add_edges_from}, labels are not compared to
+        those of existing edges, and each value of each typed label
+        is checked only the first time it is seen.
+        Untyped keys are allowed, as with C{check=False}.
+
+        @param labeled_ebunch: iterable of 3-tuples C{(u, v, label)},
+            where C{u} and C{v} are nodes, and no edge
+            from C{u} to C{v} is labeled with C{label}.
+        """
+        checker = self._edge_checker
+        indexed = self._edge_index is not None
+        seen = set()
+        for u, v, label in labeled_ebunch:
+            if u not in self._succ:
+                raise ValueError('Graph does not have node u: ' + str(u))
+            if v not in self._succ:
+                raise ValueError('Graph does not have node v: ' + str(v))
+            # raises `ValueError` for invalid values
+            for pair in label.items():
+                try:
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+                except TypeError:
+                    # unhashable
+                    pass
+                checker.check_value(*pair)
+            # adapted from `networkx.MultiDiGraph.add_edge`
+            keydict = self._succ[u].get(v)
+            if keydict is None:
+                keydict = self.edge_key_dict_factory()
+                self._succ[u][v] = keydict
+                self._pred[v][u] = keydict
+            key = self.new_edge_key(u, v)
+            keydict[key] = checker.new_label(label)
+            if indexed:
+                self._index_edge(u, v, key, keydict[key])
+
+    def index_labels(self, enable=True):
+        """Create indexes from label values to nodes and edges.
+
+        The indexes are used by L{States.find} and L{Transitions.find},
+        and updated as nodes and edges are added or removed.
+        Calling this method again recreates the indexes,
+        for example after changing labels in place.
+
+        @param enable: if C{False}, then remove the indexes
+        """
+        if not enable:
+            self._node_index = None
+            self._edge_index = None
+            return
+        self._node_index = dict()
+        self._edge_index = dict()
+        for n, label in self._node.items():
+            self._index_node(n, label)
+        for u, nbrs in self._succ.items():
+            for v, keydict in nbrs.items():
+                for key, label in keydict.items():
+                    self._index_edge(u, v, key, label)
+
+    def _index_node(self, n, label):
+        index = self._node_index
+        for item in _index_items(label):
+            index.setdefault(item, dict())[n] = None
+
+    def _unindex_node(self, n, label):
+        index = self._node_index
+        for item in _index_items(label):
+            nodes = index.get(item)
+            if nodes is None:
+                continue
+            nodes.pop(n, None)
+            if not nodes:
+                del index[item]
+
+    def _index_edge(self, u, v, key, label):
+        index = self._edge_index
+        for item in _index_items(label):
+            edges = index.setdefault(item, dict())
+            edges.setdefault(u, dict())[(v, key)] = None
+
+    def _unindex_edge(self, u, v, key, label):
+        index = self._edge_index
+        for item in _index_items(label):
+            edges = index.get(item)
+            if edges is None or u not in edges:
+                continue
+            out = edges[u]
+            out.pop((v, key), None)
+            if not out:
+                del edges[u]
+            if not edges:
+                del index[item]
+
+    def _find_nodes(self, desired):
+        """Return nodes that may be labeled with C{desired}.
+
+        Return C{None} if the label index cannot answer,
+        otherwise a C{dict} keyed by nodes, to be filtered
+        by comparing their labels to C{desired}.
+        """
+        index = self._node_index
+        if index is None:
+            return None
+        items = _query_items(desired, self._node_label_types)
+        if items is None:
+            return None
+        # any desired label will do, so pick the rarest
+        nodes = None
+        for item, unhashable in items:
+            found = index.get(item, {})
+            if unhashable in index:
+                found = dict(found)
+                found.update(index[unhashable])
+            if nodes is None or len(found) < len(nodes):
+                nodes = found
+        return nodes
+
+    def _find_edges(self, desired, from_states=None):
+        """Return edges that may be labeled with C{desired}.
+
+        Return C{None} if the label index cannot answer,
+        otherwise a C{list} of edges C{(u, v, label)},
+        to be filtered by comparing C{label} to C{desired}.
+        Unlabeled edges are included.
+
+        @param from_states: C{list} of nodes, or C{None} for all
+        """
+        index = self._edge_index
+        if index is None:
+            return None
+        items = _query_items(desired, self._edge_label_types)
+        if items is None:
+            return None
+        buckets = None
+        for item, unhashable in items:
+            found = [index[x] for x in (item, unhashable) if x in index]
+            size = sum(len(d) for d in found)
+            if buckets is None or size < sizes:
+                buckets = found
+                sizes = size
+        if _UNLABELED in index:
+            buckets.append(index[_UNLABELED])
+        succ = self._succ
+        edges = list()
+        for bucket in buckets:
+            if from_states is None:
+                sources = bucket
+            else:
+                sources = [u for u in from_states if u in bucket]
+            for u in sources:
+                for v, key in bucket[u]:
+                    edges.append((u, v, succ[u][v][key]))
+        return edges
+
+    def remove_node(self, n):
+        """Remove node C{n}, and update label indexes.
+
+        Overrides C{networkx.MultiDiGraph.remove_node}.
+        """
+        if self._node_index is not None and n in self._succ:
+            self._unindex_node(n, self._node[n])
+            for u, v, key, label in self.in_edges(n, keys=True, data=True):
+                self._unindex_edge(u, v, key, label)
+            for u, v, key, label in self.out_edges(n, keys=True, data=True):
+                if v != n:
+                    self._unindex_edge(u, v, key, label)
+        nx.MultiDiGraph.remove_node(self, n)
+
+    def remove_nodes_from(self, nodes):
+        """Remove nodes, and update label indexes.
+
+        Overrides C{networkx.MultiDiGraph.remove_nodes_from}.
+        """
+        if self._node_index is None:
+            nx.MultiDiGraph.remove_nodes_from(self, nodes)
+            return
+        for n in list(nodes):
+            if n in self._succ:
+                self.remove_node(n)
+
+    def remove_edge(self, u, v, key=None):
+        """Remove an edge, and update label indexes.
+
+        Overrides C{networkx.MultiDiGraph.remove_edge}.
+        """
+        if self._edge_index is not None:
+            keydict = self._succ.get(u, {}).get(v, {})
+            if key is None and keydict:
+                # networkx removes the last edge added
+                key = list(keydict)[-1]
+            if key in keydict:
+                self._unindex_edge(u, v, key, keydict[key])
+        nx.MultiDiGraph.remove_edge(self, u, v, key=key)
+
+    def clear(self):
+        """Remove all nodes and edges, and empty label indexes.
+
+        Overrides C{networkx.MultiDiGraph.clear}.
+        """
+        nx.MultiDiGraph.clear(self)
+        if self._node_index is not None:
+            self.index_labels()
+
     def remove_labeled_edge(self, u, v, attr_dict=None, **attr):
         """Remove single labeled edge.
 
@@ -1109,18 +1684,22 @@ class LabeledDiGraph(nx.MultiDiGraph):
         return False
 
     def remove_deadends(self):
-        """Recursively delete nodes with no outgoing transitions."""
+        """Recursively delete nodes with no outgoing transitions.
+
+        Takes time linear in the size of the graph,
+        see L{backward_prune}.
+
+        @return: removed nodes
+        @rtype: C{set}
+        """
         n = len(self)
-        s = {1}
-        while s:
-            s = {u for u, d in self.out_degree()
-                 if d == 0}
-            self.states.remove_from(s)
+        dead = backward_prune(self)
+        self.states.remove_from(dead)
         m = len(self)
         assert n == 0 or m > 0, 'removed all {n} nodes!'.format(n=n)
-        assert n >= 0, 'added {n} nodes'.format(n=n)
-        print('removed {r} nodes from '
-              '{n} total'.format(r=n - m, n=n))
+        logger.info('removed {r} nodes from '
+                    '{n} total'.format(r=n - m, n=n))
+        return dead
 
     def dot_str(self, wrap=10, **kwargs):
         """Return dot string.
@@ -1298,3 +1877,48 @@ def prepend_with(states, prepend_str):
     if prepend_str is None:
         return states
     return [prepend_str + str(s) for s in states]
+
+
+def backward_prune(graph, dead=None):
+    """Return nodes that lead only to deadends, or to C{dead}.
+
+    The result is the least set C{D} of nodes that contains C{dead},
+    and each node of which has no successors outside C{D}.
+    So removing C{D} from C{graph} leaves a graph without deadends.
+    The graph is not modified.
+
+    Nodes are found by propagating backwards from the deadends,
+    decrementing the number of remaining successors of each
+    predecessor, so the time is linear in the size of C{graph}.
+
+    @param graph: directed graph
+    @type graph: C{networkx.DiGraph} or C{networkx.MultiDiGraph}
+
+    @param dead: nodes to regard as removed
+    @type dead: iterable of nodes, or C{None}
+
+    @rtype: C{set} of nodes
+    """
+    succ = graph.succ
+    pred = graph.pred
+    if dead is None:
+        pruned = set()
+    else:
+        pruned = {u for u in dead if u in succ}
+    # number of distinct successors not pruned
+    count = dict()
+    for u, nbrs in succ.items():
+        count[u] = len(nbrs)
+        if not nbrs:
+            pruned.add(u)
+    stack = list(pruned)
+    while stack:
+        v = stack.pop()
+        for u in pred[v]:
+            if u in pruned:
+                continue
+            count[u] -= 1
+            if count[u] == 0:
+                pruned.add(u)
+                stack.append(u)
+    return pruned
@@ -34,8 +34,12 @@ from __future__ import absolute_import
 from __future__ import print_function
 
 import copy
+import numbers
 from pprint import pformat
 from random import choice
+
+import numpy as np
+
 from tulip.transys.labeled_graphs import LabeledDiGraph
 # inline imports:
 #
@@ -419,6 +423,9 @@ class MealyMachine(Transducer):
     """
 
     def __init__(self):
+        # index of transitions by input valuation, for each state,
+        # built by `_reactions` and invalidated by mutation
+        self._reaction_index = dict()
         Transducer.__init__(self)
         # will point to selected values of self._transition_label_def
         self.dot_node_shape = {'normal': 'ellipse'}
@@ -483,6 +490,7 @@ class MealyMachine(Transducer):
             keys are port_names (see arg: new_outputs)
             each function returns bool
         """
+        self._reaction_index.clear()
         for port_name, port_type in new_outputs.items():
             # append
             self._transition_label_def[port_name] = port_type
@@ -498,6 +506,81 @@ class MealyMachine(Transducer):
                 mask_func = masks[port_name]
                 self._transition_dot_mask[port_name] = mask_func
 
+    def add_inputs(self, new_inputs, masks=None):
+        self._reaction_index.clear()
+        Transducer.add_inputs(self, new_inputs, masks=masks)
+
+    def add_edge(self, u, v, key=None, attr_dict=None, check=True, **attr):
+        self._reaction_index.pop(u, None)
+        Transducer.add_edge(
+            self, u, v, key=key, attr_dict=attr_dict, check=check, **attr)
+
+    def add_edges_from(self, labeled_ebunch, attr_dict=None,
+                       check=True, **attr):
+        self._reaction_index.clear()
+        Transducer.add_edges_from(
+            self, labeled_ebunch, attr_dict=attr_dict, check=check, **attr)
+
+    def _add_edges_with_label(self, edges, attr_dict, check=True):
+        self._reaction_index.clear()
+        Transducer._add_edges_with_label(
+            self, edges, attr_dict, check=check)
+
+    def _add_new_nodes(self, nodes):
+        self._reaction_index.clear()
+        Transducer._add_new_nodes(self, nodes)
+
+    def _add_new_edges(self, labeled_ebunch):
+        self._reaction_index.clear()
+        Transducer._add_new_edges(self, labeled_ebunch)
+
+    def remove_edge(self, u, v, key=None):
+        self._reaction_index.pop(u, None)
+        Transducer.remove_edge(self, u, v, key=key)
+
+    def remove_node(self, n):
+        self._reaction_index.clear()
+        Transducer.remove_node(self, n)
+
+    def remove_nodes_from(self, nodes):
+        self._reaction_index.clear()
+        Transducer.remove_nodes_from(self, nodes)
+
+    def clear(self):
+        self._reaction_index.clear()
+        Transducer.clear(self)
+
+    def _reactions(self, state):
+        """Return transitions from C{state}, indexed by inputs.
+
+        The index is built when first needed,
+        and discarded when the machine is modified
+        by adding or removing states, transitions, or ports.
+        Changing edge labels in place, as in
+        C{G[i][j][key]['port'] = value}, is not detected.
+
+        @return: C{(table, moves)}, where:
+            - C{table} maps each C{frozenset} of input items
+              to a C{list} of C{(next_state, outputs)}
+            - C{moves} is a C{list} of
+              C{(next_state, inputs, outputs)},
+              in the order of C{self.edges}
+        """
+        try:
+            return self._reaction_index[state]
+        except KeyError:
+            pass
+        table = dict()
+        moves = list()
+        for _, next_state, attr_dict in self.edges([state], data=True):
+            inputs = project_dict(attr_dict, self.inputs)
+            outputs = project_dict(attr_dict, self.outputs)
+            key = frozenset(inputs.items())
+            table.setdefault(key, list()).append((next_state, outputs))
+            moves.append((next_state, inputs, outputs))
+        self._reaction_index[state] = (table, moves)
+        return table, moves
+
     def reaction(self, from_state, inputs, lazy=False):
         """Return next state and output, when reacting to given inputs.
 
@@ -524,6 +607,17 @@ class MealyMachine(Transducer):
         @rtype: (next_state, outputs)
           where C{outputs}: C{{'port_name':port_value, ...}}
         """
+        if not lazy:
+            try:
+                table, _ = self._reactions(from_state)
+                enabled = table.get(frozenset(inputs.items()))
+            except TypeError:
+                # unhashable values
+                enabled = None
+            # errors are reported below
+            if enabled is not None and len(enabled) == 1:
+                ((next_state, outputs), ) = enabled
+                return (next_state, dict(outputs))
         if lazy:
             restricted_inputs = set(self.inputs).intersection(inputs.keys())
         else:
@@ -625,18 +719,205 @@ def guided_run(mealy, from_state=None, input_sequences=None):
         state = next(iter(mealy.states.initial))
     else:
         state = from_state
-    n = len(next(iter(seqs.values())))
+    ports = list(seqs)
     states_seq = []
     output_seqs = {k: list() for k in mealy.outputs}
-    for i in range(n):
-        inputs = {k: v[i] for k, v in seqs.items()}
+    for values in zip(*[seqs[k] for k in ports]):
+        inputs = dict(zip(ports, values))
         state, outputs = mealy.reaction(state, inputs)
         states_seq.append(state)
-        for k in output_seqs:
-            output_seqs[k].append(outputs[k])
+        for k, seq in output_seqs.items():
+            seq.append(outputs[k])
     return (states_seq, output_seqs)
 
 
+def simulate_batch(mealy, input_sequences, from_state=None):
+    """Run deterministic machine on many input traces at once.
+
+    The machine is compiled to integer tables, indexed by state
+    and input valuation, and all traces are advanced together,
+    one step at a time, using C{numpy} arrays.
+
+    A trace stops when no transition, or more than one transition,
+    is enabled for its input, for example at a dead-end,
+    or when an input value labels no transition.
+    Other traces continue.
+
+    @param mealy: input-deterministic Mealy machine
+    @type mealy: L{MealyMachine}
+
+    @param input_sequences: for each input port, the values of the
+        port in each trace and step, as array of shape
+        C{(n_traces, n_steps)}
+    @type input_sequences: C{dict} of 2-D array-like
+
+    @param from_state: start all traces at this state.
+        If C{None}, then use the unique initial state C{Sinit}.
+
+    @return: states and output values in each trace and step,
+        and number of steps that each trace completed.
+        For trace C{i}, only steps before C{lengths[i]}
+        are meaningful.
+    @rtype: C{(states, output_seqs, lengths)}
+      where:
+        - C{states} is an array of shape C{(n_traces, n_steps)}
+        - C{output_seqs} is a C{dict} of such arrays
+        - C{lengths} is an integer array of shape C{(n_traces,)}
+    """
+    missing_ports = set(mealy.inputs).difference(input_sequences)
+    if missing_ports:
+        raise ValueError('missing input port(s): ' + str(missing_ports))
+    seqs = {k: np.asarray(input_sequences[k]) for k in mealy.inputs}
+    shapes = {v.shape for v in seqs.values()}
+    if len(shapes) != 1:
+        raise ValueError(
+            'All input arrays must have the same shape, '
+            'and the machine at least one input port.')
+    (shape, ) = shapes
+    if len(shape) != 2:
+        raise ValueError(
+            'Input arrays must be 2-dimensional, got shape: ' + str(shape))
+    n_traces, n_steps = shape
+    if from_state is None:
+        state = next(iter(mealy.states.initial))
+    else:
+        state = from_state
+    table = _compile_mealy(mealy)
+    code = _encode_inputs(table, seqs, shape)
+    # advance traces
+    keys = table['keys']
+    current = np.full(n_traces, table['state_index'][state], dtype=int)
+    alive = np.ones(n_traces, dtype=bool)
+    lengths = np.zeros(n_traces, dtype=int)
+    state_codes = np.zeros(shape, dtype=int)
+    output_codes = {k: np.zeros(shape, dtype=int) for k in mealy.outputs}
+    for t in range(n_steps):
+        key = current * table['n_codes'] + code[:, t]
+        pos = np.searchsorted(keys, key)
+        next_state = table['next_state'][pos]
+        alive &= (keys[pos] == key) & (code[:, t] >= 0) & (next_state >= 0)
+        current = np.where(alive, next_state, current)
+        lengths += alive
+        state_codes[:, t] = current
+        for k, codes in output_codes.items():
+            codes[:, t] = table['outputs'][k][pos]
+    states = table['states'][state_codes]
+    output_seqs = {k: table['output_values'][k][codes]
+                   for k, codes in output_codes.items()}
+    return (states, output_seqs, lengths)
+
+
+def _compile_mealy(mealy):
+    """Return transition table of C{mealy}, with integer codes.
+
+    Each input valuation is encoded as an integer,
+    with one digit for each input port, and each transition
+    by the key C{state_code * n_codes + input_code}.
+    The keys are sorted, so that they can be searched,
+    and end with a sentinel larger than all keys.
+
+    @return: C{dict} with keys:
+        - C{'states'}: array of states
+        - C{'state_index'}: maps each state to its code
+        - C{'ports'}: input ports, in order of digits
+        - C{'input_index'}: C{dict} of C{dict} that map
+          each value of each input port to its digit
+        - C{'strides'}: C{dict} of the weight of each digit
+        - C{'n_codes'}: number of input valuations
+        - C{'keys'}: sorted array of transition keys
+        - C{'next_state'}: for each key, the code of the next state,
+          or -1 if more than one transition has this key
+        - C{'outputs'}: for each output port, and each key,
+          the code of the output value
+        - C{'output_values'}: for each output port, array of values
+    """
+    states = list(mealy.states)
+    state_index = {s: i for i, s in enumerate(states)}
+    ports = list(mealy.inputs)
+    outputs = list(mealy.outputs)
+    input_index = {k: dict() for k in ports}
+    output_index = {k: dict() for k in outputs}
+    edges = list()
+    for u, v, attr_dict in mealy.edges(data=True):
+        # a reaction matches all input ports
+        if any(k not in attr_dict for k in ports):
+            continue
+        digits = [
+            input_index[k].setdefault(attr_dict[k], len(input_index[k]))
+            for k in ports]
+        out = [
+            output_index[k].setdefault(
+                attr_dict.get(k), len(output_index[k]))
+            for k in outputs]
+        edges.append((state_index[u], digits, state_index[v], out))
+    strides = dict()
+    n_codes = 1
+    for k in ports:
+        strides[k] = n_codes
+        n_codes *= max(len(input_index[k]), 1)
+    sentinel = np.iinfo(np.int64).max
+    if len(states) * n_codes >= sentinel:
+        raise ValueError('too many input valuations to encode')
+    keys = [u * n_codes + sum(d * strides[k] for d, k in zip(digits, ports))
+            for u, digits, _, _ in edges]
+    keys = np.array(keys + [sentinel], dtype=np.int64)
+    next_state = np.array([v for _, _, v, _ in edges] + [-1], dtype=int)
+    out_codes = [out for _, _, _, out in edges] + [[0] * len(outputs)]
+    out_codes = np.array(out_codes, dtype=int).reshape(
+        len(edges) + 1, len(outputs))
+    keys, first, counts = np.unique(
+        keys, return_index=True, return_counts=True)
+    next_state = next_state[first]
+    next_state[counts > 1] = -1
+    out_codes = out_codes[first]
+    output_values = dict()
+    for k, index in output_index.items():
+        values = [None] * max(len(index), 1)
+        for value, i in index.items():
+            values[i] = value
+        output_values[k] = _value_array(values)
+    return dict(
+        states=_value_array(states),
+        state_index=state_index,
+        ports=ports,
+        input_index=input_index,
+        strides=strides,
+        n_codes=n_codes,
+        keys=keys,
+        next_state=next_state,
+        outputs={k: out_codes[:, i] for i, k in enumerate(outputs)},
+        output_values=output_values)
+
+
+def _encode_inputs(table, seqs, shape):
+    """Return integer codes of input valuations, -1 for invalid."""
+    code = np.zeros(shape, dtype=np.int64)
+    valid = np.ones(shape, dtype=bool)
+    for k in table['ports']:
+        index = table['input_index'][k]
+        values, inverse = np.unique(seqs[k], return_inverse=True)
+        digits = np.array([index.get(x, -1) for x in values], dtype=int)
+        digits = digits[inverse].reshape(shape)
+        valid &= digits >= 0
+        code += digits * table['strides'][k]
+    code[~valid] = -1
+    return code
+
+
+def _value_array(values):
+    """Return C{numpy} array of C{values}.
+
+    Numbers are stored in a numeric array,
+    other values in an array of objects.
+    """
+    if all(isinstance(x, numbers.Real) for x in values):
+        return np.array(values)
+    a = np.empty(len(values), dtype=object)
+    for i, x in enumerate(values):
+        a[i] = x
+    return a
+
+
 def random_run(mealy, from_state=None, N=10):
     """Return run from given state for N random inputs.
 
@@ -662,21 +943,18 @@ def random_run(mealy, from_state=None, N=10):
     states_seq = []
     output_seqs = {k: list() for k in mealy.outputs}
     for i in range(N):
-        trans = mealy.transitions.find([state])
+        _, moves = mealy._reactions(state)
         # choose next transition
-        selected_trans = choice(list(trans))
-        _, new_state, attr_dict = selected_trans
+        new_state, inputs, outputs = choice(moves)
         # extend execution trace
         states_seq.append(new_state)
         # extend output traces
-        outputs = project_dict(attr_dict, mealy.outputs)
         for k in output_seqs:
             output_seqs[k].append(outputs[k])
         # updates
         old_state = state
         state = new_state
         # printing
-        inputs = project_dict(attr_dict, mealy.inputs)
         print(
             'move from\n\t state: ' + str(old_state) +
             '\n\t with input:' + str(inputs) +
@@ -34,8 +34,8 @@ from __future__ import print_function
 
 import logging
 import warnings
-from itertools import chain, combinations
-from collections import Iterable, Hashable, Container
+from itertools import chain, combinations, product
+from collections import Counter, Iterable, Hashable, Container
 from pprint import pformat
 from random import randint
 
@@ -43,10 +43,33 @@ from random import randint
 logger = logging.getLogger(__name__)
 
 
+def _freeze(item):
+    """Return hashable key that identifies C{item} up to equality.
+
+    Builtin containers (C{list}, C{tuple}, C{set}, C{frozenset},
+    C{dict}) are converted recursively, tagged with their type,
+    so that two items have equal keys if they are equal.
+    A C{set} and a C{frozenset} are equal if they have the same
+    elements, so they get the same tag.
+    Raise C{TypeError} if C{item} contains other unhashable objects.
+    """
+    t = type(item)
+    if t is list or t is tuple:
+        return (t, tuple(_freeze(x) for x in item))
+    if t is set or t is frozenset:
+        return (frozenset, frozenset(item))
+    if t is dict:
+        return (t, frozenset((k, _freeze(v)) for k, v in item.items()))
+    hash(item)
+    return item
+
+
 def compare_lists(list1, list2):
     """Compare list contents, ignoring ordering.
 
-    Hashability of elements not assumed, incurring O(N**2)
+    Hashability of elements not assumed. Elements that can be
+    converted to hashable keys (see L{MathSet}) are counted in
+    time O(N), otherwise the comparison takes O(N**2).
 
     See Also
     ========
@@ -64,6 +87,13 @@ def compare_lists(list1, list2):
 
     if not isinstance(list2, list):
         raise TypeError('Not a list, instead list2:\n\t' + str(list2))
+    if len(list1) != len(list2):
+        return False
+    try:
+        return (Counter(_freeze(x) for x in list1) ==
+                Counter(_freeze(x) for x in list2))
+    except TypeError:
+        pass
     dummy_list = list(list1)
     same_lists = True
     for item in list2:
@@ -85,6 +115,17 @@ class MathSet(object):
     ========
     >>> s = MathSet(['a', 1, [1,2], {'a', 'b'} ] )
 
+    Hashable elements are stored in a Python C{set}.
+    Unhashable elements are stored in a list, and indexed by
+    hashable keys that are made by converting builtin containers
+    (C{list}, C{tuple}, C{set}, C{dict}) to hashable ones.
+    So membership, addition and comparison take constant time
+    per element, as for C{set}. Only unhashable elements that
+    contain other unhashable objects are searched linearly.
+
+    Iteration does not copy the elements,
+    so the set should not be changed while iterating over it.
+
     Then print(s) shows how the elements were separately stored
     in a set and list, to optimize contains operations:
 
@@ -172,8 +213,19 @@ class MathSet(object):
         @return: Cartesian product of C{self} with C{other}.
         @rtype: C{MathSet} (explicit construction)
         """
-        cartesian = [(x, y) for x in self for y in other]
-        return MathSet(cartesian)
+        return MathSet(product(self, other))
+
+    def cartesian(self, other):
+        """Return lazy Cartesian product with C{other}.
+
+        The pairs are not constructed, unless iterated over.
+
+        @param other: set with which to take Cartesian product
+        @type other: MathSet
+
+        @rtype: L{CartesianProduct}
+        """
+        return CartesianProduct([self, other])
 
     def __ior__(self, iterable):
         """Union with of MathSet with iterable.
@@ -200,16 +252,14 @@ class MathSet(object):
 
     def __sub__(self, rm_items):
         s = MathSet(self)
-        print('s = ' + str(s))
-        print(rm_items)
-        for item in rm_items:
-            if item in s:
-                print('Removing...: ' + str(item))
-                s.remove(item)
+        s -= rm_items
         return s
 
     def __isub__(self, rm_items):
         """Delete multiple elements."""
+        if rm_items is self:
+            self._delete_all()
+            return self
         for item in rm_items:
             if item in self:
                 self.remove(item)
@@ -221,33 +271,63 @@ class MathSet(object):
                 'For now comparison only to another MathSet.\n'
                 'Got:\n\t' + str(other) + '\n of type: ' +
                 str(type(other)) + ', instead.')
-        same_lists = compare_lists(self._list, other._list)
-        return (self._set == other._set) and same_lists
+        if self._set != other._set:
+            return False
+        if len(self._list) != len(other._list):
+            return False
+        if not self._unfrozen and not other._unfrozen:
+            return set(self._keys) == set(other._keys)
+        return compare_lists(self._list, other._list)
 
     def __contains__(self, item):
-        if isinstance(item, Hashable):
+        # Python looks up a `set` in a `set` as a `frozenset`
+        if not isinstance(item, set):
             try:
                 return item in self._set
-            except:
-                logger.error('UnHashable items within Hashable.')
-        return item in self._list
+            except TypeError:
+                pass
+        # unhashable
+        try:
+            key = _freeze(item)
+        except TypeError:
+            return item in self._list
+        if key in self._keys:
+            return True
+        if self._unfrozen:
+            return item in self._list
+        return False
 
     def __iter__(self):
-        return iter(self._list + list(self._set))
+        return chain(self._list, self._set)
 
     def __len__(self):
         """Number of elements in set."""
         return len(self._set) + len(self._list)
 
-    def _filter_hashables(self, iterable):
-        return filter(lambda x: isinstance(x, Hashable), iterable)
-
-    def _filter_unhashables(self, iterable):
-        return list(filter(lambda x: not isinstance(x, Hashable), iterable))
-
     def _delete_all(self):
         self._set = set()
         self._list = list()
+        # keys of unhashable elements
+        self._keys = dict()
+        # number of elements in `_list` without key
+        self._unfrozen = 0
+
+    def _add_unhashable(self, item):
+        """Add unhashable C{item}, return C{False} if present."""
+        try:
+            key = _freeze(item)
+        except TypeError:
+            key = None
+        if key is None:
+            if item in self._list:
+                return False
+            self._unfrozen += 1
+        elif key in self._keys or (self._unfrozen and item in self._list):
+            return False
+        else:
+            self._keys[key] = item
+        self._list.append(item)
+        return True
 
     def add(self, item):
         """Add element to mathematical set.
@@ -266,15 +346,12 @@ class MathSet(object):
         @type item: anything, if hashable it is stored in a Python set,
             otherwise stored in a list.
         """
-        if isinstance(item, Hashable):
-            try:
-                self._set.add(item)
-                return
-            except TypeError:
-                logger.error('UnHashable items within Hashable.')
-        if item not in self._list:
-            self._list.append(item)
-        else:
+        try:
+            self._set.add(item)
+            return
+        except TypeError:
+            pass
+        if not self._add_unhashable(item):
             logger.warning('item already in MathSet.')
 
     def add_from(self, iterable):
@@ -304,22 +381,28 @@ class MathSet(object):
                 'Can only add elements to MathSet from Iterable.\n'
                 'Got:\n\t' + str(iterable) + '\n instead.')
         if isinstance(iterable, MathSet):
-            self._set |= set(iterable._set)
-            self._list = list(unique(self._list + iterable._list))
+            self._set |= iterable._set
+            for item in iterable._list:
+                self._add_unhashable(item)
             return
         # speed up
-        if isinstance(iterable, set):
+        if isinstance(iterable, (set, frozenset)):
             self._set |= iterable
             return
-        # filter to optimize storage
+        if not isinstance(iterable, (list, tuple)):
+            iterable = list(iterable)
         try:
-            self._set |= set(self._filter_hashables(iterable))
-            self._list = list(unique(
-                self._list + self._filter_unhashables(iterable)))
+            self._set.update(iterable)
             return
-        except:
-            # ...if contents of elements in iterable are mutable
-            self._list = list(unique(self._list + list(iterable)))
+        except TypeError:
+            pass
+        # some elements unhashable
+        add = self._set.add
+        for item in iterable:
+            try:
+                add(item)
+            except TypeError:
+                self._add_unhashable(item)
 
     def remove(self, item):
         """Remove existing element from mathematical set.
@@ -338,17 +421,28 @@ class MathSet(object):
         @param item: An item already in the set.
             For adding items, see add.
         """
+        if not isinstance(item, set):
+            try:
+                self._set.remove(item)
+                return
+            except (TypeError, KeyError):
+                pass
         if item not in self:
             warnings.warn(
                 'Set element not in set S.\n'
                 'Maybe you targeted another element for removal ?')
-        if isinstance(item, Hashable):
-            try:
-                self._set.remove(item)
-                return
-            except:
-                logger.debug('item: ' + str(item) + ', contains unhashables.')
-        self._list.remove(item)
+        # raises `ValueError` if absent
+        removed = self._list.pop(self._list.index(item))
+        self._unindex(removed)
+
+    def _unindex(self, element):
+        """Remove key of C{element} removed from C{_list}."""
+        try:
+            key = _freeze(element)
+        except TypeError:
+            self._unfrozen -= 1
+            return
+        del self._keys[key]
 
     def pop(self):
         """Remove and return random MathSet element.
@@ -361,11 +455,15 @@ class MathSet(object):
             if randint(0, 1):
                 return self._set.pop()
             else:
-                return self._list.pop()
+                item = self._list.pop()
+                self._unindex(item)
+                return item
         elif self._set and not self._list:
             return self._set.pop()
         elif self._list and not self._set:
-            return self._list.pop()
+            item = self._list.pop()
+            self._unindex(item)
+            return item
         else:
             raise Exception('Bug in empty MathSet: not self above' +
                             'should not reaching this point.')
@@ -380,11 +478,7 @@ class MathSet(object):
         @rtype: C{MathSet}
         """
         s = MathSet()
-        for item in iterable:
-            print(item)
-            if item in self:
-                print('Adding...\n')
-                s.add(item)
+        s.add_from(item for item in iterable if item in self)
         return s
 
     def intersects(self, iterable):
@@ -469,10 +563,14 @@ class SubSet(MathSet):
         First use states.add to include it in set of states,
         then states.add_initial.
 
+        Elements already in the subset are not checked again.
+
         See Also
         ========
         L{MathSet.add}
         """
+        if new_element in self:
+            return
         if new_element not in self._superset:
             raise Exception(
                 'New element state \\notin superset.\n'
@@ -494,22 +592,50 @@ class SubSet(MathSet):
         arguably more efficient. So both .add and .add_from
         need to be extended here.
 
+        Elements already in the subset are not checked again.
+
         See Also
         ========
         L{add}, L{__ior__}
         """
-        if not is_subset(new_elements, self._superset):
+        if not isinstance(new_elements, Iterable):
+            raise TypeError(
+                'Can only add elements to SubSet from Iterable.\n'
+                'Got:\n\t' + str(new_elements) + '\n instead.')
+        if isinstance(new_elements, str):
+            new = new_elements
+        else:
+            new = [x for x in new_elements if x not in self]
+        if not is_subset(new, self._superset):
             raise Exception('All new_elements:\n\t' + str(new_elements) +
                             '\nshould already be \\in ' +
                             'self.superset = ' + str(self._superset))
-        super(SubSet, self).add_from(new_elements)
+        super(SubSet, self).add_from(new)
 
 
 class CartesianProduct(object):
-    """List of MathSets, with Cartesian semantics."""
+    """List of MathSets, with Cartesian semantics.
 
-    def __init__(self):
-        self.mathsets = []
+    The product is a lazy view: tuples are created only
+    while iterating, and membership is checked per component.
+
+    @param mathsets: factors of the product
+    @type mathsets: C{list} of L{MathSet}, or C{None}
+    """
+
+    def __init__(self, mathsets=None):
+        if mathsets is None:
+            mathsets = []
+        self.mathsets = list(mathsets)
+
+    def __iter__(self):
+        return product(*self.mathsets)
+
+    def __len__(self):
+        n = 1
+        for mathset in self.mathsets:
+            n *= len(mathset)
+        return n
 
     def __contains__(self, element):
         # TODO check ordered
@@ -518,6 +644,9 @@ class CartesianProduct(object):
                 'Argument element must be Iterable, otherwise cannot '
                 'recover which item in it belongs to which set in the '
                 'Cartesian product.')
+        element = tuple(element)
+        if len(element) != len(self.mathsets):
+            return False
         for idx, item in enumerate(element):
             if item not in self.mathsets[idx]:
                 return False
@@ -563,8 +692,17 @@ def unique(iterable):
         unique_items = set(iterable)
     except:
         unique_items = []
+        keys = set()
         for item in iterable:
-            if item not in unique_items:
+            try:
+                key = _freeze(item)
+            except TypeError:
+                key = None
+            if key is None:
+                if item not in unique_items:
+                    unique_items.append(item)
+            elif key not in keys:
+                keys.add(key)
                 unique_items.append(item)
     return unique_items
 
@@ -597,6 +735,9 @@ def is_subset(small_iterable, big_iterable):
                         'and non-string may introduce bugs.\nGot:\n\t' +
                         str(small_iterable) + ',\t' + str(big_iterable) +
                         '\ninstead.')
+    # constant time membership, for any elements
+    if isinstance(big_iterable, MathSet):
+        return all(item in big_iterable for item in small_iterable)
     try:
         # first, avoid object duplication
         if not isinstance(small_iterable, set):
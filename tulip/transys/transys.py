@@ -37,8 +37,6 @@ from pprint import pformat
 from tulip.transys.labeled_graphs import (
     LabeledDiGraph, str2singleton, prepend_with)
 from tulip.transys.mathset import PowerSet, MathSet
-from networkx import MultiDiGraph
-import numpy as np
 # inline imports
 #
 # from tulip.transys.export import graph2promela
@@ -790,32 +788,190 @@ class LabeledGameGraph(GameGraph):
         self.dot_node_shape = {'normal': 'rectangle'}
 
 
-def _pre(graph, list_n):
-    """Find union of predecessors of nodes in graph defined by C{MultiDiGraph}.
+def _state_graph(ts):
+    """Return states of C{ts}, and successor and predecessor indices.
 
-    @param graph: a graph structure corresponding to a FTS.
-    @type graph: C{networkx.MultiDiGraph}
-    @param list_n: list of nodes whose predecessors need to be returned
-    @type list_n: list of nodes in C{graph}
-    @return: set of predecessors of C{list_n}
-    @rtype: C{set}
+    Parallel edges of C{ts} are collapsed,
+    because only reachability between states matters
+    for the simulation algorithms.
+
+    @type ts: L{FTS}
+    @return: C{(nodes, succ, pred)}, where C{nodes} is a C{list}
+        of the states of C{ts}, and C{succ[k]} (C{pred[k]})
+        is the C{list} of indices of successors (predecessors)
+        of C{nodes[k]}
+    @rtype: C{tuple}
+    """
+    nodes = list(ts)
+    index = {u: k for k, u in enumerate(nodes)}
+    succ = [[index[v] for v in ts.succ[u]] for u in nodes]
+    pred = [[index[v] for v in ts.pred[u]] for u in nodes]
+    return nodes, succ, pred
+
+
+def _bisimulation(blocks, succ, pred):
+    """Return coarsest stable partition that refines C{blocks}.
+
+    A block C{B} is stable with respect to a block C{C},
+    if either all or none of the states in C{B}
+    have a successor in C{C}.
+    Implements the algorithm of Paige and Tarjan,
+    which runs in C{O(m log n)} time,
+    for C{m} edges and C{n} states.
+
+    @param blocks: initial partition, as C{list} of C{set}
+        of state indices
+    @param succ: successor index, as returned by L{_state_graph}
+    @param pred: predecessor index, as returned by L{_state_graph}
+    @return: blocks of the partition, and map from states to blocks
+    @rtype: C{list} of C{set}, C{list} of C{int}
+    """
+    blocks = [set(b) for b in blocks]
+    block_of = [None] * len(succ)
+    for b, block in enumerate(blocks):
+        for x in block:
+            block_of[x] = b
+    # compound blocks are unions of blocks, w.r.t. which
+    # the partition is stable, initially the entire state space
+    compound = [list()]
+    compound_of = list()
+    splitters = list()
+    # each edge `(x, y)` refers to a record of the number of
+    # edges from `x` into the compound block that contains `y`
+    src = list()
+    in_edges = [list() for y in pred]
+    for y, pre_y in enumerate(pred):
+        for x in pre_y:
+            in_edges[y].append(len(src))
+            src.append(x)
+    count = [[len(post_x)] for post_x in succ]
+    ref = [count[x] for x in src]
+
+    def split(marked):
+        touched = dict()
+        for x in marked:
+            touched.setdefault(block_of[x], list()).append(x)
+        for b, xs in touched.items():
+            if len(xs) == len(blocks[b]):
+                continue
+            c = len(blocks)
+            blocks.append(set(xs))
+            blocks[b].difference_update(xs)
+            for x in xs:
+                block_of[x] = c
+            s = compound_of[b]
+            compound_of.append(s)
+            compound[s].append(c)
+            if len(compound[s]) == 2:
+                splitters.append(s)
+
+    compound[0].extend(range(len(blocks)))
+    compound_of.extend([0] * len(blocks))
+    if len(compound[0]) > 1:
+        splitters.append(0)
+    split(x for x, post_x in enumerate(succ) if post_x)
+    while splitters:
+        s = splitters.pop()
+        cs = compound[s]
+        if len(blocks[cs[-2]]) < len(blocks[cs[-1]]):
+            cs[-2], cs[-1] = cs[-1], cs[-2]
+        b = cs.pop()
+        if len(cs) > 1:
+            splitters.append(s)
+        compound_of[b] = len(compound)
+        compound.append([b])
+        splitter = list(blocks[b])
+        count_b = dict()
+        count_s = dict()
+        for y in splitter:
+            for e in in_edges[y]:
+                x = src[e]
+                if x in count_b:
+                    count_b[x][0] += 1
+                else:
+                    count_b[x] = [1]
+                    count_s[x] = ref[e]
+        # split w.r.t. `b` and then w.r.t. the rest of `s`
+        split(count_b)
+        split(x for x, c in count_b.items() if c[0] == count_s[x][0])
+        for y in splitter:
+            for e in in_edges[y]:
+                ref[e][0] -= 1
+                ref[e] = count_b[src[e]]
+    return blocks, block_of
+
+
+def _dual_simulation(blocks, succ, pred):
+    """Return cover of states, and transitions for dual-simulation.
+
+    Starting from C{blocks}, for each pair of cells C{si, sj}
+    such that C{si} intersects C{pre(sj)} without being contained
+    in it, the intersection is added as a new cell.
+    The cover is the least collection closed under this operation,
+    and C{(i, j)} is a transition if C{si} is contained in C{pre(sj)}.
+    Each pair is examined once, and only pairs of cells
+    connected by some edge are examined.
+
+    @param blocks: initial partition, as C{list} of C{set}
+        of state indices
+    @param succ: successor index, as returned by L{_state_graph}
+    @param pred: predecessor index, as returned by L{_state_graph}
+    @return: cells of the cover, and transitions between them
+    @rtype: C{list} of C{frozenset}, C{list} of C{tuple}
     """
-    pre_set = set()
-    for n in list_n:
-        pre_set = pre_set.union(graph.predecessors(n))
-    return pre_set
+    cells = list()
+    cell_index = dict()
+    pre = list()
+    cells_of = [list() for x in succ]
+    transitions = list()
+
+    def add(cell):
+        if cell in cell_index:
+            return
+        k = len(cells)
+        cells.append(cell)
+        cell_index[cell] = k
+        pre.append(frozenset(x for y in cell for x in pred[y]))
+        for x in cell:
+            cells_of[x].append(k)
+
+    def check(i, j):
+        si = cells[i]
+        if si <= pre[j]:
+            transitions.append((i, j))
+        else:
+            add(si & pre[j])
+
+    for block in blocks:
+        add(frozenset(block))
+    # cells are examined in the order they are added,
+    # each against the cells added before it
+    k = 0
+    while k < len(cells):
+        post = {j for x in cells[k] for y in succ[x]
+                for j in cells_of[y] if j <= k}
+        for j in sorted(post):
+            check(k, j)
+        pre_k = {j for x in pre[k] for j in cells_of[x] if j < k}
+        for j in sorted(pre_k):
+            check(j, k)
+        k += 1
+    return cells, transitions
 
 
 def _output_fts(ts, transitions, sol):
-    """Convert the Part from C{nx.MultiDiGraph} to FTS.
+    """Convert the partition of states to FTS.
 
     The returned FTS does not contain any edge attribute in the original FTS.
     All the transitions are assumed to be controllable.
 
     @param ts: the input finite transition system
     @type ts: L{FTS}
-    @param Part: the final partition
-    @type Part: C{networkx.MultiDiGraph}
+    @param transitions: pairs C{(i, j)} of cells,
+        for each transition from cell C{i} to cell C{j}
+    @type transitions: iterable of C{tuple}
+    @param sol: cells, each a set of states of C{ts}
+    @type sol: C{list} of C{set}
 
     @return: the bi/dual simulation abstraction, and the
         partition of states in input ts
@@ -853,16 +1009,20 @@ def _output_fts(ts, transitions, sol):
     ts_simu.atomic_propositions.add_from(AP)
     for i in range(n_cells):
         ts_simu.states.add(i, ap=ts.nodes[next(iter(sol[i]))]['ap'])
-    for i in range(n_cells):
-        for j in range(n_cells):
-            if transitions[j, i]:
-                ts_simu.transitions.add(i, j)
+    for i, j in transitions:
+        ts_simu.transitions.add(i, j)
     return ts_simu, Part_hash
 
 
 def simu_abstract(ts, simu_type):
     """Create a bi/dual-simulation abstraction for a Finite Transition System.
 
+    The bisimulation is the coarsest partition of states
+    that preserves atomic propositions and is stable,
+    computed with the algorithm of Paige and Tarjan [2].
+    The dual-simulation is a cover of states
+    computed as in [1].
+
     @param ts: input finite transition system, the one you want to get
                     its bi/dual-simulation abstraction.
     @type ts: L{FTS}
@@ -878,74 +1038,30 @@ def simu_abstract(ts, simu_type):
     1. Wagenmaker, A. J.; Ozay, N.
        "A Bisimulation-like Algorithm for Abstracting Control Systems."
        54th Annual Allerton Conference on CCC 2016
+
+    2. Paige, R.; Tarjan, R. E.
+       "Three Partition Refinement Algorithms."
+       SIAM Journal on Computing, 16(6), pp. 973-989, 1987
     """
-    # create MultiDiGraph instance from the input FTS
-    G = MultiDiGraph(ts)
+    nodes, succ, pred = _state_graph(ts)
     # build coarsest partition
     S0 = dict()
-    Part = MultiDiGraph()  # a graph associated with the new partition
-    n_cells = 0
-    hash_ap = dict()  # map ap to cells in Part
-    for node in G:
-        ap = repr(G.nodes[node]['ap'])
-        if ap not in S0:
-            S0[ap] = set()
-            hash_ap[ap] = set()
-            Part.add_node(n_cells, ap=ap, cov=S0[ap])  # hash table S0--->G
-            n_cells += 1
-        S0[ap].add(node)
-
-    sol = []
-    for ap in S0:
-        sol.append(S0[ap])
-
-    IJ = np.ones([n_cells, n_cells])
-    transitions = np.zeros([n_cells, n_cells])
-    while np.sum(IJ) > 0:
-        # get i,j from IJ matrix, i--->j
-        ind = np.nonzero(IJ)
-        i = ind[1][0]
-        j = ind[0][0]
-        IJ[j, i] = 0
-        si = sol[i]
-        sj = sol[j]
-        pre_j = _pre(G, sj)
-        if si.issubset(pre_j):
-            transitions[j, i] = 1
-        else:
-            isect = si.intersection(pre_j)
-            if isect == set():
-                continue
-            else:
-                # check if the isect has existed
-                check_isect = False
-                if simu_type == 'dual':
-                    assert len(sol) == n_cells
-                    for k in range(n_cells):
-                        if sol[k] == isect:
-                            check_isect = True
-                            break
-                if not check_isect:
-                    # assume that i != j
-                    sol.append(isect)
-                    # update transition matrix
-                    transitions = np.pad(transitions, (0, 1), 'constant')
-                    transitions[n_cells, :] = 0
-                    transitions[:, n_cells] = transitions[:, i]
-                    transitions[j, n_cells] = 1
-                    if simu_type == 'bi':
-                        sol[i] = sol[i].difference(sol[n_cells])
-                        transitions[i, :] = 0
-                        if i == j:
-                            transitions[j, n_cells] = 0
-                    # update IJ matrix
-                    IJ = np.pad(IJ, (0, 1), 'constant', constant_values=1)
-                    if simu_type == 'bi':
-                        IJ[i, :] = 1
-                        IJ[:, i] = 1
-                    n_cells += 1
-                else:
-                    transitions[j, k] = 1
-        IJ = ((IJ - transitions) > 0).astype(int)
+    for k, node in enumerate(nodes):
+        ap = repr(ts.nodes[node]['ap'])
+        S0.setdefault(ap, set()).add(k)
+    blocks = list(S0.values())
+    if simu_type == 'bi':
+        blocks, block_of = _bisimulation(blocks, succ, pred)
+        transitions = {
+            (block_of[x], block_of[y])
+            for x, post_x in enumerate(succ)
+            for y in post_x}
+        transitions = sorted(transitions)
+    elif simu_type == 'dual':
+        blocks, transitions = _dual_simulation(blocks, succ, pred)
+    else:
+        raise ValueError(
+            'unknown simulation type "{t}"'.format(t=simu_type))
+    sol = [{nodes[x] for x in block} for block in blocks]
     [ts_simu, part_hash] = _output_fts(ts, transitions, sol)
     return ts_simu, part_hash